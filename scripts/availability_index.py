@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Interval index over the availability table for free-window and conflict queries
+Usage: python scripts/availability_index.py --check-in DATE --check-out DATE [--source FILE] [--gaps NIGHTS]
+       python scripts/availability_index.py --conflicts [--source FILE]
+
+Booked, blocked and maintenance ranges are loaded from a JSON export (a list
+of table rows, as data/availability.json) or a SQL dump of the table (pg_dump
+COPY blocks or INSERT statements). Ranges cover start_date up to, not
+including, end_date, like a stay, so a check-out on the day a booking starts
+is not a conflict.
+
+The unavailable nights of every property are merged into disjoint intervals
+stored in one array sorted by (property, start). Whether a stay overlaps any
+of them is a single binary search, so the free/busy state of the whole
+inventory for many stay windows is answered in one vectorized call. Ranges
+added as bookings arrive go to a small second layer of the same shape, which
+is folded into the main one once it grows past COMPACT_FRACTION of it.
+"""
+
+import bisect
+import csv
+import json
+import re
+import sys
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    print("Installing required packages...")
+    import subprocess
+    subprocess.check_call([sys.executable, '-m', 'pip', 'install', 'numpy', '-q'])
+    import numpy as np
+
+from pricing_engine import AVAILABILITY_FILE, UNAVAILABLE_STATUSES, DateLike, day_number
+from supabase_client import fetch_all
+
+
+PROPERTIES_FILE = Path(__file__).parent.parent / 'data' / 'properties.json'
+
+# Added ranges are merged into the main arrays once they outnumber this fraction of them
+COMPACT_FRACTION = 0.05
+COMPACT_MIN = 256
+
+# Day numbers fit in the low 32 bits, the property row goes above them
+_ROW_SHIFT = 32
+
+
+class _Layer:
+    """Disjoint unavailable intervals of every property in one (row, start)-sorted array"""
+
+    def __init__(self, intervals: Dict[int, List[Tuple[int, int]]]):
+        starts, ends, rows = [], [], []
+        for row in sorted(intervals):
+            merged = _merge(intervals[row])
+            starts += [start for start, _ in merged]
+            ends += [end for _, end in merged]
+            rows += [row] * len(merged)
+        self.ends = np.array(ends, dtype=np.int64)
+        self.keys = (np.array(rows, dtype=np.int64) << _ROW_SHIFT) | np.array(starts, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.ends)
+
+    def busy(self, rows: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """Whether [start, end) of each row overlaps an interval, for broadcastable rows/starts/ends"""
+        if not len(self.ends):
+            return np.zeros(np.broadcast(rows, starts, ends).shape, dtype=bool)
+        # The last interval of the row starting before the stay ends is the only one that can overlap it:
+        # any earlier one ends before this one starts
+        last = np.searchsorted(self.keys, (rows << _ROW_SHIFT) | ends, side='left') - 1
+        found = last >= 0
+        last = np.maximum(last, 0)
+        return found & ((self.keys[last] >> _ROW_SHIFT) == rows) & (self.ends[last] > starts)
+
+
+class AvailabilityIndex:
+    """Unavailable ranges per property, with whole-inventory free/busy queries.
+
+    Entries are matched to properties by key_field: property_slug for JSON
+    exports next to properties.json, property_id for rows of the table.
+    properties lists keys that have no unavailable ranges yet, so they are
+    reported as free.
+    """
+
+    def __init__(self, entries: Iterable[dict] = (), key_field: str = 'property_slug',
+                 properties: Iterable[str] = ()):
+        self.key_field = key_field
+        self.keys: List[str] = []
+        self.rows: Dict[str, int] = {}
+        # Per property: entries sorted by start, their start and end days, and the running maximum of the ends
+        self._entries: Dict[str, List[dict]] = {}
+        self._starts: Dict[str, List[int]] = {}
+        self._ends: Dict[str, List[int]] = {}
+        self._max_ends: Dict[str, List[int]] = {}
+        self._pending: Dict[int, List[Tuple[int, int]]] = {}
+        self._pending_count = 0
+        self._added: Optional[_Layer] = None
+
+        for key in properties:
+            self._row(key)
+        for entry in entries:
+            self._insert(entry)
+        self._compact()
+
+    @classmethod
+    def load(cls, path: Path = AVAILABILITY_FILE, properties_path: Optional[Path] = PROPERTIES_FILE,
+             key_field: Optional[str] = None) -> 'AvailabilityIndex':
+        """Index of a JSON export or SQL dump (by suffix .sql); SQL rows are keyed by property_id.
+
+        Slugs of properties_path are included when the entries are keyed by
+        slug, so properties without any range show up as free.
+        """
+        path = Path(path)
+        if path.suffix == '.sql':
+            entries = list(read_sql_dump(path))
+            key_field = key_field or 'property_id'
+        else:
+            with open(path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            key_field = key_field or ('property_slug' if entries and 'property_slug' in entries[0] else 'property_id')
+        properties = []
+        if key_field == 'property_slug' and properties_path and Path(properties_path).exists():
+            with open(properties_path, 'r', encoding='utf-8') as f:
+                properties = [record['slug'] for record in json.load(f)]
+        return cls(entries, key_field=key_field, properties=properties)
+
+    @classmethod
+    def from_supabase(cls, supabase, page_size: int = 1000) -> 'AvailabilityIndex':
+        """Index of the unavailable rows of the availability table, keyed by property_id"""
+        entries = fetch_all(supabase, 'availability', 'id, property_id, start_date, end_date, status, booking_id',
+                            page_size)
+        properties = [row['id'] for row in fetch_all(supabase, 'properties', 'id', page_size)]
+        return cls(entries, key_field='property_id', properties=properties)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def add(self, entries: Iterable[dict]) -> List[Tuple[dict, List[dict]]]:
+        """Add ranges as bookings arrive; returns (entry, overlapping existing ranges) for each conflict.
+
+        Conflicting ranges are still added (the table already holds them);
+        callers that want to refuse a booking check overlaps() first.
+        """
+        conflicts = []
+        for entry in entries:
+            if entry.get('status', 'available') not in UNAVAILABLE_STATUSES:
+                continue
+            overlapping = self.overlaps(entry[self.key_field], entry['start_date'], entry['end_date'])
+            if overlapping:
+                conflicts.append((entry, overlapping))
+            interval = self._insert(entry)
+            if interval:
+                self._pending.setdefault(self.rows[entry[self.key_field]], []).append(interval)
+                self._pending_count += 1
+        if self._pending_count > max(COMPACT_MIN, COMPACT_FRACTION * len(self._main)):
+            self._compact()
+        else:
+            # Rebuilt on the next query, so a burst of bookings costs one rebuild
+            self._added = None
+        return conflicts
+
+    def busy_batch(self, check_ins: Sequence[DateLike], check_outs: Sequence[DateLike],
+                   properties: Optional[Sequence[str]] = None) -> Tuple[List[str], np.ndarray]:
+        """(keys, properties x W bool array): whether each stay window overlaps an unavailable range.
+
+        Keys the index has never seen have no ranges and are free.
+        """
+        if properties is None:
+            keys = list(self.keys)
+            known = np.ones(len(keys), dtype=bool)
+            rows = np.arange(len(keys), dtype=np.int64)[:, None]
+        else:
+            keys = list(properties)
+            known = np.array([key in self.rows for key in keys], dtype=bool)
+            rows = np.array([self.rows.get(key, 0) for key in keys], dtype=np.int64)[:, None]
+        starts = np.array([day_number(d) for d in check_ins], dtype=np.int64)
+        ends = np.array([day_number(d) for d in check_outs], dtype=np.int64)
+        # With the windows in check-out order the searched keys are ascending, which is much kinder to the cache
+        order = np.argsort(ends, kind='stable')
+        starts, ends = starts[order][None, :], ends[order][None, :]
+        if self._added is None:
+            self._added = _Layer(self._pending)
+        busy = self._main.busy(rows, starts, ends)
+        if len(self._added):
+            busy |= self._added.busy(rows, starts, ends)
+        busy &= known[:, None]
+        result = np.empty_like(busy)
+        result[:, order] = busy
+        return keys, result
+
+    def free(self, check_in: DateLike, check_out: DateLike, properties: Optional[Sequence[str]] = None) -> List[str]:
+        """Properties with no unavailable night from check_in up to check_out"""
+        if day_number(check_out) <= day_number(check_in):
+            raise ValueError(f"Check-out {check_out} is not after check-in {check_in}")
+        keys, busy = self.busy_batch([check_in], [check_out], properties)
+        return [keys[i] for i in np.flatnonzero(~busy[:, 0])]
+
+    def overlaps(self, key: str, start: DateLike, end: DateLike) -> List[dict]:
+        """Unavailable ranges of a property that overlap [start, end), in start order"""
+        starts = self._starts.get(key)
+        if not starts:
+            return []
+        first, last = day_number(start), day_number(end)
+        found = []
+        # Ranges starting before the end, walked back until none of the earlier ones reaches the start
+        i = bisect.bisect_left(starts, last) - 1
+        ends, max_ends = self._ends[key], self._max_ends[key]
+        while i >= 0 and max_ends[i] > first:
+            if ends[i] > first:
+                found.append(self._entries[key][i])
+            i -= 1
+        return found[::-1]
+
+    def free_windows(self, key: str, start: DateLike, end: DateLike, min_nights: int = 1) -> List[Tuple[date, date]]:
+        """Free (check-in, check-out) gaps of at least min_nights within [start, end)"""
+        first, last = day_number(start), day_number(end)
+        intervals = [(day_number(e['start_date']), day_number(e['end_date'])) for e in self.overlaps(key, start, end)]
+        windows = []
+        cursor = first
+        for busy_start, busy_end in _merge(intervals) + [(last, last)]:
+            if min(busy_start, last) - cursor >= min_nights:
+                windows.append((date.fromordinal(cursor), date.fromordinal(min(busy_start, last))))
+            cursor = max(cursor, busy_end)
+        return windows
+
+    def conflicts(self, properties: Optional[Sequence[str]] = None) -> List[Tuple[str, dict, dict]]:
+        """Overlapping pairs of ranges of the same property where at least one is a booking"""
+        found = []
+        for key in (self.keys if properties is None else properties):
+            active: List[Tuple[int, dict]] = []
+            spans = zip(self._entries.get(key, []), self._starts.get(key, []), self._ends.get(key, []))
+            for entry, start, end in spans:
+                active = [(other_end, other) for other_end, other in active if other_end > start]
+                for _, other in active:
+                    if 'booked' in (entry.get('status'), other.get('status')):
+                        found.append((key, other, entry))
+                active.append((end, entry))
+        return found
+
+    def _row(self, key: str) -> int:
+        row = self.rows.get(key)
+        if row is None:
+            row = self.rows[key] = len(self.keys)
+            self.keys.append(key)
+            self._entries[key], self._starts[key], self._ends[key], self._max_ends[key] = [], [], [], []
+        return row
+
+    def _insert(self, entry: dict) -> Optional[Tuple[int, int]]:
+        """Record an unavailable range in its property's sorted list; returns its (start, end) day numbers"""
+        if entry.get('status', 'available') not in UNAVAILABLE_STATUSES:
+            return None
+        key = entry[self.key_field]
+        self._row(key)
+        start, end = day_number(entry['start_date']), day_number(entry['end_date'])
+        if end <= start:
+            return None
+        starts, max_ends = self._starts[key], self._max_ends[key]
+        i = bisect.bisect_right(starts, start)
+        starts.insert(i, start)
+        self._ends[key].insert(i, end)
+        self._entries[key].insert(i, entry)
+        max_ends.insert(i, max(end, max_ends[i - 1]) if i else end)
+        for j in range(i + 1, len(max_ends)):
+            if max_ends[j] >= max_ends[j - 1]:
+                break
+            max_ends[j] = max_ends[j - 1]
+        return start, end
+
+    def _compact(self):
+        self._main = _Layer({self.rows[key]: list(zip(starts, self._ends[key]))
+                             for key, starts in self._starts.items() if starts})
+        self._pending = {}
+        self._pending_count = 0
+        self._added = _Layer({})
+
+
+def _merge(intervals: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Sorted disjoint union of half-open intervals (touching ones are joined)"""
+    merged = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+# One value of an INSERT tuple: a quoted string (with '' escapes, maybe cast), NULL, or a bare number/word
+_SQL_VALUE = re.compile(r"\s*(?:'((?:[^']|'')*)'(?:::[\w ]+)?|(NULL)|([^,()\s]+))\s*(,|\))", re.IGNORECASE)
+_INSERT = re.compile(r"INSERT\s+INTO\s+(?:\w+\.)?\"?availability\"?\s*\(([^)]*)\)\s*VALUES\s*", re.IGNORECASE)
+_COPY = re.compile(r"COPY\s+(?:\w+\.)?\"?availability\"?\s*\(([^)]*)\)\s+FROM\s+stdin", re.IGNORECASE)
+
+
+def read_sql_dump(path: Path) -> Iterator[dict]:
+    """Rows of the availability table in a pg_dump file, from COPY blocks or INSERT statements"""
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = iter(f)
+        for line in lines:
+            copy = _COPY.match(line)
+            if copy:
+                columns = _column_names(copy.group(1))
+                for row in lines:
+                    if row.startswith('\\.'):
+                        break
+                    values = [None if v == '\\N' else v for v in next(csv.reader([row.rstrip('\n')], delimiter='\t',
+                                                                                  quoting=csv.QUOTE_NONE))]
+                    yield dict(zip(columns, values))
+                continue
+            insert = _INSERT.search(line)
+            if insert:
+                parts = [line[insert.end():]]
+                while not parts[-1].rstrip().endswith(';'):
+                    parts.append(next(lines, ';'))
+                columns = _column_names(insert.group(1))
+                for values in _insert_tuples(''.join(parts)):
+                    yield dict(zip(columns, values))
+
+
+def _column_names(text: str) -> List[str]:
+    return [name.strip().strip('"') for name in text.split(',')]
+
+
+def _insert_tuples(text: str) -> Iterator[List[Optional[str]]]:
+    """Value lists of the tuples after VALUES"""
+    pos = 0
+    while True:
+        opening = text.find('(', pos)
+        if opening < 0:
+            return
+        pos = opening + 1
+        values = []
+        while True:
+            match = _SQL_VALUE.match(text, pos)
+            if not match:
+                raise ValueError(f"Cannot parse SQL values near: {text[pos:pos + 60]!r}")
+            quoted, null, bare = match.group(1, 2, 3)
+            values.append(quoted.replace("''", "'") if quoted is not None else None if null else bare)
+            pos = match.end()
+            if match.group(4) == ')':
+                break
+        yield values
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Find free properties and booking conflicts')
+    parser.add_argument('--source', type=Path, default=AVAILABILITY_FILE,
+                        help='Availability JSON export or SQL dump (.sql)')
+    parser.add_argument('--check-in', help='Check-in date (YYYY-MM-DD)')
+    parser.add_argument('--check-out', help='Check-out date (YYYY-MM-DD)')
+    parser.add_argument('--gaps', type=int, metavar='NIGHTS',
+                        help='Also list free windows of at least NIGHTS within the stay dates per busy property')
+    parser.add_argument('--conflicts', action='store_true', help='List overlapping ranges involving a booking')
+    parser.add_argument('--limit', type=int, default=20, help='Properties to print')
+
+    args = parser.parse_args()
+    if not args.conflicts and not (args.check_in and args.check_out):
+        parser.error('give --check-in and --check-out, or --conflicts')
+
+    if not args.source.exists():
+        raise SystemExit(f"No availability export at {args.source}; export the availability table to it first.")
+
+    start = time.perf_counter()
+    index = AvailabilityIndex.load(args.source)
+    print(f"Loaded {len(index)} unavailable ranges of {len(index.keys)} properties "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    if args.conflicts:
+        conflicts = index.conflicts()
+        print(f"{len(conflicts)} conflicts")
+        for key, first, second in conflicts[:args.limit]:
+            print(f"  {key}: {first['status']} {first['start_date']}..{first['end_date']} overlaps "
+                  f"{second['status']} {second['start_date']}..{second['end_date']}")
+
+    if args.check_in and args.check_out:
+        start = time.perf_counter()
+        free = index.free(args.check_in, args.check_out)
+        elapsed = time.perf_counter() - start
+        print(f"{len(free)} of {len(index.keys)} properties free from {args.check_in} to {args.check_out} "
+              f"({elapsed * 1000:.2f} ms)")
+        for key in free[:args.limit]:
+            print(f"  {key}")
+        if args.gaps:
+            free = set(free)
+            busy = [key for key in index.keys if key not in free]
+            for key in busy[:args.limit]:
+                windows = index.free_windows(key, args.check_in, args.check_out, args.gaps)
+                print(f"  {key}: " + (', '.join(f"{a}..{b}" for a, b in windows) or 'no free window'))
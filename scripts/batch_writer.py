@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Adaptive, concurrent batch writer for bulk Supabase writes
+Used by import_properties.py; batches are sized by payload bytes and written
+on a small worker pool, with retries and bisection of failing batches.
+"""
+
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+
+
+class BatchWriter:
+    """Group rows into batches by payload size and write them on a worker pool.
+
+    write_fn(rows) performs one request and returns its result. At most
+    max_in_flight requests run at once; add() blocks when the pool is full,
+    so producers never run far ahead of the database. A batch that still
+    fails after its retries is split in half until the bad rows are isolated;
+    those are collected in `failed` instead of aborting the load.
+
+    on_success(items, result) is called once per written batch with the
+    (row, context) pairs that went into it. Calls are queued by the workers
+    and made on the calling thread from add() and close(), never under the
+    writer's lock, so a callback may itself feed another BatchWriter.
+    """
+
+    def __init__(self, write_fn: Callable[[List[dict]], Any], label: str = 'rows',
+                 max_batch_bytes: int = 256 * 1024, max_batch_rows: int = 1000,
+                 max_in_flight: int = 4, max_retries: int = 3, backoff: float = 0.5,
+                 on_success: Optional[Callable[[List[Tuple[dict, Any]], Any], None]] = None):
+        self.write_fn = write_fn
+        self.label = label
+        self.max_batch_bytes = max_batch_bytes
+        self.max_batch_rows = max_batch_rows
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.on_success = on_success
+
+        self.written = 0
+        self.requests = 0
+        self.failed: List[Tuple[dict, str]] = []
+
+        self._items: List[Tuple[dict, Any]] = []
+        self._bytes = 0
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_in_flight)
+        self._futures = []
+        self._done: List[Tuple[List[Tuple[dict, Any]], Any]] = []
+        self._started = None
+
+    def add(self, row: dict, context: Any = None):
+        """Queue a row; context is passed back to on_success with it"""
+        self._run_callbacks()
+        size = len(json.dumps(row, default=str, ensure_ascii=False).encode('utf-8')) + 1
+        if self._items and (self._bytes + size > self.max_batch_bytes or len(self._items) >= self.max_batch_rows):
+            self.flush()
+        self._items.append((row, context))
+        self._bytes += size
+
+    def flush(self):
+        """Submit the rows queued so far as one batch"""
+        if not self._items:
+            return
+        items, self._items, self._bytes = self._items, [], 0
+        if self._started is None:
+            self._started = time.monotonic()
+
+        self._slots.acquire()
+        future = self._pool.submit(self._write, items)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+
+    def close(self) -> dict:
+        """Write what is left, wait for all requests and report throughput"""
+        self.flush()
+        for future in self._futures:
+            future.result()
+        self._pool.shutdown()
+        self._run_callbacks()
+
+        elapsed = time.monotonic() - self._started if self._started else 0.0
+        rate = self.written / elapsed if elapsed > 0 else 0.0
+        print(f"  Wrote {self.written} {self.label} in {self.requests} requests, "
+              f"{elapsed:.1f}s ({rate:.0f} {self.label}/s)")
+        if self.failed:
+            print(f"  {len(self.failed)} {self.label} failed:")
+            for row, error in self.failed[:10]:
+                print(f"    - {row.get('slug') or row.get('property_id') or row}: {error}")
+            if len(self.failed) > 10:
+                print(f"    ... and {len(self.failed) - 10} more")
+
+        return {'written': self.written, 'failed': len(self.failed),
+                'requests': self.requests, 'seconds': elapsed, 'rows_per_second': rate}
+
+    def _write(self, items: List[Tuple[dict, Any]], retries: Optional[int] = None):
+        rows = [row for row, _ in items]
+        retries = self.max_retries if retries is None else retries
+        error = None
+
+        for attempt in range(retries + 1):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                with self._lock:
+                    self.requests += 1
+                result = self.write_fn(rows)
+                break
+            except Exception as e:
+                error = e
+        else:
+            if len(items) > 1:
+                # Bisect to keep the good rows and isolate the bad one; the halves
+                # get a single retry since the full batch already backed off
+                middle = len(items) // 2
+                self._write(items[:middle], retries=1)
+                self._write(items[middle:], retries=1)
+            else:
+                with self._lock:
+                    self.failed.append((rows[0], str(error)))
+            return
+
+        with self._lock:
+            self.written += len(rows)
+            if self.on_success:
+                self._done.append((items, result))
+
+    def _run_callbacks(self):
+        """Hand the batches written so far to on_success, on the calling thread"""
+        with self._lock:
+            done, self._done = self._done, []
+        for items, result in done:
+            self.on_success(items, result)
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Benchmark the property import pipeline on synthetic owner workbooks
+Usage: python scripts/bench_import.py [--sizes 1000 10000 100000] [--save-baseline FILE] [--compare FILE]
+
+Each size runs in its own process so peak RSS is per size. Stages timed:
+workbook load, field parsing, slugging, JSON write and the batched database
+write against an in-process stand-in for Supabase.
+"""
+
+import json
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import openpyxl
+
+from import_properties import (
+    JsonArrayWriter,
+    SlugAllocator,
+    assign_slugs,
+    build_records,
+    normalize_rows,
+    parse_rows,
+    read_rows,
+    slug_bases,
+    sync_properties,
+)
+
+
+# Raw cell values in the shape owner sheets deliver them, including the
+# heavy repetition of markers like "✅" and "n/a"
+SAMPLE_VALUES = {
+    'price': ["50,000.-", "CHF 18'000.00", "n/a", "Single room: CHF 18'000.00\nDouble room: CHF 24'000.00",
+              "CHF 35'000.-", "12000", 12000, 8500.0, None, "on request", "CHF 4'200 per night"],
+    'distance': ["400m", "1.7km", "n/a", "5", "1200", "250 meters", "2 km walk", 0.8, None, "3.5 km"],
+    'int': [1, 2, 3, 4.0, "34 hotel rooms", "2-3", None, "6 guests", "n/a"],
+    'availability': ["✅", "❌", "☑", "yes", "no", "booked", "Available", None, "n/a", "tbc"],
+}
+
+STREETS = ['Promenade', 'Talstrasse', 'Alte Flüelastrasse', 'Bahnhofstrasse', 'Alexander Spengler Strasse',
+           'Dischmastrasse', 'Mattastrasse', 'Brämabüelstrasse', 'Scalettastrasse', 'Obere Strasse']
+PLACES = ['7270 Davos Platz', '7260 Davos Dorf', '7250 Klosters', '7272 Davos Clavadel', '']
+TYPES = ['Apartment', 'apartments', 'Chalet', 'Studio', 'Hotel room', 'House', 'Room', 'Gruppenhaus']
+
+# Seconds the database stand-in sleeps per request and per KB of payload, roughly a hosted PostgREST
+DB_REQUEST_LATENCY = 0.02
+DB_LATENCY_PER_KB = 0.0002
+
+# Slowdown (relative) that counts as a regression when comparing against a baseline
+REGRESSION_THRESHOLD = 0.2
+
+
+def make_workbook(path: Path, rows: int, seed: int = 7):
+    """Write a synthetic owner sheet with messy values like the real ones"""
+    rnd = random.Random(seed)
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(['Type', 'Address', 'Bedrooms', 'Bathrooms', 'Guests', 'WEF Price', 'Cleaning', 'Deposit',
+               'Distance', 'Available', 'Website', 'Owner'])
+
+    for i in range(rows):
+        place = rnd.choice(PLACES)
+        address = f"{rnd.choice(STREETS)} {rnd.randint(1, 80)}{rnd.choice(['', 'a', 'b'])}"
+        if place:
+            address += rnd.choice([', ', '\n']) + place
+        ws.append([
+            rnd.choice(TYPES) if rnd.random() > 0.002 else None,
+            address if rnd.random() > 0.005 else None,
+            rnd.choice(SAMPLE_VALUES['int']),
+            rnd.choice(SAMPLE_VALUES['int']),
+            rnd.choice(SAMPLE_VALUES['int']),
+            rnd.choice(SAMPLE_VALUES['price']),
+            rnd.choice(SAMPLE_VALUES['price']),
+            rnd.choice(SAMPLE_VALUES['price']),
+            rnd.choice(SAMPLE_VALUES['distance']),
+            rnd.choice(SAMPLE_VALUES['availability']),
+            f"https://beststaydavos.ch/property/{i}/" if rnd.random() < 0.3 else None,
+            rnd.choice([None, 'Owner A', 'Agency B', 'Owner C +41 79 000 00 00']),
+        ])
+    wb.save(path)
+
+
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    def __init__(self, db, table):
+        self.db, self.table = db, table
+        self.op, self.rows, self.range_ = 'select', None, None
+
+    def select(self, *_args, **_kwargs):
+        return self
+
+    def order(self, *_args, **_kwargs):
+        return self
+
+    def range(self, start, end):
+        self.range_ = (start, end)
+        return self
+
+    def eq(self, *_args):
+        return self
+
+    def in_(self, *_args):
+        return self
+
+    def delete(self):
+        self.op = 'delete'
+        return self
+
+    def insert(self, rows, **_kwargs):
+        self.op, self.rows = 'insert', rows
+        return self
+
+    def upsert(self, rows, **_kwargs):
+        self.op, self.rows = 'upsert', rows
+        return self
+
+    def update(self, values):
+        self.op, self.rows = 'update', [values]
+        return self
+
+    def execute(self):
+        payload = len(json.dumps(self.rows, default=str)) if self.rows else 0
+        time.sleep(DB_REQUEST_LATENCY + DB_LATENCY_PER_KB * payload / 1024)
+
+        table = self.db.tables.setdefault(self.table, {})
+        if self.op == 'select':
+            start, end = self.range_ or (0, len(table))
+            return _Result(list(table.values())[start:end + 1])
+        if self.op in ('insert', 'upsert'):
+            written = []
+            with self.db.lock:
+                for row in self.rows:
+                    key = row.get('slug') or str(uuid.uuid4())
+                    stored = dict(table.get(key, {'id': str(uuid.uuid4())}), **row)
+                    table[key] = stored
+                    written.append(stored)
+            return _Result(written)
+        return _Result([])
+
+
+class LocalSupabase:
+    """Minimal in-process stand-in for the Supabase client with simulated request latency"""
+
+    def __init__(self):
+        self.tables = {}
+        self.lock = threading.Lock()
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_size(rows: int, workdir: Path) -> Dict[str, dict]:
+    """Run every stage once on a workbook of `rows` rows and return timings"""
+    workbook = workdir / f"bench_{rows}.xlsx"
+    if not workbook.exists():
+        make_workbook(workbook, rows)
+
+    results = {}
+
+    def timed(stage: str, fn):
+        start = time.perf_counter()
+        value = fn()
+        elapsed = time.perf_counter() - start
+        results[stage] = {'seconds': elapsed, 'rows_per_second': rows / elapsed if elapsed else 0.0}
+        return value
+
+    errors = []
+    raw = timed('load', lambda: list(read_rows(str(workbook), stream=True)))
+    parsed = timed('parse', lambda: list(normalize_rows(parse_rows(raw, errors), errors)))
+    slugged = timed('slug', lambda: list(assign_slugs(slug_bases(parsed), SlugAllocator())))
+
+    def write_json():
+        properties_out = JsonArrayWriter(workdir / f"bench_{rows}_properties.json")
+        pricing_out = JsonArrayWriter(workdir / f"bench_{rows}_pricing.json")
+        records = []
+        for fields, slug in slugged:
+            prop, pricing = build_records(fields, slug)
+            properties_out.write(prop)
+            if pricing:
+                pricing_out.write(pricing)
+            records.append((prop, pricing))
+        properties_out.commit()
+        pricing_out.commit()
+        return records
+
+    records = timed('json_write', write_json)
+    timed('db_write', lambda: sync_properties(LocalSupabase(), records))
+
+    results['total'] = {'seconds': sum(r['seconds'] for r in results.values()), 'rows_per_second': 0.0}
+    results['total']['rows_per_second'] = rows / results['total']['seconds']
+    results['peak_rss_mb'] = {'value': peak_rss_mb()}
+    return results
+
+
+def print_results(all_results: Dict[str, Dict[str, dict]], baseline: Optional[dict] = None) -> List[str]:
+    """Print a table per size; returns the stages that regressed against the baseline"""
+    regressions = []
+    for size, results in all_results.items():
+        print(f"\n{'='*64}")
+        print(f"{size} rows (peak RSS {results['peak_rss_mb']['value']:.0f} MB)")
+        print(f"{'='*64}")
+        print(f"{'stage':<12}{'seconds':>10}{'rows/s':>12}{'vs baseline':>14}")
+
+        for stage, r in results.items():
+            if stage == 'peak_rss_mb':
+                continue
+            delta = ''
+            base = (baseline or {}).get(size, {}).get(stage)
+            if base and base['seconds']:
+                change = r['seconds'] / base['seconds'] - 1
+                delta = f"{change:+.0%}"
+                if change > REGRESSION_THRESHOLD and stage != 'total':
+                    delta += ' !'
+                    regressions.append(f"{size} rows / {stage}: {change:+.0%}")
+            print(f"{stage:<12}{r['seconds']:>10.3f}{r['rows_per_second']:>12.0f}{delta:>14}")
+    return regressions
+
+
+def main(sizes: List[int], workdir: Optional[Path] = None, save_baseline: Optional[Path] = None,
+         compare: Optional[Path] = None) -> int:
+    workdir = Path(workdir or tempfile.mkdtemp(prefix='bench_import_'))
+    workdir.mkdir(parents=True, exist_ok=True)
+    print(f"Working directory: {workdir}")
+
+    all_results = {}
+    for rows in sizes:
+        print(f"Running {rows} rows...")
+        out = subprocess.run(
+            [sys.executable, __file__, '--run-one', str(rows), '--workdir', str(workdir)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        all_results[str(rows)] = json.loads(out.strip().splitlines()[-1])
+
+    baseline = None
+    if compare:
+        with open(compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    regressions = print_results(all_results, baseline)
+
+    if save_baseline:
+        with open(save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(all_results, f, indent=2)
+        print(f"\nBaseline saved to: {save_baseline}")
+
+    if regressions:
+        print(f"\nRegressions (> {REGRESSION_THRESHOLD:.0%} slower):")
+        for r in regressions:
+            print(f"  - {r}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the property import pipeline')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='Workbook sizes (rows) to benchmark')
+    parser.add_argument('--workdir', type=Path, default=None,
+                        help='Where to keep generated workbooks (reused between runs)')
+    parser.add_argument('--save-baseline', type=Path, default=None,
+                        help='Save results as a baseline JSON file')
+    parser.add_argument('--compare', type=Path, default=None,
+                        help='Compare against a saved baseline and exit 1 on regressions')
+    parser.add_argument('--run-one', type=int, default=None, help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.run_one is not None:
+        # Child process: print the results of one size as JSON; the import stages print their own progress
+        import contextlib
+        import io
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = run_size(args.run_one, args.workdir)
+        print(json.dumps(result))
+    else:
+        sys.exit(main(args.sizes, workdir=args.workdir, save_baseline=args.save_baseline, compare=args.compare))
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Geocode property addresses and measure their distance to the Congress Centre
+Usage: python scripts/geocoding.py ADDRESS ... [--backend gazetteer|nominatim] [--no-cache]
+       python scripts/geocoding.py --build-gazetteer EXTRACT.osm
+
+Addresses are resolved by a pluggable backend:
+- gazetteer (default, offline): data/gazetteer.json, built from an OSM
+  extract of the region with --build-gazetteer, plus the built-in centres of
+  the Davos and Klosters postcodes. An address resolves to its house, else
+  its street, else its postcode or locality;
+- nominatim: the public OpenStreetMap search API, one request per second.
+Results (misses too) are kept in data/geocode_cache.json keyed by the
+normalized address, so a re-import makes no lookups. The cache belongs to one
+backend version and starts over when the gazetteer changes.
+
+Distances are great-circle (haversine) kilometres, computed for a whole batch
+of coordinates at once.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import urlencode
+
+try:
+    import numpy as np
+except ImportError:
+    print("Installing required packages...")
+    import subprocess
+    subprocess.check_call([sys.executable, '-m', 'pip', 'install', 'numpy', '-q'])
+    import numpy as np
+
+
+DATA_DIR = Path(__file__).parent.parent / 'data'
+GAZETTEER_FILE = DATA_DIR / 'gazetteer.json'
+CACHE_FILE = DATA_DIR / 'geocode_cache.json'
+
+# Davos Congress Centre, Talstrasse 49a, 7270 Davos Platz
+CONGRESS_CENTRE = (46.79615, 9.82325)
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Centres of the postcodes and localities listings are in, used when the street is not known
+PLACES = {
+    '7260': (46.81195, 9.84040),
+    '7265': (46.83240, 9.86740),
+    '7270': (46.79530, 9.82280),
+    '7272': (46.77330, 9.81440),
+    '7276': (46.77370, 9.78690),
+    '7277': (46.74690, 9.77850),
+    '7249': (46.88030, 9.84240),
+    '7250': (46.86960, 9.88190),
+    '7252': (46.88320, 9.87450),
+    'davos dorf': (46.81195, 9.84040),
+    'davos wolfgang': (46.83240, 9.86740),
+    'davos platz': (46.79530, 9.82280),
+    'davos clavadel': (46.77330, 9.81440),
+    'davos frauenkirch': (46.77370, 9.78690),
+    'davos glaris': (46.74690, 9.77850),
+    'davos': (46.80240, 9.83320),
+    'serneus': (46.88030, 9.84240),
+    'klosters platz': (46.86960, 9.88190),
+    'klosters dorf': (46.88320, 9.87450),
+    'klosters': (46.87330, 9.87980),
+}
+
+# Match quality, best first
+ADDRESS = 'address'
+STREET = 'street'
+POSTCODE = 'postcode'
+LOCALITY = 'locality'
+
+POSTCODE_RE = re.compile(r'\b(?:ch-?)?(\d{4})\b')
+# Longest names first, so 'davos platz' wins over 'davos'
+LOCALITY_RE = re.compile(r'\b(' + '|'.join(sorted((p for p in PLACES if not p.isdigit()), key=len, reverse=True)) + r')\b')
+HOUSE_NUMBER_RE = re.compile(r'^(.*?[a-z].*?)\s+(\d+\s?[a-z]?)$')
+
+
+class Location(NamedTuple):
+    lat: float
+    lon: float
+    precision: str
+
+
+class Query(NamedTuple):
+    """An address split into the parts backends match on"""
+    street: str
+    number: str
+    postcode: str
+    locality: str
+
+    @property
+    def key(self) -> str:
+        """Normalized address, the cache key"""
+        place = ' '.join(part for part in (self.postcode, self.locality) if part)
+        return ', '.join(part for part in (f"{self.street} {self.number}".strip(), place) if part)
+
+
+def fold(text: str) -> str:
+    """Lowercase ASCII text with accents and punctuation removed (ß as ss, like street signs)"""
+    text = unicodedata.normalize('NFKD', str(text).replace('ß', 'ss').replace('ẞ', 'ss'))
+    text = text.encode('ascii', 'ignore').decode('ascii').lower()
+    text = re.sub(r'[^a-z0-9,;\n-]+', ' ', text)
+    return re.sub(r'[ \t]+', ' ', text).strip()
+
+
+def street_key(street: str) -> str:
+    """Street name as compared: 'Alexander-Spengler-Str.' and 'alexander spengler strasse' are the same"""
+    street = re.sub(r'\bstr\b', 'strasse', fold(street).replace('.', ' '))
+    return re.sub(r'[^a-z0-9]', '', street)
+
+
+def parse_address(address: str, city: Optional[str] = None) -> Query:
+    """Split an address into street, house number, postcode and locality.
+
+    city is the locality to assume when the address names neither a postcode
+    nor a known place.
+    """
+    text = fold(address)
+    postcode = ''
+    match = POSTCODE_RE.search(text)
+    if match:
+        postcode = match.group(1)
+        text = text[:match.start()] + ' ' + text[match.end():]
+    locality = ''
+    match = LOCALITY_RE.search(text)
+    if match:
+        locality = match.group(1)
+        text = text[:match.start()] + ' ' + text[match.end():]
+    if not postcode and not locality and city:
+        locality = fold(city)
+
+    street = ''
+    number = ''
+    parts = [part.strip(' -') for part in re.split(r'[,;\n]', text)]
+    for part in parts:
+        if part:
+            street = part
+            break
+    match = HOUSE_NUMBER_RE.match(street)
+    if match:
+        street, number = match.group(1), match.group(2).replace(' ', '')
+    street = re.sub(r'\bstr\b', 'strasse', re.sub(r'[\s-]+', ' ', street)).strip()
+    return Query(street, number, postcode, locality)
+
+
+def haversine_km(lat, lon, origin: Tuple[float, float] = CONGRESS_CENTRE) -> np.ndarray:
+    """Great-circle distances in km from origin to arrays of coordinates (NaN stays NaN)"""
+    lat1, lon1 = np.radians(origin[0]), np.radians(origin[1])
+    lat2, lon2 = np.radians(np.asarray(lat, dtype=float)), np.radians(np.asarray(lon, dtype=float))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class GazetteerBackend:
+    """Offline lookups in a gazetteer of house numbers and streets, falling back to place centres"""
+
+    name = 'gazetteer'
+
+    def __init__(self, path: Optional[Path] = GAZETTEER_FILE):
+        self.streets: Dict[str, dict] = {}
+        self.places = dict(PLACES)
+        digest = hashlib.sha1(json.dumps(PLACES, sort_keys=True).encode('utf-8'))
+        if path and Path(path).exists():
+            data = Path(path).read_bytes()
+            digest.update(data)
+            gazetteer = json.loads(data)
+            self.streets = gazetteer.get('streets', {})
+            self.places.update({name: tuple(coords) for name, coords in gazetteer.get('places', {}).items()})
+        self.version = f"{self.name}:{digest.hexdigest()[:16]}"
+
+    def lookup(self, query: Query) -> Optional[Location]:
+        street = self.streets.get(street_key(query.street)) if query.street else None
+        if street:
+            coords = street['numbers'].get(query.number) if query.number else None
+            if coords:
+                return Location(coords[0], coords[1], ADDRESS)
+            return Location(street['center'][0], street['center'][1], STREET)
+        for name, precision in ((query.postcode, POSTCODE), (query.locality, LOCALITY)):
+            if name in self.places:
+                lat, lon = self.places[name]
+                return Location(lat, lon, precision)
+        return None
+
+
+class NominatimBackend:
+    """Online lookups through the OpenStreetMap Nominatim search API (at most one request a second)"""
+
+    name = 'nominatim'
+    version = 'nominatim:1'
+    url = 'https://nominatim.openstreetmap.org/search'
+    user_agent = 'BestStayDavos-import/1.0 (property geocoding)'
+
+    def __init__(self, delay: float = 1.0):
+        self.delay = delay
+        self._last = 0.0
+
+    def lookup(self, query: Query) -> Optional[Location]:
+        import http_client
+
+        params = {'street': f"{query.number} {query.street}".strip(), 'postalcode': query.postcode,
+                  'city': query.locality, 'countrycodes': 'ch', 'format': 'jsonv2', 'limit': 1}
+        wait = self._last + self.delay - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        response = http_client.get(f"{self.url}?{urlencode({k: v for k, v in params.items() if v})}",
+                                   headers={'User-Agent': self.user_agent}, timeout=30)
+        self._last = time.monotonic()
+        try:
+            response.raise_for_status()
+            results = json.loads(response.text)
+        finally:
+            response.close()
+        if not results:
+            return None
+        result = results[0]
+        precision = {'house': ADDRESS, 'building': ADDRESS, 'road': STREET, 'postcode': POSTCODE}.get(
+            result.get('addresstype'), LOCALITY)
+        return Location(float(result['lat']), float(result['lon']), precision)
+
+
+BACKENDS = {'gazetteer': GazetteerBackend, 'nominatim': NominatimBackend}
+
+
+class Geocoder:
+    """A backend behind a persistent cache keyed by normalized address"""
+
+    def __init__(self, backend=None, cache_path: Optional[Path] = CACHE_FILE):
+        self.backend = backend or GazetteerBackend()
+        self.cache_path = cache_path
+        self.entries: Dict[str, Optional[list]] = {}
+        self.hits = 0
+        self.lookups = 0
+        self.dirty = False
+        if cache_path and Path(cache_path).exists():
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('backend') == self.backend.version:
+                self.entries = data['entries']
+
+    def locate(self, query: Query) -> Optional[Location]:
+        """Location of one parsed address, from the cache or the backend"""
+        key = query.key
+        if key in self.entries:
+            self.hits += 1
+            entry = self.entries[key]
+        else:
+            self.lookups += 1
+            try:
+                location = self.backend.lookup(query)
+            except Exception as e:
+                # Not cached, so the next run asks again
+                print(f"  Geocoding failed for {key!r}: {e}")
+                return None
+            entry = self.entries[key] = list(location) if location else None
+            self.dirty = True
+        return Location(*entry) if entry else None
+
+    def locate_many(self, addresses: Sequence[str], cities: Optional[Sequence[Optional[str]]] = None
+                    ) -> Tuple[np.ndarray, np.ndarray, List[Optional[str]]]:
+        """(lat, lon, precision) arrays for many addresses; NaN and None where unresolved"""
+        cities = cities if cities is not None else [None] * len(addresses)
+        lat = np.full(len(addresses), np.nan)
+        lon = np.full(len(addresses), np.nan)
+        precision: List[Optional[str]] = [None] * len(addresses)
+        for i, (address, city) in enumerate(zip(addresses, cities)):
+            location = self.locate(parse_address(address, city))
+            if location:
+                lat[i], lon[i], precision[i] = location
+        return lat, lon, precision
+
+    def distances(self, addresses: Sequence[str], cities: Optional[Sequence[Optional[str]]] = None,
+                  origin: Tuple[float, float] = CONGRESS_CENTRE) -> np.ndarray:
+        """Kilometres from origin to each address (NaN where it could not be resolved)"""
+        lat, lon, _ = self.locate_many(addresses, cities)
+        return haversine_km(lat, lon, origin)
+
+    def save(self):
+        if not self.dirty or not self.cache_path:
+            return
+        Path(self.cache_path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = Path(self.cache_path).with_name(Path(self.cache_path).name + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'backend': self.backend.version, 'entries': self.entries}, f, ensure_ascii=False,
+                      separators=(',', ':'))
+        os.replace(tmp_file, self.cache_path)
+        self.dirty = False
+
+    def summary(self) -> str:
+        return f"{self.hits} cached, {self.lookups} looked up with {self.backend.name}"
+
+
+def build_gazetteer(extract_path: Path, output_path: Path = GAZETTEER_FILE) -> dict:
+    """Write a gazetteer of the addr:* tagged nodes and buildings, named streets and places of an .osm extract"""
+    coords: Dict[str, Tuple[float, float]] = {}
+    streets: Dict[str, dict] = {}
+    street_nodes: Dict[str, List[Tuple[float, float]]] = {}
+    places: Dict[str, Tuple[float, float]] = {}
+
+    def add_address(tags: dict, point: Tuple[float, float]):
+        key = street_key(tags['addr:street'])
+        street = streets.setdefault(key, {'name': tags['addr:street'], 'numbers': {}})
+        if tags.get('addr:housenumber'):
+            street['numbers'][fold(tags['addr:housenumber']).replace(' ', '')] = [round(point[0], 6),
+                                                                                    round(point[1], 6)]
+        street_nodes.setdefault(key, []).append(point)
+
+    for _, element in ET.iterparse(extract_path, events=('end',)):
+        if element.tag not in ('node', 'way'):
+            continue
+        tags = {tag.get('k'): tag.get('v') for tag in element.findall('tag')}
+        if element.tag == 'node':
+            point = (float(element.get('lat')), float(element.get('lon')))
+            coords[element.get('id')] = point
+        else:
+            points = [coords[nd.get('ref')] for nd in element.findall('nd') if nd.get('ref') in coords]
+            point = (sum(p[0] for p in points) / len(points), sum(p[1] for p in points) / len(points)) if points else None
+        if point:
+            if tags.get('addr:street'):
+                add_address(tags, point)
+            elif element.tag == 'way' and tags.get('highway') and tags.get('name'):
+                street_nodes.setdefault(street_key(tags['name']), []).append(point)
+                streets.setdefault(street_key(tags['name']), {'name': tags['name'], 'numbers': {}})
+            if tags.get('place') and tags.get('name'):
+                places[fold(tags['name'])] = (round(point[0], 6), round(point[1], 6))
+        element.clear()
+
+    for key, street in streets.items():
+        points = np.array(street_nodes[key])
+        street['center'] = [round(float(points[:, 0].mean()), 6), round(float(points[:, 1].mean()), 6)]
+
+    gazetteer = {'source': Path(extract_path).name, 'streets': streets, 'places': places}
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(gazetteer, f, ensure_ascii=False, separators=(',', ':'))
+    numbers = sum(len(s['numbers']) for s in streets.values())
+    print(f"Gazetteer: {len(streets)} streets, {numbers} house numbers, {len(places)} places -> {output_path}")
+    return gazetteer
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Geocode addresses and measure their distance to the Congress Centre')
+    parser.add_argument('addresses', nargs='*', help='Addresses to resolve')
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='gazetteer', help='Geocoding backend')
+    parser.add_argument('--no-cache', action='store_true', help='Neither read nor write data/geocode_cache.json')
+    parser.add_argument('--build-gazetteer', type=Path, metavar='EXTRACT',
+                        help='Build data/gazetteer.json from an OpenStreetMap .osm extract')
+
+    args = parser.parse_args()
+    if args.build_gazetteer:
+        build_gazetteer(args.build_gazetteer)
+    if args.addresses:
+        geocoder = Geocoder(BACKENDS[args.backend](), cache_path=None if args.no_cache else CACHE_FILE)
+        lat, lon, precision = geocoder.locate_many(args.addresses)
+        distances = haversine_km(lat, lon)
+        for address, a, b, p, d in zip(args.addresses, lat, lon, precision, distances):
+            where = f"{a:.5f}, {b:.5f} ({p}) {d:.2f} km" if p else 'not found'
+            print(f"  {address}: {where}")
+        geocoder.save()
+        print(f"Geocoding: {geocoder.summary()}")
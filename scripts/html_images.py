@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Single-pass image candidate extraction for the scraper scripts
+Replaces building a BeautifulSoup tree and searching it once per pattern:
+an HTMLParser subclass (the tokenizer BeautifulSoup's html.parser builder
+uses) collects every candidate in one pass and can be fed the page in
+chunks as they arrive.
+"""
+
+import re
+from html.parser import HTMLParser
+from typing import Dict, Iterable, List, Optional, Union
+
+
+STYLE_URL_RE = re.compile(r'url\(["\']?([^"\')\s]+)["\']?\)')
+
+# img attributes either scraper looks at
+IMG_ATTRIBUTES = ('src', 'data-src', 'data-lazy-src', 'srcset', 'data-srcset')
+
+
+class ImageCandidateParser(HTMLParser):
+    """Collect image URL candidates by where they appear, in document order.
+
+    - imgs: the IMG_ATTRIBUTES of each <img> (missing ones left out)
+    - styles: every style attribute
+    - srcsets: srcset of <source> and <img>
+    - data_images, data_fulls: data-image / data-full attributes of any element
+
+    Duplicate attributes keep their last value and valueless attributes
+    count as '', as in BeautifulSoup.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.imgs: List[Dict[str, str]] = []
+        self.styles: List[str] = []
+        self.srcsets: List[str] = []
+        self.data_images: List[str] = []
+        self.data_fulls: List[str] = []
+
+    def handle_starttag(self, tag: str, attrs: List[tuple]):
+        if not attrs:
+            return
+        values = {name: value or '' for name, value in attrs}
+
+        if tag == 'img':
+            self.imgs.append({name: values[name] for name in IMG_ATTRIBUTES if name in values})
+        if 'style' in values:
+            self.styles.append(values['style'])
+        if tag in ('source', 'img') and 'srcset' in values:
+            self.srcsets.append(values['srcset'])
+        if 'data-image' in values:
+            self.data_images.append(values['data-image'])
+        if 'data-full' in values:
+            self.data_fulls.append(values['data-full'])
+
+
+def parse_candidates(html: Union[str, Iterable[str]]) -> ImageCandidateParser:
+    """Run the parser over a page given whole or as an iterable of text chunks"""
+    parser = ImageCandidateParser()
+    for chunk in ([html] if isinstance(html, str) else html):
+        parser.feed(chunk)
+    parser.close()
+    return parser
+
+
+def style_urls(style: str) -> List[str]:
+    return STYLE_URL_RE.findall(style)
+
+
+def srcset_urls(srcset: str) -> List[Optional[str]]:
+    """First token of each srcset candidate ("url 100w, url2 2x"); None for empty candidates"""
+    return [part.strip().split()[0] if part.strip() else None for part in srcset.split(',')]
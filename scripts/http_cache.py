@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Conditional-GET cache for the scraper scripts
+Stores ETag/Last-Modified per URL in data/http_cache/index.json. Pages are
+kept in the cache directory; images are validated against the file they were
+downloaded to. Within the TTL nothing is requested; after it, the server is
+asked with If-None-Match/If-Modified-Since and a 304 keeps the local copy.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from email.utils import formatdate
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+import http_client
+
+
+CACHE_DIR = Path(__file__).parent.parent / 'data' / 'http_cache'
+DEFAULT_TTL = 3600
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+
+class HttpCache:
+    """Validators and page bodies per URL, with a TTL and size-bounded LRU eviction.
+
+    Only page bodies stored in the cache directory count towards max_bytes and
+    are deleted on eviction; downloaded images are never removed, their entries
+    just record the validators for the file at `path`.
+    """
+
+    def __init__(self, cache_dir: Path = CACHE_DIR, ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.index_path = self.cache_dir / 'index.json'
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {'fresh': 0, 'not_modified': 0, 'fetched': 0}
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = {}
+
+        if self.index_path.exists():
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+
+    def fresh(self, url: str, path: Path) -> bool:
+        """True when the local copy was fetched or validated less than ttl seconds ago"""
+        entry = self._entry(url, path)
+        if entry and time.time() - entry['validated_at'] < self.ttl:
+            self._count('fresh', entry)
+            return True
+        return False
+
+    def validators(self, url: str, path: Path) -> Dict[str, str]:
+        """Conditional request headers for the local copy of url at path (empty if there is none)"""
+        entry = self._entry(url, path)
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        elif path.exists():
+            # Downloaded before the cache existed: the file time is a safe lower bound
+            headers['If-Modified-Since'] = formatdate(path.stat().st_mtime, usegmt=True)
+        return headers
+
+    def not_modified(self, url: str, path: Path):
+        """Record a 304 for url, restarting its TTL"""
+        with self._lock:
+            entry = self._entries.setdefault(url, {'path': str(path), 'owned': False, 'size': path.stat().st_size})
+            entry['validated_at'] = time.time()
+        self._count('not_modified', entry)
+
+    def store(self, url: str, response: http_client.HttpResponse, path: Path, owned: bool = False):
+        """Record the validators of a 200 response whose body was written to path"""
+        entry = {
+            'path': str(path),
+            'owned': owned,
+            'size': path.stat().st_size,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'validated_at': time.time(),
+        }
+        with self._lock:
+            self._entries[url] = entry
+        self._count('fetched', entry)
+
+    def get_text(self, url: str, timeout: Optional[float] = None, revalidate: bool = False) -> str:
+        """GET a page through the cache and return its text"""
+        return ''.join(self.iter_text(url, timeout=timeout, revalidate=revalidate))
+
+    def iter_text(self, url: str, timeout: Optional[float] = None, chunk_size: int = 64 * 1024,
+                  revalidate: bool = False) -> Iterator[str]:
+        """GET a page through the cache, yielding its text in chunks as it arrives.
+
+        A fetched body is written to the cache while it streams and only
+        becomes the cached copy once it has been read to the end. revalidate
+        asks the server even when the cached copy is within its TTL.
+        """
+        path = self.cache_dir / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.html"
+        if not revalidate and self.fresh(url, path):
+            yield from _read_chunks(path, chunk_size)
+            return
+
+        response = http_client.get(url, headers=self.validators(url, path), timeout=timeout, stream=True)
+        try:
+            if response.status_code == 304 and path.exists():
+                self.not_modified(url, path)
+                yield from _read_chunks(path, chunk_size)
+                return
+            response.raise_for_status()
+
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    for text in response.iter_text(chunk_size):
+                        f.write(text)
+                        yield text
+                os.replace(tmp_name, path)
+            finally:
+                if os.path.exists(tmp_name):
+                    os.unlink(tmp_name)
+        finally:
+            response.close()
+        self.store(url, response, path, owned=True)
+
+    def save(self):
+        """Evict least recently used page bodies over max_bytes and write the index"""
+        with self._lock:
+            entries = {url: e for url, e in self._entries.items() if Path(e['path']).exists()}
+
+            owned = sorted((e['accessed_at'], url) for url, e in entries.items() if e['owned'])
+            total = sum(entries[url]['size'] for _, url in owned)
+            for _, url in owned:
+                if total <= self.max_bytes:
+                    break
+                entry = entries.pop(url)
+                Path(entry['path']).unlink(missing_ok=True)
+                total -= entry['size']
+
+            self._entries = entries
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.index_path.with_name(self.index_path.name + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, separators=(',', ':'))
+            os.replace(tmp_path, self.index_path)
+
+    def summary(self) -> str:
+        return (f"{self.stats['fresh']} fresh, {self.stats['not_modified']} not modified, "
+                f"{self.stats['fetched']} fetched")
+
+    def _entry(self, url: str, path: Path) -> Optional[dict]:
+        entry = self._entries.get(url)
+        if not entry or entry['path'] != str(path):
+            return None
+        try:
+            # A local copy edited or replaced since it was cached cannot be revalidated
+            if path.stat().st_size != entry['size']:
+                return None
+        except FileNotFoundError:
+            return None
+        return entry
+
+    def _count(self, outcome: str, entry: dict):
+        with self._lock:
+            self.stats[outcome] += 1
+            entry['accessed_at'] = time.time()
+
+
+def _read_chunks(path: Path, chunk_size: int) -> Iterator[str]:
+    with open(path, 'r', encoding='utf-8') as f:
+        while True:
+            text = f.read(chunk_size)
+            if not text:
+                return
+            yield text
+
+
+_cache: Optional[HttpCache] = None
+_cache_options: dict = {}
+_cache_enabled = True
+_cache_lock = threading.Lock()
+
+
+def configure(enabled: bool = True, **options):
+    """Enable or disable the shared cache and set its options (ttl, max_bytes, cache_dir)"""
+    global _cache, _cache_enabled
+    with _cache_lock:
+        _cache_enabled = enabled
+        _cache_options.update(options)
+        _cache = None
+
+
+def get_cache() -> Optional[HttpCache]:
+    """Return the process-wide cache, or None when caching is disabled"""
+    global _cache
+    with _cache_lock:
+        if _cache is None and _cache_enabled:
+            _cache = HttpCache(**_cache_options)
+        return _cache
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP client for the scraper scripts
+One pooled keep-alive session per process (HTTP/2 when httpx[http2] is
+installed), a central User-Agent and timeout, and retries with backoff on
+429/5xx and connection errors.
+"""
+
+import codecs
+import sys
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterator, Optional
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:
+    print("Installing required packages...")
+    import subprocess
+    subprocess.check_call([sys.executable, '-m', 'pip', 'install', 'requests', '-q'])
+    import requests
+    from requests.adapters import HTTPAdapter
+
+# HTTP/2 is optional: used only when httpx and h2 are both available
+try:
+    import httpx
+    import h2  # noqa: F401
+except ImportError:
+    httpx = None
+
+
+USER_AGENT = ('Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+DEFAULT_TIMEOUT = 30
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HttpResponse:
+    """Backend-independent view of a response (the subset the scrapers use)"""
+
+    def __init__(self, raw, backend: str):
+        self.raw = raw
+        self.backend = backend
+        self.status_code = raw.status_code
+        self.headers = raw.headers
+        self.url = str(raw.url)
+
+    @property
+    def content(self) -> bytes:
+        if self.backend == 'httpx':
+            return self.raw.read()
+        return self.raw.content
+
+    @property
+    def text(self) -> str:
+        if self.backend == 'httpx':
+            self.raw.read()
+        return self.raw.text
+
+    def iter_content(self, chunk_size: int = 8192) -> Iterator[bytes]:
+        if self.backend == 'httpx':
+            return self.raw.iter_bytes(chunk_size)
+        return self.raw.iter_content(chunk_size=chunk_size)
+
+    def iter_text(self, chunk_size: int = 64 * 1024) -> Iterator[str]:
+        """Decode the body incrementally, with the encoding `text` would use when the headers declare one"""
+        if self.backend == 'httpx':
+            yield from self.raw.iter_text(chunk_size)
+            return
+        decoder = codecs.getincrementaldecoder(self.raw.encoding or 'utf-8')(errors='replace')
+        for chunk in self.raw.iter_content(chunk_size=chunk_size):
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield tail
+
+    def raise_for_status(self):
+        self.raw.raise_for_status()
+
+    def close(self):
+        self.raw.close()
+
+
+class HttpClient:
+    """Pooled HTTP client with keep-alive and retry on transient failures.
+
+    Safe to share between threads; pool_size should be at least the number
+    of concurrent requests so connections are reused instead of reopened.
+    """
+
+    def __init__(self, pool_size: int = 16, timeout: float = DEFAULT_TIMEOUT, retries: int = 3,
+                 backoff: float = 0.5, user_agent: str = USER_AGENT, http2: bool = True):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        headers = {'User-Agent': user_agent}
+
+        if http2 and httpx is not None:
+            self.backend = 'httpx'
+            self._client = httpx.Client(
+                http2=True, headers=headers, follow_redirects=True,
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            )
+            self._transient = (httpx.TransportError,)
+        else:
+            self.backend = 'requests'
+            self._client = requests.Session()
+            self._client.headers.update(headers)
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            self._client.mount('http://', adapter)
+            self._client.mount('https://', adapter)
+            self._transient = (requests.ConnectionError, requests.Timeout)
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None,
+            stream: bool = False) -> HttpResponse:
+        """GET a URL, retrying 429/5xx and connection errors with exponential backoff"""
+        timeout = timeout or self.timeout
+
+        for attempt in range(self.retries + 1):
+            try:
+                if self.backend == 'httpx':
+                    request = self._client.build_request('GET', url, headers=headers, timeout=timeout)
+                    raw = self._client.send(request, stream=stream)
+                else:
+                    raw = self._client.get(url, headers=headers, timeout=timeout, stream=stream)
+            except self._transient:
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+
+            if raw.status_code in RETRY_STATUSES and attempt < self.retries:
+                delay = retry_after(raw.headers.get('Retry-After')) or self.backoff * 2 ** attempt
+                raw.close()
+                time.sleep(delay)
+                continue
+
+            return HttpResponse(raw, self.backend)
+
+    def close(self):
+        self._client.close()
+
+
+def retry_after(value: Optional[str], max_delay: float = 60.0) -> Optional[float]:
+    """Parse a Retry-After header (seconds or HTTP date), capped at max_delay"""
+    if not value:
+        return None
+    try:
+        delay = float(value)
+    except ValueError:
+        try:
+            delay = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(delay, 0.0), max_delay)
+
+
+_client: Optional[HttpClient] = None
+_client_options: dict = {}
+_client_lock = threading.Lock()
+
+
+def configure(**options):
+    """Set options (pool_size, timeout, retries, ...) for the shared client before first use"""
+    global _client
+    with _client_lock:
+        _client_options.update(options)
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+def get_client() -> HttpClient:
+    """Return the process-wide shared client, creating it on first use"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient(**_client_options)
+        return _client
+
+
+def get(url: str, **kwargs) -> HttpResponse:
+    """GET through the shared client"""
+    return get_client().get(url, **kwargs)
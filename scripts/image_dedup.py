@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Perceptual-hash near-duplicate detection for stored images
+Usage: python scripts/image_dedup.py [--max-distance N] [--dir DIR]
+
+Resized or re-encoded copies of a photo have different bytes, so the
+content-addressed store keeps them apart. A 64-bit difference hash (dHash)
+stays within a few bits for such copies; a multi-index hash table finds every
+image within a Hamming distance without comparing all pairs.
+"""
+
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from PIL import Image
+except ImportError:
+    print("Installing required packages...")
+    import subprocess
+    subprocess.check_call([sys.executable, '-m', 'pip', 'install', 'pillow', '-q'])
+    from PIL import Image
+
+from image_store import IMAGE_EXTENSIONS, ImageStore
+
+
+HASH_SIZE = 8
+# Bits (of 64) two hashes may differ by and still count as the same photo
+DEFAULT_MAX_DISTANCE = 6
+
+
+def dhash(path: Path, hash_size: int = HASH_SIZE) -> Tuple[int, int, int]:
+    """Return (hash, width, height) for an image file"""
+    with Image.open(path) as img:
+        width, height = img.size
+        # JPEGs are decoded at a reduced scale; the hash only needs a thumbnail
+        img.draft('L', (hash_size * 4, hash_size * 4))
+        small = img.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS)
+
+    pixels = small.tobytes()
+    bits = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(offset, offset + hash_size):
+            bits = (bits << 1) | (pixels[col] < pixels[col + 1])
+    return bits, width, height
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class MultiIndexHash:
+    """Index of 64-bit hashes for Hamming-radius queries (multi-index hashing).
+
+    The hash bits are split into max_distance + 1 disjoint ranges, each with
+    its own exact-match table. Two hashes within max_distance bits differ in
+    at most max_distance ranges, so they agree exactly on at least one; a
+    query only checks the few hashes sharing one of its range values.
+    """
+
+    def __init__(self, max_distance: int = DEFAULT_MAX_DISTANCE, bits: int = HASH_SIZE * HASH_SIZE):
+        self.max_distance = max_distance
+        parts = min(max_distance + 1, bits)
+        self._ranges = []
+        start = 0
+        for i in range(parts):
+            width = bits // parts + (i < bits % parts)
+            self._ranges.append((start, (1 << width) - 1))
+            start += width
+        self._tables: List[Dict[int, List[int]]] = [{} for _ in self._ranges]
+        self._values: List[Tuple[int, object]] = []
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def add(self, value: int, item) -> int:
+        """Index value with item; returns its position for replace()"""
+        position = len(self._values)
+        self._values.append((value, item))
+        for (shift, mask), table in zip(self._ranges, self._tables):
+            table.setdefault((value >> shift) & mask, []).append(position)
+        return position
+
+    def replace(self, position: int, value: int):
+        """Index a new value in place of the one at position, keeping its item"""
+        old, item = self._values[position]
+        for (shift, mask), table in zip(self._ranges, self._tables):
+            key = (old >> shift) & mask
+            table[key].remove(position)
+            if not table[key]:
+                del table[key]
+            table.setdefault((value >> shift) & mask, []).append(position)
+        self._values[position] = (value, item)
+
+    def search(self, value: int) -> List[Tuple[int, object]]:
+        """All (distance, item) within max_distance of value"""
+        candidates = set()
+        for (shift, mask), table in zip(self._ranges, self._tables):
+            candidates.update(table.get((value >> shift) & mask, ()))
+
+        found = []
+        for position in candidates:
+            other, item = self._values[position]
+            distance = hamming(value, other)
+            if distance <= self.max_distance:
+                found.append((distance, item))
+        return found
+
+
+def fingerprint(store: ImageStore, digest: str) -> Optional[Tuple[int, int, int]]:
+    """dHash and size of a stored blob, cached in the store index"""
+    blob = store.blobs[digest]
+    if 'dhash' not in blob:
+        try:
+            value, width, height = dhash(store.blob_path(digest))
+        except (OSError, ValueError):
+            return None
+        blob.update({'dhash': f"{value:016x}", 'width': width, 'height': height})
+    return int(blob['dhash'], 16), blob['width'], blob['height']
+
+
+def drop_near_duplicates(store: ImageStore, digests: Iterable[str],
+                         max_distance: int = DEFAULT_MAX_DISTANCE) -> Tuple[List[str], Dict[str, str]]:
+    """Keep one image per group of near-duplicates, in the original order.
+
+    The kept image takes the position of the group's first occurrence but is
+    its largest copy, so a thumbnail never wins over the full-size photo; the
+    group is matched against the hash of the copy kept so far.
+    Returns (kept digests, {dropped digest: digest kept instead}).
+    """
+    index = MultiIndexHash(max_distance)
+    kept: List[str] = []
+    pixels: List[int] = []
+    slots: List[Optional[int]] = []
+    dropped: Dict[str, str] = {}
+
+    for digest in digests:
+        fp = fingerprint(store, digest)
+        if fp is None:
+            # Unreadable images cannot be compared; keep them as they are
+            kept.append(digest)
+            pixels.append(0)
+            slots.append(None)
+            continue
+
+        value, width, height = fp
+        matches = index.search(value)
+        if not matches:
+            slots.append(index.add(value, len(kept)))
+            kept.append(digest)
+            pixels.append(width * height)
+            continue
+
+        _, position = min(matches)
+        if width * height > pixels[position]:
+            dropped[kept[position]] = digest
+            kept[position] = digest
+            pixels[position] = width * height
+            index.replace(slots[position], value)
+        else:
+            dropped[digest] = kept[position]
+
+    # A digest dropped in favour of one that was itself replaced points at the final survivor
+    for digest, survivor in dropped.items():
+        while survivor in dropped:
+            survivor = dropped[survivor]
+        dropped[digest] = survivor
+    return kept, dropped
+
+
+def main(directory: Optional[Path] = None, max_distance: int = DEFAULT_MAX_DISTANCE):
+    store = ImageStore()
+
+    if directory:
+        files = sorted(p for p in directory.iterdir() if p.is_file() and p.suffix.lower().lstrip('.') in IMAGE_EXTENSIONS)
+        for path in files:
+            store.add_file(path)
+        print(f"Added {len(files)} files from {directory}")
+
+    start = time.perf_counter()
+    digests = sorted(store.blobs)
+    kept, dropped = drop_near_duplicates(store, digests, max_distance)
+    elapsed = time.perf_counter() - start
+    store.save()
+
+    print(f"{len(digests)} images, {len(kept)} distinct, {len(dropped)} near-duplicates "
+          f"(max distance {max_distance}) in {elapsed:.2f}s")
+
+    groups: Dict[str, List[str]] = {}
+    for digest, survivor in dropped.items():
+        groups.setdefault(survivor, []).append(digest)
+    for survivor, copies in sorted(groups.items(), key=lambda g: -len(g[1]))[:20]:
+        print(f"  {store.blobs[survivor]['path']}")
+        for digest in copies:
+            print(f"    ~ {store.blobs[digest]['path']}")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Find near-duplicate images in the image store')
+    parser.add_argument('--max-distance', type=int, default=DEFAULT_MAX_DISTANCE,
+                        help='Max differing hash bits (of 64) for two images to count as the same photo')
+    parser.add_argument('--dir', type=Path, default=None,
+                        help='Add the images in this directory to the store first')
+
+    args = parser.parse_args()
+    main(directory=args.dir, max_distance=args.max_distance)
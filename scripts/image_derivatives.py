@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Responsive derivatives for stored images
+Usage: python scripts/image_derivatives.py [--workers N] [--widths 320 640 ...] [--formats webp avif] [--force]
+
+Renders each blob of the image store to WebP/AVIF at fixed widths under
+public/images/derived, without EXIF metadata, and records the original
+dimensions, a tiny blurred placeholder and the variants in
+data/image_derivatives.json. Images whose derivatives are up to date are skipped.
+"""
+
+import base64
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+try:
+    from PIL import Image, ImageCms, ImageFilter, ImageOps, features
+except ImportError:
+    print("Installing required packages...")
+    import subprocess
+    subprocess.check_call([sys.executable, '-m', 'pip', 'install', 'pillow', '-q'])
+    from PIL import Image, ImageCms, ImageFilter, ImageOps, features
+
+from image_store import ROOT, ImageStore
+
+
+DERIVED_DIR = ROOT / 'public' / 'images' / 'derived'
+MANIFEST_FILE = ROOT / 'data' / 'image_derivatives.json'
+
+WIDTHS = (320, 640, 1024, 1600)
+FORMATS = ('webp', 'avif')
+ENCODER_OPTIONS = {
+    'webp': {'quality': 80, 'method': 4},
+    'avif': {'quality': 55, 'speed': 8},
+}
+PLACEHOLDER_WIDTH = 16
+
+# Image mode matching each ICC colour space that derivatives can be rendered from
+PROFILE_MODES = {'RGB': 'RGB', 'CMYK': 'CMYK', 'GRAY': 'L'}
+
+
+def available_formats(formats: Iterable[str]) -> List[str]:
+    """The requested formats this Pillow build can encode"""
+    usable = []
+    for fmt in formats:
+        if features.check(fmt):
+            usable.append(fmt)
+        else:
+            print(f"Warning: Pillow has no {fmt} support, skipping {fmt} derivatives")
+    return usable
+
+
+def settings_key(widths: Iterable[int], formats: Iterable[str]) -> str:
+    """Identifies the render settings; entries rendered with other settings are redone"""
+    options = {fmt: ENCODER_OPTIONS[fmt] for fmt in formats}
+    return json.dumps({'widths': list(widths), 'formats': list(formats), 'options': options,
+                       'placeholder': PLACEHOLDER_WIDTH}, sort_keys=True)
+
+
+def target_widths(width: int, widths: Iterable[int]) -> List[int]:
+    """Widths to render for an image `width` pixels wide; never upscales"""
+    return sorted({min(w, width) for w in widths})
+
+
+def to_display_mode(img: Image.Image, icc_profile: Optional[bytes]) -> Tuple[Image.Image, Optional[bytes]]:
+    """The image as RGB(A) and the ICC profile that belongs with those pixels.
+
+    An RGB profile of an RGB image is kept. CMYK and greyscale images with a
+    profile for their colour space are converted to sRGB through it, so a
+    CMYK JPEG is neither shown with the wrong colours nor tagged with a
+    profile that does not match its pixels; sRGB is what viewers assume
+    without a profile. Other profiles are dropped.
+    """
+    mode = 'RGBA' if 'A' in img.getbands() or 'transparency' in img.info else 'RGB'
+    if icc_profile:
+        try:
+            profile = ImageCms.ImageCmsProfile(io.BytesIO(icc_profile))
+            color_space = PROFILE_MODES.get(profile.profile.xcolor_space.strip())
+            if color_space == 'RGB' and img.mode in ('RGB', 'RGBA', 'RGBX', 'P', 'PA'):
+                return img.convert(mode), icc_profile
+            if color_space == img.mode and mode == 'RGB':
+                return ImageCms.profileToProfile(img, profile, ImageCms.createProfile('sRGB'), outputMode='RGB'), None
+        except (ImageCms.PyCMSError, OSError) as e:
+            print(f"  Ignoring unusable colour profile: {e}")
+    return img.convert(mode), None
+
+
+def _render(job: Tuple[str, str, str, Tuple[int, ...], Tuple[str, ...]]) -> Tuple[str, Optional[dict]]:
+    """Render all derivatives of one image (runs in a worker process)"""
+    digest, source, out_dir, widths, formats = job
+    try:
+        with Image.open(source) as img:
+            # Read before any conversion: converted images keep the source's profile in info
+            icc_profile = img.info.get('icc_profile')
+            width, height = img.size
+            if img.getexif().get(0x0112, 1) in (5, 6, 7, 8):
+                # EXIF orientation turns the picture by 90 degrees
+                width, height = height, width
+
+            # JPEGs decode directly at a reduced scale when the largest target is much smaller
+            largest = max(target_widths(width, widths))
+            img.draft('RGB', (largest, max(1, height * largest // width)))
+            img = ImageOps.exif_transpose(img)
+            img, icc_profile = to_display_mode(img, icc_profile)
+
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        variants = []
+        for target in target_widths(width, widths):
+            target_height = max(1, round(height * target / width))
+            resized = img if img.size == (target, target_height) else img.resize((target, target_height), Image.LANCZOS)
+            for fmt in formats:
+                path = out_dir / f"{digest}-{target}.{fmt}"
+                tmp_path = path.with_name(path.name + '.tmp')
+                # Saved without exif=..., so camera metadata (GPS, serials) is dropped
+                resized.save(tmp_path, format=fmt.upper(), icc_profile=icc_profile, **ENCODER_OPTIONS[fmt])
+                os.replace(tmp_path, path)
+                variants.append({'width': target, 'height': target_height, 'format': fmt,
+                                 'path': str(path.relative_to(ROOT)), 'bytes': path.stat().st_size})
+
+        tiny = img.resize((PLACEHOLDER_WIDTH, max(1, round(height * PLACEHOLDER_WIDTH / width))), Image.BILINEAR)
+        buffer = io.BytesIO()
+        tiny.filter(ImageFilter.GaussianBlur(1)).save(buffer, format='WEBP', quality=40)
+        placeholder = 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+        return digest, {'width': width, 'height': height, 'placeholder': placeholder, 'variants': variants}
+
+    except Exception as e:
+        print(f"  Error rendering {source}: {e}")
+        return digest, None
+
+
+def load_manifest(path: Path = MANIFEST_FILE) -> dict:
+    if path.exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {'images': {}}
+
+
+def save_manifest(manifest: dict, path: Path = MANIFEST_FILE):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def is_up_to_date(entry: Optional[dict], settings: str) -> bool:
+    if not entry or entry.get('settings') != settings:
+        return False
+    return all((ROOT / variant['path']).exists() for variant in entry['variants'])
+
+
+def generate_derivatives(store: ImageStore, digests: Optional[Iterable[str]] = None, workers: Optional[int] = None,
+                         widths: Iterable[int] = WIDTHS, formats: Iterable[str] = FORMATS, force: bool = False,
+                         derived_dir: Path = DERIVED_DIR, manifest_path: Path = MANIFEST_FILE) -> dict:
+    """Render missing or outdated derivatives for the given blobs (default: all) and update the manifest"""
+    widths = tuple(sorted(set(widths)))
+    formats = tuple(available_formats(formats))
+    settings = settings_key(widths, formats)
+    manifest = load_manifest(manifest_path)
+
+    digests = list(dict.fromkeys(digests if digests is not None else sorted(store.blobs)))
+    jobs = [
+        (digest, str(store.blob_path(digest)), str(derived_dir / digest[:2]), widths, formats)
+        for digest in digests
+        if force or not is_up_to_date(manifest['images'].get(digest), settings)
+    ]
+    stats = {'images': len(digests), 'rendered': 0, 'up_to_date': len(digests) - len(jobs), 'failed': 0}
+
+    print(f"Derivatives: {len(jobs)} of {len(digests)} images to render "
+          f"({', '.join(formats)} at {', '.join(map(str, widths))}px)")
+    if not jobs:
+        return stats
+
+    start = time.monotonic()
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rendered = list(pool.map(_render, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+    else:
+        rendered = [_render(job) for job in jobs]
+
+    for digest, entry in rendered:
+        if entry is None:
+            stats['failed'] += 1
+            continue
+        entry['settings'] = settings
+        manifest['images'][digest] = entry
+        stats['rendered'] += 1
+
+    save_manifest(manifest, manifest_path)
+    elapsed = time.monotonic() - start
+    print(f"  Rendered {stats['rendered']} images in {elapsed:.1f}s"
+          + (f", {stats['failed']} failed" if stats['failed'] else ''))
+    return stats
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Render responsive image derivatives')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--widths', type=int, nargs='+', default=list(WIDTHS), help='Target widths in pixels')
+    parser.add_argument('--formats', nargs='+', default=list(FORMATS), choices=list(ENCODER_OPTIONS),
+                        help='Output formats')
+    parser.add_argument('--force', action='store_true', help='Re-render images that are up to date')
+
+    args = parser.parse_args()
+    generate_derivatives(ImageStore(), workers=args.workers, widths=args.widths, formats=args.formats,
+                         force=args.force)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Content-addressed store for scraped images
+Usage: python scripts/image_store.py [--ingest DIR ...] [--stats]
+
+Blobs are named by the SHA-256 of their bytes under public/images/store, so a
+photo shared by several listings (or scraped by both scrapers) is stored once.
+data/image_index.json maps each blob to the URLs it came from and each
+property slug to its ordered list of blobs.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+
+ROOT = Path(__file__).parent.parent
+STORE_DIR = ROOT / 'public' / 'images' / 'store'
+INDEX_FILE = ROOT / 'data' / 'image_index.json'
+
+IMAGE_EXTENSIONS = ('jpg', 'jpeg', 'png', 'webp', 'gif')
+
+
+def image_extension(url: str) -> str:
+    """File extension for an image URL or path (jpg when it has none)"""
+    suffix = Path(urlparse(url).path).suffix.lower().lstrip('.')
+    if suffix == 'jpeg':
+        return 'jpg'
+    return suffix if suffix in IMAGE_EXTENSIONS else 'jpg'
+
+
+class ImageStore:
+    """SHA-256 addressed blobs plus a slug -> blobs index. Safe to share between threads."""
+
+    def __init__(self, store_dir: Path = STORE_DIR, index_path: Path = INDEX_FILE, root: Path = ROOT):
+        self.store_dir = Path(store_dir)
+        self.index_path = Path(index_path)
+        self.root = Path(root)
+        self.blobs: Dict[str, dict] = {}
+        self.properties: Dict[str, List[str]] = {}
+        self.urls: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+        if self.index_path.exists():
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            self.blobs = index.get('blobs', {})
+            self.properties = index.get('properties', {})
+            for digest, blob in self.blobs.items():
+                for url in blob['urls']:
+                    self.urls[url] = digest
+
+    def blob_path(self, digest: str) -> Path:
+        return self.root / self.blobs[digest]['path']
+
+    def path_for_url(self, url: str) -> Optional[Path]:
+        """Where the last download of url is stored, if it is"""
+        digest = self.urls.get(url)
+        return self.blob_path(digest) if digest else None
+
+    def ingest(self, chunks: Iterable[bytes], ext: str, url: Optional[str] = None,
+               min_bytes: int = 0) -> Optional[Tuple[str, Path, bool]]:
+        """Stream bytes into the store, hashing as they are written.
+
+        Returns (digest, path, created), where created is False when identical
+        bytes were already stored, or None if fewer than min_bytes arrived.
+        """
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        sha = hashlib.sha256()
+        size = 0
+        fd, tmp_name = tempfile.mkstemp(dir=self.store_dir, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    sha.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+            if size < min_bytes:
+                return None
+
+            digest = sha.hexdigest()
+            path = self.store_dir / digest[:2] / f"{digest}.{ext}"
+            with self._lock:
+                created = digest not in self.blobs or not (self.root / self.blobs[digest]['path']).exists()
+                if created:
+                    path.parent.mkdir(exist_ok=True)
+                    os.replace(tmp_name, path)
+                    self.blobs[digest] = {'path': str(path.relative_to(self.root)), 'size': size, 'urls': []}
+                path = self.root / self.blobs[digest]['path']
+                if url:
+                    self._link_url(url, digest)
+            return digest, path, created
+        finally:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+
+    def add_file(self, path: Path, url: Optional[str] = None) -> Tuple[str, Path, bool]:
+        """Copy an existing image file into the store"""
+        def chunks():
+            with open(path, 'rb') as f:
+                while True:
+                    chunk = f.read(1024 * 1024)
+                    if not chunk:
+                        return
+                    yield chunk
+        return self.ingest(chunks(), image_extension(str(path)), url=url)
+
+    def restore(self, digest: str, path: Path, url: Optional[str] = None) -> bool:
+        """Re-register a blob written by a run that stopped before saving the index"""
+        path = Path(path)
+        if not path.exists():
+            return False
+        with self._lock:
+            if digest not in self.blobs:
+                self.blobs[digest] = {'path': str(path.relative_to(self.root)), 'size': path.stat().st_size, 'urls': []}
+            if url:
+                self._link_url(url, digest)
+        return True
+
+    def set_property_images(self, slug: str, digests: Iterable[str]):
+        """Record the ordered images of a property, dropping repeats"""
+        with self._lock:
+            self.properties[slug] = list(dict.fromkeys(digests))
+
+    def save(self):
+        with self._lock:
+            index = {'blobs': self.blobs, 'properties': self.properties}
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.index_path.with_name(self.index_path.name + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(index, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.index_path)
+
+    def stats(self) -> dict:
+        referenced = sum(len(blob['urls']) for blob in self.blobs.values())
+        return {
+            'blobs': len(self.blobs),
+            'bytes': sum(blob['size'] for blob in self.blobs.values()),
+            'urls': referenced,
+            'properties': len(self.properties),
+        }
+
+    def _link_url(self, url: str, digest: str):
+        previous = self.urls.get(url)
+        if previous == digest:
+            return
+        if previous and url in self.blobs[previous]['urls']:
+            # The image behind this URL changed; the old blob stays for other references
+            self.blobs[previous]['urls'].remove(url)
+        self.blobs[digest]['urls'].append(url)
+        self.urls[url] = digest
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Content-addressed image store')
+    parser.add_argument('--ingest', type=Path, nargs='+', default=[],
+                        help='Add the images in these directories to the store (originals are left in place)')
+    parser.add_argument('--stats', action='store_true', help='Print store statistics')
+
+    args = parser.parse_args()
+    store = ImageStore()
+
+    for directory in args.ingest:
+        files = sorted(p for p in directory.iterdir() if p.is_file() and p.suffix.lower().lstrip('.') in IMAGE_EXTENSIONS)
+        original = sum(p.stat().st_size for p in files)
+        created = sum(store.add_file(p)[2] for p in files)
+        print(f"{directory}: {len(files)} files ({original / 1024 / 1024:.1f} MB), {created} new blobs")
+    if args.ingest:
+        store.save()
+
+    if args.stats or not args.ingest:
+        stats = store.stats()
+        print(f"{stats['blobs']} blobs, {stats['bytes'] / 1024 / 1024:.1f} MB, "
+              f"{stats['urls']} source URLs, {stats['properties']} properties")
@@ -1,17 +1,31 @@
 #!/usr/bin/env python3
 """
 Import properties from Excel file to Supabase
-Usage: python scripts/import_properties.py [--dry-run] [--json-only]
+Usage: python scripts/import_properties.py [--excel FILE ...] [--dry-run] [--json-only] [--stream]
+                                          [--sync [--deactivate-missing]] [--workers N] [--reset-slugs]
+                                          [--incremental] [--geocoder gazetteer|nominatim|none]
+                                          [--dedup flag|merge]
 """
 
 import os
 import re
 import json
 import sys
+import hashlib
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 import unicodedata
+from functools import lru_cache
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+
+from batch_writer import BatchWriter
+from geocoding import ADDRESS, BACKENDS, STREET, Geocoder, haversine_km
+from listing_dedup import dedup_rows
+from property_store import COLUMNS_DIR, NDJSON_FILE, ColumnarWriter, NdjsonWriter
+from supabase_client import connect_supabase, fetch_all
 
 # Excel reading
 try:
@@ -33,33 +47,46 @@ def slugify(text: str) -> str:
     return text
 
 
+# Patterns used by the field parsers, compiled once instead of per cell
+PRICE_NUMBER_RE = re.compile(r"[\d',\.]+")
+PRICE_STRIP_RE = re.compile(r'[CHFchf\s]')
+DIGITS_RE = re.compile(r'(\d+)')
+METERS_RE = re.compile(r'(\d+)\s*m(?:eter)?s?(?!i)')
+KILOMETERS_RE = re.compile(r'([\d.]+)\s*km')
+DECIMAL_RE = re.compile(r'([\d.]+)')
+
+# Availability markers, matched as substrings of the lowercased cell
+AVAILABLE_RE = re.compile('|'.join(map(re.escape, ['✅', '☑', 'yes', 'available', 'true', '1'])))
+UNAVAILABLE_RE = re.compile('|'.join(map(re.escape, ['❌', 'no', 'booked', 'false', '0'])))
+
+
 def parse_price(price_str: Optional[str]) -> Optional[float]:
     """Parse price string to float (e.g., '50,000.-' -> 50000.0)"""
     if not price_str or price_str == 'n/a':
         return None
     
+    price_str = str(price_str)
+    
     # Handle complex strings (e.g., "Single room: CHF 18'000.00\nDouble room...")
-    if '\n' in str(price_str):
+    if '\n' in price_str:
         # Take the first price mentioned
-        lines = str(price_str).split('\n')
-        for line in lines:
-            match = re.search(r"[\d',\.]+", line)
+        for line in price_str.split('\n'):
+            match = PRICE_NUMBER_RE.search(line)
             if match:
                 price_str = match.group()
                 break
     
     # Remove currency symbols, spaces, and format characters
-    price_str = str(price_str)
-    price_str = re.sub(r'[CHFchf\s]', '', price_str)
+    price_str = PRICE_STRIP_RE.sub('', price_str)
     price_str = price_str.replace("'", "").replace(",", "").replace(".-", "").replace("-", "")
     price_str = price_str.replace(".00", "").replace(".", "")
     
     # Handle "per night" - multiply by 7 for weekly rate
-    is_per_night = 'per night' in str(price_str).lower() or 'night' in str(price_str).lower()
+    is_per_night = 'night' in price_str.lower()
     
     try:
         # Extract just the number
-        match = re.search(r'(\d+)', price_str)
+        match = DIGITS_RE.search(price_str)
         if match:
             price = float(match.group(1))
             if is_per_night:
@@ -79,17 +106,17 @@ def parse_distance(distance_str: Optional[str]) -> Optional[float]:
     distance_str = str(distance_str).lower().strip()
     
     # Handle meters
-    match = re.search(r'(\d+)\s*m(?:eter)?s?(?!i)', distance_str)
+    match = METERS_RE.search(distance_str)
     if match:
         return float(match.group(1)) / 1000
     
     # Handle kilometers
-    match = re.search(r'([\d.]+)\s*km', distance_str)
+    match = KILOMETERS_RE.search(distance_str)
     if match:
         return float(match.group(1))
     
     # Handle just numbers (assume km if > 10, else assume meters)
-    match = re.search(r'([\d.]+)', distance_str)
+    match = DECIMAL_RE.search(distance_str)
     if match:
         val = float(match.group(1))
         return val / 1000 if val > 10 else val
@@ -105,11 +132,11 @@ def parse_availability(avail_str: Optional[str]) -> bool:
     avail_str = str(avail_str).lower().strip()
     
     # Positive indicators
-    if any(x in avail_str for x in ['✅', '☑', 'yes', 'available', 'true', '1']):
+    if AVAILABLE_RE.search(avail_str):
         return True
     
     # Negative indicators
-    if any(x in avail_str for x in ['❌', 'no', 'booked', 'false', '0']):
+    if UNAVAILABLE_RE.search(avail_str):
         return False
     
     return True  # Default to available
@@ -127,13 +154,56 @@ def parse_int(val) -> Optional[int]:
         return int(val)
     
     # Handle strings like "34 hotel rooms" - extract first number
-    match = re.search(r'(\d+)', str(val))
+    match = DIGITS_RE.search(str(val))
     if match:
         return int(match.group(1))
     
     return None
 
 
+class ParseFailure:
+    """Result slot for a cell whose parser raised, so one bad cell fails its row and not the whole column"""
+    
+    __slots__ = ('error',)
+    
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+# Memoized field parsers for the batch path. Owner sheets repeat the same raw
+# strings ("✅", "n/a", "400m", ...) thousands of times; typed=True keeps 1 and
+# 1.0 (and True) apart since they parse differently.
+COLUMN_PARSERS = {
+    'price': lru_cache(maxsize=16384, typed=True)(parse_price),
+    'distance': lru_cache(maxsize=16384, typed=True)(parse_distance),
+    'int': lru_cache(maxsize=16384, typed=True)(parse_int),
+    'availability': lru_cache(maxsize=16384, typed=True)(parse_availability),
+}
+
+
+def parse_column(values: Iterable, kind: str) -> list:
+    """Parse a whole column of raw cells with the memoized parser for `kind`.
+    
+    Returns the same values the per-cell parse_* functions would, with a
+    ParseFailure in place of any cell that raised.
+    """
+    parse = COLUMN_PARSERS[kind]
+    results = []
+    append = results.append
+    for value in values:
+        try:
+            append(parse(value))
+        except TypeError:
+            # Unhashable cell value, parse it without the cache
+            try:
+                append(parse.__wrapped__(value))
+            except Exception as e:
+                append(ParseFailure(e))
+        except Exception as e:
+            append(ParseFailure(e))
+    return results
+
+
 def extract_city(address: str) -> str:
     """Extract city from address"""
     address = str(address).strip()
@@ -200,114 +270,573 @@ def generate_name(prop_type: str, address: str, city: str) -> str:
         return f"{type_name} {city}"
 
 
-def import_excel(excel_path: str, dry_run: bool = False, json_only: bool = False):
-    """Import properties from Excel file"""
-    
-    print(f"Loading Excel file: {excel_path}")
-    wb = openpyxl.load_workbook(excel_path)
-    ws = wb.active
-    
-    properties = []
-    pricing_rules = []
-    errors = []
+# Name of the default pricing rule created for every priced property
+PRICING_RULE_NAME = "WEF 2026"
+
+# Number of columns the owner sheet is expected to have (type .. owner)
+SHEET_COLUMNS = 12
+
+
+def read_rows(excel_path: str, stream: bool = False) -> Iterator[Tuple[int, tuple]]:
+    """Yield (row_num, values) for each data row of the active sheet"""
+    if stream:
+        # Read-only mode parses the sheet XML lazily instead of building every cell up front
+        wb = openpyxl.load_workbook(excel_path, read_only=True)
+    else:
+        wb = openpyxl.load_workbook(excel_path)
     
-    # Track slugs to ensure uniqueness
-    used_slugs = set()
+    try:
+        ws = wb.active
+        for row_num, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
+            # Read-only sheets can return ragged rows when trailing cells are empty
+            if len(row) < SHEET_COLUMNS:
+                row = tuple(row) + (None,) * (SHEET_COLUMNS - len(row))
+            yield row_num, row
+    finally:
+        if stream:
+            wb.close()
+
+
+# Typed sheet cells: (field name, column index, column parser)
+TYPED_FIELDS = [
+    ('bedrooms', 2, 'int'),
+    ('bathrooms', 3, 'int'),
+    ('guests', 4, 'int'),
+    ('price', 5, 'price'),
+    ('cleaning_fee', 6, 'price'),
+    ('security_deposit', 7, 'price'),
+    ('distance', 8, 'distance'),
+    ('available', 9, 'availability'),
+]
+
+
+def parse_rows(rows: Iterable[Tuple[int, tuple]], errors: List[str],
+               chunk_size: int = 1024) -> Iterator[Tuple[int, dict]]:
+    """Parse raw cell values into typed fields, skipping empty rows.
     
-    for row_num, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
-        try:
-            # Skip empty rows
-            if not row[0]:
-                continue
+    Rows are taken in chunks and each typed column is parsed in one
+    parse_column call, so repeated raw values hit the parser cache.
+    """
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        
+        # Skip empty rows
+        chunk = [(row_num, row) for row_num, row in chunk if row[0]]
+        
+        columns = [parse_column([row[index] for _, row in chunk], kind) for _, index, kind in TYPED_FIELDS]
+        
+        for i, (row_num, row) in enumerate(chunk):
+            fields = {
+                "prop_type": str(row[0]).strip() if row[0] else 'Apartment',
+                "address": str(row[1]).strip() if row[1] else '',
+                "website_link": str(row[10]).strip() if row[10] else None,
+                "owner": str(row[11]).strip() if row[11] else None,
+            }
+            failure = None
+            for (name, _, _), column in zip(TYPED_FIELDS, columns):
+                value = column[i]
+                if isinstance(value, ParseFailure):
+                    failure = value
+                    break
+                fields[name] = value
             
-            # Extract raw values
-            prop_type = str(row[0]).strip() if row[0] else 'Apartment'
-            address = str(row[1]).strip() if row[1] else ''
-            bedrooms = parse_int(row[2])
-            bathrooms = parse_int(row[3])
-            guests = parse_int(row[4])
-            price = parse_price(row[5])
-            cleaning_fee = parse_price(row[6])
-            security_deposit = parse_price(row[7])
-            distance = parse_distance(row[8])
-            available = parse_availability(row[9])
-            website_link = str(row[10]).strip() if row[10] else None
-            owner = str(row[11]).strip() if row[11] else None
+            if failure is not None:
+                errors.append(f"Row {row_num}: {str(failure.error)}")
+                continue
             
             # Skip if no address
-            if not address:
+            if not fields['address']:
                 errors.append(f"Row {row_num}: Missing address")
                 continue
             
-            # Normalize and derive values
+            yield row_num, fields
+
+
+def normalize_rows(parsed: Iterable[Tuple[int, dict]], errors: List[str]) -> Iterator[Tuple[int, dict]]:
+    """Derive city, type and name, and fill in defaults for missing data"""
+    for row_num, fields in parsed:
+        try:
+            address = fields['address']
             city = extract_city(address)
-            property_type = normalize_property_type(prop_type)
-            name = generate_name(property_type, address, city)
-            
-            # Generate unique slug
-            base_slug = slugify(name)
-            slug = base_slug
-            counter = 1
-            while slug in used_slugs:
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            used_slugs.add(slug)
-            
-            # Default values for missing data
-            bedrooms = bedrooms or 1
-            bathrooms = bathrooms or 1
-            guests = guests or 2
-            distance = distance or 1.0
-            
-            # Create property record
-            prop = {
-                "name": name,
-                "slug": slug,
-                "property_type": property_type,
-                "address": address.replace('\n', ', '),
+            property_type = normalize_property_type(fields['prop_type'])
+            fields.update({
                 "city": city,
-                "rooms": bedrooms,
-                "bathrooms": bathrooms,
-                "capacity": guests,
-                "distance_to_congress": round(distance, 2),
-                "cleaning_fee": cleaning_fee,
-                "security_deposit": security_deposit,
-                "wef_price": price,
-                "external_link": website_link,
-                "owner_info": owner,
-                "active": available,
-                "featured": False,
-                "amenities": [],
-                "description": None,
-                "short_description": f"{property_type.replace('_', ' ').title()} in {city} with {bedrooms} bedroom{'s' if bedrooms > 1 else ''}, {guests} guests max.",
-            }
+                "property_type": property_type,
+                "name": generate_name(property_type, address, city),
+                "bedrooms": fields['bedrooms'] or 1,
+                "bathrooms": fields['bathrooms'] or 1,
+                "guests": fields['guests'] or 2,
+            })
+        except Exception as e:
+            errors.append(f"Row {row_num}: {str(e)}")
+            continue
+        
+        yield row_num, fields
+
+
+# Distance used when the sheet has none and the address cannot be geocoded to its street
+DEFAULT_DISTANCE_KM = 1.0
+
+# Geocoder precisions close enough to replace the default; a postcode or town centroid is not
+DISTANCE_PRECISIONS = (ADDRESS, STREET)
+
+
+def locate_rows(based: Iterable[Tuple[dict, str]], geocoder: Geocoder,
+                chunk_size: int = 1024) -> Iterator[Tuple[dict, str]]:
+    """Fill in distances missing from the sheet from the geocoded address.
+    
+    Only street- or address-level matches are used; rows matched to a
+    postcode or locality centroid keep the default and are counted apart.
+    Distances of a chunk are computed in one vectorized haversine pass;
+    addresses come from the geocoder's cache after the first import.
+    """
+    based = iter(based)
+    counts = {}
+    while True:
+        chunk = list(islice(based, chunk_size))
+        if not chunk:
+            break
+        
+        missing = [fields for fields, _ in chunk if fields['distance'] is None]
+        if missing:
+            lat, lon, precision = geocoder.locate_many([f['address'] for f in missing], [f['city'] for f in missing])
+            distances = haversine_km(lat, lon)
+            for fields, distance, found in zip(missing, distances, precision):
+                if found in DISTANCE_PRECISIONS:
+                    fields['distance'] = float(distance)
+                counts[found or 'unresolved'] = counts.get(found or 'unresolved', 0) + 1
+        
+        yield from chunk
+    
+    if counts:
+        used = [f"{counts[p]} by {p}" for p in DISTANCE_PRECISIONS if p in counts]
+        kept = [f"{n} {p}" if p == 'unresolved' else f"{n} {p}-level"
+                for p, n in sorted(counts.items()) if p not in DISTANCE_PRECISIONS]
+        print(f"Geocoded missing distances: {', '.join(used) or 'none'}"
+              + (f"; {', '.join(kept)} keep {DEFAULT_DISTANCE_KM} km" if kept else ''))
+
+
+def slug_bases(normalized: Iterable[Tuple[int, dict]]) -> Iterator[Tuple[dict, str]]:
+    """Compute the base slug of each row from its name"""
+    for _row_num, fields in normalized:
+        yield fields, slugify(fields['name'])
+
+
+def slug_key(address: str, property_type: str) -> str:
+    """Registry key identifying a listing: its normalized address and type"""
+    return f"{slugify(address.replace(chr(10), ', '))}|{property_type}"
+
+
+# Sheet fields that tell units at one address apart, and the property fields they are written to
+UNIT_FIELDS = (('bedrooms', 'rooms'), ('bathrooms', 'bathrooms'), ('guests', 'capacity'), ('price', 'wef_price'),
+               ('cleaning_fee', 'cleaning_fee'), ('security_deposit', 'security_deposit'),
+               ('website_link', 'external_link'), ('owner', 'owner_info'), ('available', 'active'))
+
+
+def congress_distance(distance: Optional[float]) -> float:
+    """Distance to the Congress Centre as stored, with the default for unknown ones"""
+    return round(DEFAULT_DISTANCE_KM if distance is None else distance, 2)
+
+
+def unit_fingerprint(fields: dict) -> str:
+    """Short hash of a row's UNIT_FIELDS and distance, telling units at one address apart"""
+    values = [fields[name] for name, _ in UNIT_FIELDS] + [congress_distance(fields['distance'])]
+    return hashlib.sha1(json.dumps(values, default=str).encode('utf-8')).hexdigest()[:12]
+
+
+class SlugAllocator:
+    """Hand out unique slugs in O(1) and keep them stable across imports.
+    
+    A per-base counter remembers the next suffix to try, so a street shared by
+    hundreds of listings no longer rescans -1, -2, ... for every row. The
+    registry maps each listing's slug_key, and the fingerprint of its unit
+    fields, to the slug it was given; on re-import a listing gets its old slug
+    back whatever its position in the sheet, and new listings never take a
+    slug the registry holds. Only rows that are identical in all of these are
+    numbered by occurrence (#1, #2, ...), and they are interchangeable. A
+    listing that was alone at its address keeps its slug when its unit fields
+    change. Entries of listings no longer imported are dropped on save.
+    """
+    
+    REGISTRY_VERSION = 2
+    
+    def __init__(self, registry: Optional[Dict[str, Dict[str, str]]] = None):
+        self.registry = {key: dict(units) for key, units in (registry or {}).items()}
+        self.reserved = {slug for units in self.registry.values() for slug in units.values()}
+        self.single = {key for key, units in self.registry.items() if len(units) == 1}
+        self.used = set()
+        self.next_suffix = {}
+        self.unit_counts = {}
+        self.seen = set()
+    
+    def _taken(self, slug: str) -> bool:
+        return slug in self.used or slug in self.reserved
+    
+    def allocate(self, base_slug: str, key: Optional[str] = None, fingerprint: str = '') -> str:
+        if key is not None:
+            count = self.unit_counts.get((key, fingerprint), 0)
+            self.unit_counts[(key, fingerprint)] = count + 1
+            unit = f"{fingerprint}#{count}" if count else fingerprint
+            self.seen.add((key, unit))
             
-            properties.append(prop)
+            units = self.registry.setdefault(key, {})
+            slug = units.get(unit)
+            if slug:
+                self.single.discard(key)
+            elif key in self.single:
+                # The only listing at this address, edited since: it moves to its new fingerprint
+                self.single.discard(key)
+                (old_unit, slug), = units.items()
+                del units[old_unit]
+                units[unit] = slug
+            if slug and slug not in self.used:
+                self.used.add(slug)
+                return slug
+        
+        slug = base_slug
+        if self._taken(slug):
+            counter = self.next_suffix.get(base_slug, 1)
+            while self._taken(f"{base_slug}-{counter}"):
+                counter += 1
+            self.next_suffix[base_slug] = counter + 1
+            slug = f"{base_slug}-{counter}"
+        
+        self.used.add(slug)
+        if key is not None:
+            self.registry[key][unit] = slug
+            self.reserved.add(slug)
+        return slug
+    
+    @classmethod
+    def load(cls, registry_file: Path, properties_file: Optional[Path] = None) -> 'SlugAllocator':
+        """Load the registry, seeding it from an earlier properties.json on first use or after a format change"""
+        if registry_file.exists():
+            with open(registry_file, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            if saved.get('version') == cls.REGISTRY_VERSION:
+                return cls(saved['slugs'])
+        
+        allocator = cls()
+        if properties_file is not None and properties_file.exists():
+            with open(properties_file, 'r', encoding='utf-8') as f:
+                for prop in json.load(f):
+                    fields = {name: prop[prop_name] for name, prop_name in UNIT_FIELDS}
+                    fields['distance'] = prop['distance_to_congress']
+                    allocator.allocate(prop['slug'], slug_key(prop['address'], prop['property_type']),
+                                       unit_fingerprint(fields))
+            allocator = cls(allocator.registry)
+        return allocator
+    
+    def save(self, registry_file: Path):
+        """Write the entries of the listings allocated since loading"""
+        slugs = {}
+        for key, units in self.registry.items():
+            kept = {unit: slug for unit, slug in units.items() if (key, unit) in self.seen}
+            if kept:
+                slugs[key] = kept
+        tmp_file = registry_file.with_name(registry_file.name + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.REGISTRY_VERSION, 'slugs': slugs}, f, indent=2, ensure_ascii=False,
+                      sort_keys=True)
+        os.replace(tmp_file, registry_file)
+
+
+def assign_slugs(based: Iterable[Tuple[dict, str]],
+                 allocator: Optional[SlugAllocator] = None) -> Iterator[Tuple[dict, str]]:
+    """Make each base slug unique, in row order"""
+    if allocator is None:
+        allocator = SlugAllocator()
+        for fields, base_slug in based:
+            yield fields, allocator.allocate(base_slug)
+        return
+    
+    for fields, base_slug in based:
+        yield fields, allocator.allocate(base_slug, slug_key(fields['address'], fields['property_type']),
+                                         unit_fingerprint(fields))
+
+
+# Fields of a property record, in the order build_records writes them
+PROPERTY_FIELDS = ['name', 'slug', 'property_type', 'address', 'city', 'rooms', 'bathrooms', 'capacity',
+                   'distance_to_congress', 'cleaning_fee', 'security_deposit', 'wef_price', 'external_link',
+                   'owner_info', 'active', 'featured', 'amenities', 'description', 'short_description']
+
+
+def build_records(fields: dict, slug: str) -> Tuple[dict, Optional[dict]]:
+    """Build the property record and, if priced, its default pricing rule"""
+    property_type = fields['property_type']
+    city = fields['city']
+    bedrooms = fields['bedrooms']
+    guests = fields['guests']
+    price = fields['price']
+    cleaning_fee = fields['cleaning_fee']
+    
+    prop = {
+        "name": fields['name'],
+        "slug": slug,
+        "property_type": property_type,
+        "address": fields['address'].replace('\n', ', '),
+        "city": city,
+        "rooms": bedrooms,
+        "bathrooms": fields['bathrooms'],
+        "capacity": guests,
+        "distance_to_congress": congress_distance(fields['distance']),
+        "cleaning_fee": cleaning_fee,
+        "security_deposit": fields['security_deposit'],
+        "wef_price": price,
+        "external_link": fields['website_link'],
+        "owner_info": fields['owner'],
+        "active": fields['available'],
+        "featured": False,
+        "amenities": [],
+        "description": None,
+        "short_description": f"{property_type.replace('_', ' ').title()} in {city} with {bedrooms} bedroom{'s' if bedrooms > 1 else ''}, {guests} guests max.",
+    }
+    
+    # Create pricing rule if price exists
+    pricing = None
+    if price:
+        pricing = {
+            "property_slug": slug,
+            "name": PRICING_RULE_NAME,
+            "base_price_per_night": round(price / 7, 2),  # Weekly to nightly
+            "wef_multiplier": 1.0,
+            "min_stay": 7,
+            "cleaning_fee": cleaning_fee or 0,
+            "valid_from": "2026-01-01",
+            "valid_to": "2026-12-31",
+            "is_default": True,
+        }
+    
+    return prop, pricing
+
+
+def parse_workbook(excel_path: str, errors: List[str], stream: bool = False, prefix: str = '',
+                   cache: Optional['RowCache'] = None, sheet: int = 0) -> Iterator[Tuple[dict, str]]:
+    """Run the parse -> normalize -> base slug stages over one workbook, tagging rows with its sheet number"""
+    workbook_errors = []
+    rows = read_rows(excel_path, stream=stream)
+    if cache is not None:
+        based = cache.parse(rows, workbook_errors)
+    else:
+        based = slug_bases(normalize_rows(parse_rows(rows, workbook_errors), workbook_errors))
+    for fields, base_slug in based:
+        fields['sheet'] = sheet
+        yield fields, base_slug
+    errors.extend(prefix + err for err in workbook_errors)
+
+
+def iter_records(excel_paths: List[str], errors: List[str], stream: bool = False, workers: int = 1,
+                 slug_registry: Optional[Path] = None, row_cache: Optional[Path] = None,
+                 geocoder: Optional[Geocoder] = None,
+                 dedup: Optional[str] = None) -> Iterator[Tuple[dict, Optional[dict]]]:
+    """Run the parse -> normalize -> slug -> emit pipeline over one or more workbooks.
+    
+    Slugs are de-duplicated across all workbooks in the order they are given.
+    With workers > 1 the parsing stages run in a process pool and only the
+    slug de-duplication and record building happen here, so the records are
+    identical to a serial run. With a slug_registry file, listings keep the
+    slugs they had in earlier imports and the registry is updated at the end.
+    With a row_cache file, only rows whose raw cells changed since the last
+    run are parsed; the rest are taken from the cache. With a geocoder,
+    distances missing from the sheet are computed from the address. dedup
+    'flag' reports listings found in several workbooks, 'merge' also keeps
+    only the first row of each (this holds every row in memory).
+    """
+    if isinstance(excel_paths, (str, Path)):
+        excel_paths = [excel_paths]
+    prefixes = [f"{Path(p).name}: " if len(excel_paths) > 1 else '' for p in excel_paths]
+    
+    cache = RowCache.load(row_cache) if row_cache is not None else None
+    
+    if workers > 1 and cache is None:
+        based = parse_parallel(excel_paths, prefixes, errors, workers)
+    else:
+        based = chain.from_iterable(
+            parse_workbook(path, errors, stream=stream, prefix=prefix, cache=cache, sheet=sheet)
+            for sheet, (path, prefix) in enumerate(zip(excel_paths, prefixes))
+        )
+    
+    # Merged rows take a distance from their duplicates before any is geocoded
+    if dedup:
+        based = dedup_rows(based, merge=dedup == 'merge')
+    if geocoder is not None:
+        based = locate_rows(based, geocoder)
+    
+    allocator = None
+    if slug_registry is not None:
+        allocator = SlugAllocator.load(slug_registry, slug_registry.parent / 'properties.json')
+    
+    for fields, slug in assign_slugs(based, allocator):
+        yield build_records(fields, slug)
+    
+    if allocator is not None:
+        allocator.save(slug_registry)
+    if geocoder is not None:
+        geocoder.save()
+        print(f"Geocoding: {geocoder.summary()}")
+    if cache is not None:
+        cache.save(row_cache)
+        print(f"Incremental: {cache.hits} unchanged rows reused, {cache.misses} rows parsed")
+
+
+# Field order of the compact tuples parse workers send back to the parent
+RECORD_FIELDS = ('prop_type', 'address', 'website_link', 'owner') + tuple(name for name, _, _ in TYPED_FIELDS) + \
+    ('city', 'property_type', 'name')
+
+
+def _parse_job(job: Tuple[str, object, str]) -> Tuple[List[tuple], List[str]]:
+    """Worker: parse a whole workbook (by path) or a chunk of raw rows into compact records"""
+    kind, payload, prefix = job
+    errors = []
+    if kind == 'workbook':
+        based = parse_workbook(payload, errors, stream=True, prefix=prefix)
+    else:
+        based = slug_bases(normalize_rows(parse_rows(payload, errors), errors))
+    records = [tuple(fields[k] for k in RECORD_FIELDS) + (base_slug,) for fields, base_slug in based]
+    return records, errors
+
+
+def _ordered_map(pool, fn, jobs: Iterable, window: int) -> Iterator:
+    """Like pool.map, but submits at most `window` jobs ahead of the consumer"""
+    pending = deque()
+    for job in jobs:
+        pending.append(pool.submit(fn, job))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def parse_parallel(excel_paths: List[str], prefixes: List[str], errors: List[str], workers: int,
+                   chunk_size: int = 2000) -> Iterator[Tuple[dict, str]]:
+    """Fan the parse stages out over a process pool and yield (fields, base_slug) in sheet order.
+    
+    Several workbooks are parsed one per worker. A single workbook is read
+    here in read-only mode and its rows are shipped to workers in chunks.
+    """
+    if len(excel_paths) > 1:
+        jobs = (('workbook', path, prefix) for path, prefix in zip(excel_paths, prefixes))
+    else:
+        rows = read_rows(excel_paths[0], stream=True)
+        jobs = (('rows', chunk, prefixes[0]) for chunk in iter(lambda: list(islice(rows, chunk_size)), []))
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for job, (records, job_errors) in enumerate(_ordered_map(pool, _parse_job, jobs, window=workers * 2)):
+            errors.extend(job_errors)
+            # Several workbooks are one job each, in order
+            sheet = job if len(excel_paths) > 1 else 0
+            for record in records:
+                fields = dict(zip(RECORD_FIELDS, record))
+                fields['sheet'] = sheet
+                yield fields, record[-1]
+
+
+def row_fingerprint(row: tuple) -> str:
+    """Fingerprint of a row's raw cell values (types included, so 1 and '1' differ)"""
+    return hashlib.sha1(repr(row).encode('utf-8')).hexdigest()
+
+
+class RowCache:
+    """Parsed rows from earlier imports, keyed by the fingerprint of their raw cells.
+    
+    Keys do not include the row number, so rows that merely moved are still
+    hits. The cache is tied to a hash of this script's source, so any change
+    to the parsing rules starts it over. Only entries seen in the current run
+    are written back.
+    """
+    
+    def __init__(self, entries: Optional[Dict[str, list]] = None):
+        self.entries = entries or {}
+        self.seen = {}
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def parser_version() -> str:
+        return hashlib.sha1(Path(__file__).read_bytes()).hexdigest()
+    
+    @classmethod
+    def load(cls, cache_file: Path) -> 'RowCache':
+        if cache_file.exists():
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('parser') == cls.parser_version():
+                return cls(data['rows'])
+        return cls()
+    
+    def save(self, cache_file: Path):
+        tmp_file = cache_file.with_name(cache_file.name + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'parser': self.parser_version(), 'rows': self.seen}, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_file, cache_file)
+    
+    def parse(self, rows: Iterable[Tuple[int, tuple]], errors: List[str],
+              chunk_size: int = 1024) -> Iterator[Tuple[dict, str]]:
+        """Yield (fields, base_slug) in row order, parsing only rows not in the cache"""
+        rows = iter(rows)
+        while True:
+            chunk = [(row_num, row, row_fingerprint(row)) for row_num, row in islice(rows, chunk_size)]
+            if not chunk:
+                return
             
-            # Create pricing rule if price exists
-            if price:
-                pricing = {
-                    "property_slug": slug,
-                    "name": "WEF 2026",
-                    "base_price_per_night": round(price / 7, 2),  # Weekly to nightly
-                    "wef_multiplier": 1.0,
-                    "min_stay": 7,
-                    "cleaning_fee": cleaning_fee or 0,
-                    "valid_from": "2026-01-01",
-                    "valid_to": "2026-12-31",
-                    "is_default": True,
-                }
-                pricing_rules.append(pricing)
+            changed = [(row_num, row) for row_num, row, fp in chunk if fp not in self.entries]
+            parsed = dict(normalize_rows(parse_rows(changed, errors), errors))
             
-        except Exception as e:
-            errors.append(f"Row {row_num}: {str(e)}")
+            for row_num, row, fp in chunk:
+                record = self.entries.get(fp)
+                if record is not None:
+                    self.hits += 1
+                elif row_num in parsed:
+                    fields = parsed[row_num]
+                    record = [fields[k] for k in RECORD_FIELDS] + [slugify(fields['name'])]
+                    self.misses += 1
+                else:
+                    # Empty or invalid row; errors were reported by the parse stage
+                    continue
+                
+                self.seen[fp] = record
+                yield dict(zip(RECORD_FIELDS, record)), record[-1]
+
+
+class JsonArrayWriter:
+    """Write a JSON array item by item, byte-identical to json.dump(indent=2).
+    
+    Output goes to a temporary file that replaces the target only once
+    every item has been written, so an aborted run keeps the old file.
+    """
+    
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.tmp_path = self.path.with_name(self.path.name + '.tmp')
+        self.count = 0
+        self._file = open(self.tmp_path, 'w', encoding='utf-8')
+    
+    def write(self, item: dict):
+        text = json.dumps(item, indent=2, ensure_ascii=False).replace('\n', '\n  ')
+        self._file.write(('[\n  ' if self.count == 0 else ',\n  ') + text)
+        self.count += 1
     
-    # Summary
+    def commit(self):
+        self._file.write('\n]' if self.count else '[]')
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+    
+    def abort(self):
+        self._file.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+
+def print_summary(property_count: int, pricing_count: int, errors: List[str],
+                  type_counts: Dict[str, int], city_counts: Dict[str, int]):
+    """Print the import summary"""
     print(f"\n{'='*50}")
     print(f"Import Summary")
     print(f"{'='*50}")
-    print(f"Total properties: {len(properties)}")
-    print(f"With pricing: {len(pricing_rules)}")
+    print(f"Total properties: {property_count}")
+    print(f"With pricing: {pricing_count}")
     print(f"Errors: {len(errors)}")
     
     if errors:
@@ -317,33 +846,106 @@ def import_excel(excel_path: str, dry_run: bool = False, json_only: bool = False
         if len(errors) > 10:
             print(f"  ... and {len(errors) - 10} more")
     
-    # Property types breakdown
-    type_counts = {}
-    for p in properties:
-        t = p['property_type']
-        type_counts[t] = type_counts.get(t, 0) + 1
-    
     print(f"\nProperty types:")
     for t, count in sorted(type_counts.items(), key=lambda x: -x[1]):
         print(f"  - {t}: {count}")
     
-    # City breakdown
-    city_counts = {}
-    for p in properties:
-        c = p['city']
-        city_counts[c] = city_counts.get(c, 0) + 1
-    
     print(f"\nCities:")
     for c, count in sorted(city_counts.items(), key=lambda x: -x[1]):
         print(f"  - {c}: {count}")
+
+
+def write_records_streaming(records: Iterable[Tuple[dict, Optional[dict]]], properties_file: Path,
+                            pricing_file: Path, stats: dict) -> Iterator[Tuple[dict, Optional[dict]]]:
+    """Write records to the JSON and compact outputs as they arrive and pass each one on"""
+    properties_out = JsonArrayWriter(properties_file)
+    pricing_out = JsonArrayWriter(pricing_file)
+    compact_out = [NdjsonWriter(properties_file.parent / NDJSON_FILE),
+                   ColumnarWriter(properties_file.parent / COLUMNS_DIR, PROPERTY_FIELDS, source=properties_file)]
+    writers = [properties_out, pricing_out] + compact_out
+    committed = False
+    
+    try:
+        for prop, pricing in records:
+            properties_out.write(prop)
+            if pricing:
+                pricing_out.write(pricing)
+            for writer in compact_out:
+                writer.write(prop)
+            
+            t, c = prop['property_type'], prop['city']
+            stats['types'][t] = stats['types'].get(t, 0) + 1
+            stats['cities'][c] = stats['cities'].get(c, 0) + 1
+            
+            yield prop, pricing
+        
+        for writer in writers:
+            writer.commit()
+        committed = True
+    finally:
+        if not committed:
+            for writer in writers:
+                writer.abort()
+        stats['properties'] = properties_out.count
+        stats['pricing'] = pricing_out.count
+
+
+def write_compact_exports(properties: List[dict], output_dir: Path):
+    """Write the NDJSON and columnar exports of the properties"""
+    for writer in (NdjsonWriter(output_dir / NDJSON_FILE),
+                   ColumnarWriter(output_dir / COLUMNS_DIR, PROPERTY_FIELDS, source=output_dir / 'properties.json')):
+        for prop in properties:
+            writer.write(prop)
+        writer.commit()
+    print(f"Saved compact exports to: {output_dir / NDJSON_FILE}, {output_dir / COLUMNS_DIR}/")
+
+
+def open_records(excel_paths: List[str], output_dir: Path, errors: List[str], stream: bool, workers: int,
+                 stable_slugs: bool, incremental: bool, geocoder: Optional[str],
+                 dedup: Optional[str]) -> Iterator[Tuple[dict, Optional[dict]]]:
+    """Set up the record pipeline shared by import_excel and import_excel_streaming"""
+    for path in excel_paths:
+        print(f"Loading Excel file: {path}")
+    if workers > 1:
+        print(f"Parsing with {workers} worker processes")
     
-    # Save to JSON
-    output_dir = Path(__file__).parent.parent / 'data'
     output_dir.mkdir(exist_ok=True)
+    slug_registry = output_dir / 'slug_registry.json' if stable_slugs else None
+    row_cache = output_dir / 'import_fingerprints.json' if incremental else None
+    if incremental and workers > 1:
+        print("--incremental only parses changed rows; parsing in-process instead of with --workers")
+    return iter_records(excel_paths, errors, stream=stream, workers=workers,
+                        slug_registry=slug_registry, row_cache=row_cache,
+                        geocoder=Geocoder(BACKENDS[geocoder]()) if geocoder else None, dedup=dedup)
+
+
+def import_excel(excel_path, dry_run: bool = False, json_only: bool = False,
+                 sync: bool = False, deactivate_missing: bool = False, workers: int = 1,
+                 stable_slugs: bool = True, incremental: bool = False, geocoder: Optional[str] = 'gazetteer',
+                 dedup: Optional[str] = None):
+    """Import properties from one or more Excel files; returns (properties, pricing_rules)"""
     
+    excel_paths = [excel_path] if isinstance(excel_path, (str, Path)) else list(excel_path)
+    output_dir = Path(__file__).parent.parent / 'data'
+    errors = []
+    records = list(open_records(excel_paths, output_dir, errors, False, workers, stable_slugs, incremental,
+                                geocoder, dedup))
     properties_file = output_dir / 'properties.json'
     pricing_file = output_dir / 'pricing_rules.json'
     
+    properties = [prop for prop, _ in records]
+    pricing_rules = [pricing for _, pricing in records if pricing]
+    
+    # Property types and city breakdown
+    type_counts = {}
+    city_counts = {}
+    for p in properties:
+        type_counts[p['property_type']] = type_counts.get(p['property_type'], 0) + 1
+        city_counts[p['city']] = city_counts.get(p['city'], 0) + 1
+    
+    print_summary(len(properties), len(pricing_rules), errors, type_counts, city_counts)
+    
+    # Save to JSON
     with open(properties_file, 'w', encoding='utf-8') as f:
         json.dump(properties, f, indent=2, ensure_ascii=False)
     print(f"\nSaved properties to: {properties_file}")
@@ -352,6 +954,8 @@ def import_excel(excel_path: str, dry_run: bool = False, json_only: bool = False
         json.dump(pricing_rules, f, indent=2, ensure_ascii=False)
     print(f"Saved pricing rules to: {pricing_file}")
     
+    write_compact_exports(properties, output_dir)
+    
     if json_only:
         print("\n--json-only flag set, skipping database import")
         return properties, pricing_rules
@@ -360,63 +964,282 @@ def import_excel(excel_path: str, dry_run: bool = False, json_only: bool = False
         print("\n--dry-run flag set, skipping database import")
         return properties, pricing_rules
     
-    # Import to Supabase
+    import_to_supabase(records, sync=sync, deactivate_missing=deactivate_missing)
+    
+    return properties, pricing_rules
+
+
+def import_excel_streaming(excel_path, dry_run: bool = False, json_only: bool = False,
+                           sync: bool = False, deactivate_missing: bool = False, workers: int = 1,
+                           stable_slugs: bool = True, incremental: bool = False,
+                           geocoder: Optional[str] = 'gazetteer', dedup: Optional[str] = None) -> dict:
+    """Import like import_excel in a single pass: rows are written to JSON and the database as they are parsed.
+    
+    The workbook is read in read-only mode and nothing is accumulated, so peak
+    memory stays flat however long the sheet is. Returns the summary counters
+    (properties, pricing, types, cities) instead of the record lists.
+    """
+    excel_paths = [excel_path] if isinstance(excel_path, (str, Path)) else list(excel_path)
+    output_dir = Path(__file__).parent.parent / 'data'
+    errors = []
+    records = open_records(excel_paths, output_dir, errors, True, workers, stable_slugs, incremental,
+                           geocoder, dedup)
+    properties_file = output_dir / 'properties.json'
+    pricing_file = output_dir / 'pricing_rules.json'
+    
+    stats = {'properties': 0, 'pricing': 0, 'types': {}, 'cities': {}}
+    records = write_records_streaming(records, properties_file, pricing_file, stats)
+    
     try:
-        from supabase import create_client, Client
+        if json_only:
+            print("\n--json-only flag set, skipping database import")
+        elif dry_run:
+            print("\n--dry-run flag set, skipping database import")
+        else:
+            import_to_supabase(records, sync=sync, deactivate_missing=deactivate_missing)
+    finally:
+        # The database step may stop early; the JSON outputs still need every row
+        for _ in records:
+            pass
+    
+    print_summary(stats['properties'], stats['pricing'], errors, stats['types'], stats['cities'])
+    print(f"\nSaved properties to: {properties_file}")
+    print(f"Saved pricing rules to: {pricing_file}")
+    print(f"Saved compact exports to: {output_dir / NDJSON_FILE}, {output_dir / COLUMNS_DIR}/")
+    
+    return stats
+
+
+# Import-only fields that have no column in the properties table
+DB_EXCLUDED_FIELDS = {'wef_price', 'external_link', 'owner_info', 'property_type', 'cleaning_fee', 'security_deposit'}
+
+
+def to_db_row(prop: dict) -> dict:
+    """Prepare a property record for the DB (remove fields not in schema)"""
+    return {k: v for k, v in prop.items() if k not in DB_EXCLUDED_FIELDS}
+
+
+def content_hash(row: dict, pricing: Optional[dict] = None) -> str:
+    """Stable hash of a DB row and its pricing rule, used to detect changed properties between imports"""
+    payload = json.dumps({'property': row, 'pricing': pricing}, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def to_pricing_row(pricing: dict, property_id: str) -> dict:
+    """Prepare a pricing rule for the DB, linking it by property_id instead of slug"""
+    row = {k: v for k, v in pricing.items() if k != 'property_slug'}
+    row['property_id'] = property_id
+    return row
+
+
+class PricingRuleWriter:
+    """Resolve pricing rules to property ids and bulk-insert them.
+    
+    Rules arrive with a property_slug; callers resolve it to an id from the
+    rows they already fetched or wrote, so no per-property lookups are needed.
+    Rules being replaced are only deleted, by id, once the new ones of their
+    property are written, so a failed insert never leaves a property without
+    pricing.
+    """
+    
+    def __init__(self, supabase, max_batch_rows: int = 500):
+        self.supabase = supabase
+        self.unresolved = []
+        self.replaced: Dict[str, List[str]] = {}
+        self.writer = BatchWriter(
+            lambda rows: supabase.table('pricing_rules').insert(rows).execute(),
+            label='pricing rules', max_batch_rows=max_batch_rows,
+        )
+    
+    def add(self, pricing: dict, slug_to_id: Dict[str, str]):
+        property_id = slug_to_id.get(pricing['property_slug'])
+        if property_id is None:
+            self.unresolved.append(pricing['property_slug'])
+            return
+        self.writer.add(to_pricing_row(pricing, property_id))
+    
+    def replace_for(self, property_ids: List[str]):
+        """Note the imported rules of properties that are about to get new ones, to delete them on close"""
+        if property_ids:
+            result = (self.supabase.table('pricing_rules').select('id, property_id')
+                      .in_('property_id', property_ids)
+                      .eq('name', PRICING_RULE_NAME)
+                      .eq('is_default', True)
+                      .execute())
+            for row in result.data:
+                self.replaced.setdefault(row['property_id'], []).append(row['id'])
+    
+    def close(self, batch_size: int = 200) -> dict:
+        """Write the queued rules, then delete the replaced ones of properties whose new rules were all written.
         
-        supabase_url = os.environ.get('NEXT_PUBLIC_SUPABASE_URL')
-        supabase_key = os.environ.get('SUPABASE_SERVICE_ROLE_KEY')
+        stats['failed_properties'] lists the properties whose new rules failed;
+        they keep their old rules.
+        """
+        stats = self.writer.close()
+        if self.unresolved:
+            print(f"  {len(self.unresolved)} rules skipped, property not found: {', '.join(self.unresolved[:10])}")
         
-        if not supabase_url or not supabase_key:
-            print("\nSupabase credentials not found in environment.")
-            print("Set NEXT_PUBLIC_SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY to import to database.")
-            print("JSON files have been saved for manual import.")
-            return properties, pricing_rules
+        failed = sorted({row['property_id'] for row, _ in self.writer.failed})
+        stale = [rule_id for property_id, rule_ids in self.replaced.items() if property_id not in failed
+                 for rule_id in rule_ids]
+        for i in range(0, len(stale), batch_size):
+            self.supabase.table('pricing_rules').delete().in_('id', stale[i:i + batch_size]).execute()
+        if stale:
+            print(f"  Replaced {len(stale)} previously imported pricing rules")
+        stats['failed_properties'] = failed
+        return stats
+
+
+def fetch_existing_properties(supabase, page_size: int = 1000) -> Dict[str, dict]:
+    """Fetch slug, id, content hash and active flag of every property in one paged scan"""
+    rows = fetch_all(supabase, 'properties', 'id, slug, content_hash, active', page_size, order='slug')
+    return {row['slug']: row for row in rows}
+
+
+def import_to_supabase(records: Iterable[Tuple[dict, Optional[dict]]], sync: bool = False,
+                       deactivate_missing: bool = False):
+    """Write properties and their pricing rules to Supabase, either as plain inserts or as a slug-keyed sync"""
+    try:
+        supabase = connect_supabase()
+        if supabase is None:
+            return
         
-        print(f"\nConnecting to Supabase...")
-        supabase: Client = create_client(supabase_url, supabase_key)
+        if sync:
+            sync_properties(supabase, records, deactivate_missing=deactivate_missing)
+            return
         
         # Insert properties
-        print(f"Inserting {len(properties)} properties...")
+        print(f"Inserting properties...")
+        pricing_writer = PricingRuleWriter(supabase)
         
-        # Prepare for DB (remove fields not in schema)
-        db_properties = []
-        for p in properties:
-            db_prop = {k: v for k, v in p.items() 
-                      if k not in ['wef_price', 'external_link', 'owner_info', 'property_type']}
-            db_properties.append(db_prop)
+        # The returned rows carry the ids the pricing rules link to
+        def on_success(items, result):
+            slug_to_id = {row['slug']: row['id'] for row in result.data}
+            for _, pricing in items:
+                if pricing:
+                    pricing_writer.add(pricing, slug_to_id)
         
-        # Insert in batches
-        batch_size = 50
-        for i in range(0, len(db_properties), batch_size):
-            batch = db_properties[i:i+batch_size]
-            result = supabase.table('properties').insert(batch).execute()
-            print(f"  Inserted batch {i//batch_size + 1}/{(len(db_properties)-1)//batch_size + 1}")
+        writer = BatchWriter(
+            lambda rows: supabase.table('properties').insert(rows).execute(),
+            label='properties', on_success=on_success,
+        )
+        for prop, pricing in records:
+            writer.add(to_db_row(prop), pricing)
+        writer.close()
+        pricing_writer.close()
         
         print("Database import complete!")
         
-    except ImportError:
-        print("\nSupabase Python client not installed.")
-        print("Run: pip install supabase")
-        print("JSON files have been saved for manual import.")
     except Exception as e:
         print(f"\nDatabase import error: {e}")
         print("JSON files have been saved for manual import.")
+
+
+def sync_properties(supabase, records: Iterable[Tuple[dict, Optional[dict]]], deactivate_missing: bool = False,
+                    batch_size: int = 50) -> dict:
+    """Upsert only new or changed properties, keyed on slug, together with their pricing rules.
     
-    return properties, pricing_rules
+    Existing rows are fetched once up front; each incoming row is hashed and
+    compared with the stored content_hash, so an unchanged sheet sends no writes.
+    Properties missing from the sheet are reported, and deactivated on request.
+    """
+    print("Fetching existing properties...")
+    existing = fetch_existing_properties(supabase)
+    print(f"  {len(existing)} properties in database")
+    
+    stats = {'new': 0, 'changed': 0, 'unchanged': 0, 'removed': 0}
+    seen = set()
+    pricing_writer = PricingRuleWriter(supabase)
+    
+    def on_success(items, result):
+        slug_to_id = {row['slug']: row['id'] for row in result.data}
+        
+        # Changed properties already have imported rules; the new ones replace them once written
+        pricing_writer.replace_for([existing[row['slug']]['id'] for row, _ in items if row['slug'] in existing])
+        for _, pricing in items:
+            if pricing:
+                pricing_writer.add(pricing, slug_to_id)
+    
+    writer = BatchWriter(
+        lambda rows: supabase.table('properties').upsert(rows, on_conflict='slug').execute(),
+        label='properties', on_success=on_success,
+    )
+    
+    for prop, pricing in records:
+        row = to_db_row(prop)
+        row['content_hash'] = content_hash(row, pricing)
+        seen.add(row['slug'])
+        
+        current = existing.get(row['slug'])
+        if current is None:
+            stats['new'] += 1
+        elif current.get('content_hash') != row['content_hash']:
+            stats['changed'] += 1
+        else:
+            stats['unchanged'] += 1
+            continue
+        
+        writer.add(row, pricing)
+    writer.close()
+    failed = pricing_writer.close()['failed_properties']
+    
+    # Without their rules these properties are not in sync; clearing the hash retries them next time
+    for i in range(0, len(failed), batch_size):
+        supabase.table('properties').update({'content_hash': None}).in_('id', failed[i:i + batch_size]).execute()
+    
+    removed = sorted(slug for slug, row in existing.items() if slug not in seen and row.get('active'))
+    stats['removed'] = len(removed)
+    
+    print(f"\nSync: {stats['new']} new, {stats['changed']} changed, "
+          f"{stats['unchanged']} unchanged, {stats['removed']} no longer in sheet")
+    for slug in removed[:10]:
+        print(f"  - {slug}")
+    if len(removed) > 10:
+        print(f"  ... and {len(removed) - 10} more")
+    
+    if removed and deactivate_missing:
+        # Clearing the hash makes the row count as changed if it reappears in a later sheet
+        for i in range(0, len(removed), batch_size):
+            chunk = removed[i:i + batch_size]
+            supabase.table('properties').update({'active': False, 'content_hash': None}).in_('slug', chunk).execute()
+        print(f"Deactivated {len(removed)} properties")
+    
+    print("Database sync complete!")
+    return stats
 
 
 if __name__ == '__main__':
     import argparse
     
     parser = argparse.ArgumentParser(description='Import properties from Excel to Supabase')
-    parser.add_argument('--excel', default='/Users/igorkretov/Downloads/LIST WEF 2026.xlsx',
-                       help='Path to Excel file')
+    parser.add_argument('--excel', nargs='+', default=['/Users/igorkretov/Downloads/LIST WEF 2026.xlsx'],
+                       help='Path to Excel file (several files are merged in the order given)')
     parser.add_argument('--dry-run', action='store_true',
                        help='Parse and validate only, do not import to database')
     parser.add_argument('--json-only', action='store_true',
                        help='Only output JSON files, do not attempt database import')
+    parser.add_argument('--stream', action='store_true',
+                       help='Read the workbook in read-only mode and write output row by row (flat memory for large sheets)')
+    parser.add_argument('--sync', action='store_true',
+                       help='Upsert by slug and only write new or changed properties (safe to re-run)')
+    parser.add_argument('--deactivate-missing', action='store_true',
+                       help='With --sync, set active=false on properties no longer in the sheet')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Parse in N worker processes (output is identical to a serial run)')
+    parser.add_argument('--reset-slugs', action='store_true',
+                       help='Ignore data/slug_registry.json and derive every slug from scratch')
+    parser.add_argument('--incremental', action='store_true',
+                       help='Only parse rows that changed since the last run (cached in data/import_fingerprints.json)')
+    parser.add_argument('--geocoder', choices=sorted(BACKENDS) + ['none'], default='gazetteer',
+                       help='Backend used to compute distances missing from the sheet (none: use 1.0 km)')
+    parser.add_argument('--dedup', choices=['flag', 'merge'],
+                       help='Report listings found in several workbooks (data/duplicate_listings.json); '
+                            'merge keeps only the first row of each')
     
     args = parser.parse_args()
     
-    import_excel(args.excel, dry_run=args.dry_run, json_only=args.json_only)
+    run_import = import_excel_streaming if args.stream else import_excel
+    run_import(args.excel, dry_run=args.dry_run, json_only=args.json_only,
+               sync=args.sync, deactivate_missing=args.deactivate_missing, workers=args.workers,
+               stable_slugs=not args.reset_slugs, incremental=args.incremental,
+               geocoder=None if args.geocoder == 'none' else args.geocoder, dedup=args.dedup)
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Find the same listing in several owner workbooks despite differently written addresses
+Usage: python scripts/listing_dedup.py --excel FILE FILE ... [--report FILE]
+
+Addresses are folded like slugify (accents dropped, 'Str.' as 'strasse',
+also when glued to the name, hyphens and punctuation ignored) and split into street, house number and
+postcode by geocoding.parse_address. Candidate pairs come from blocks of
+rows that share a house number and one of the rarest trigrams of the street
+name (without its -strasse/-weg ending), so rows are never compared
+all-pairs. Candidates are scored on street similarity, rooms, guests and type;
+differing postcodes rule a pair out. Pairs that are close but not close
+enough to merge are listed for review.
+
+Identical rows from the same sheet and owner are left alone: they are
+separate units of one building, listed once each. A listing is matched to at
+most one row of every other source, so three identical flats in one sheet
+and two in another make two duplicate pairs, not one group of five.
+"""
+
+import json
+import math
+import re
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from geocoding import parse_address, street_key
+
+
+REPORT_FILE = Path(__file__).parent.parent / 'data' / 'duplicate_listings.json'
+
+# Pairs scoring at least MERGE_SCORE are the same listing; down to REVIEW_SCORE they are reported for review.
+# Merging takes street names that are the same up to a typo in a long name and equal rooms, guests and type.
+MERGE_SCORE = 0.97
+REVIEW_SCORE = 0.75
+
+NGRAM = 3
+
+# Endings shared by most street names, compared on their own
+STREET_SUFFIXES = ('strasse', 'weg', 'gasse', 'platz')
+
+# 'Kurgartenstr.': the abbreviation glued to the name, which street_key leaves alone
+GLUED_STR_RE = re.compile(r'str$')
+
+# Spelled-out umlauts ('Flüela' folds to 'fluela', and is also written 'Flueela'); any e after a, o or u is
+# dropped on both sides, so every spelling compares the same
+UMLAUT_RE = re.compile(r'([aou])e+')
+
+# Fields a merged listing takes from its duplicate when it has none itself
+MERGED_FIELDS = ('price', 'cleaning_fee', 'security_deposit', 'distance', 'website_link', 'owner')
+
+
+class Candidate:
+    """The parts of a row that blocking and scoring look at"""
+
+    __slots__ = ('stem', 'suffix', 'number', 'postcode', 'grams', 'source', 'rooms', 'guests', 'property_type')
+
+    def __init__(self, fields: dict):
+        query = parse_address(fields['address'])
+        self.stem, self.suffix = split_street(GLUED_STR_RE.sub('strasse', street_key(query.street)))
+        self.number = query.number
+        self.postcode = query.postcode
+        self.grams = frozenset(self.stem[i:i + NGRAM] for i in range(max(len(self.stem) - NGRAM + 1, 1)))
+        self.source = (fields.get('sheet', 0), (fields.get('owner') or '').strip().lower())
+        self.rooms = fields.get('bedrooms')
+        self.guests = fields.get('guests')
+        self.property_type = fields.get('property_type')
+
+
+def split_street(street: str) -> Tuple[str, str]:
+    """(distinctive part, generic ending) of a street_key, with spelled-out umlauts folded"""
+    street = UMLAUT_RE.sub(r'\1', street)
+    for suffix in STREET_SUFFIXES:
+        if street.endswith(suffix) and len(street) - len(suffix) >= NGRAM:
+            return street[:-len(suffix)], suffix
+    return street, ''
+
+
+def score(a: Candidate, b: Candidate) -> float:
+    """Similarity of two candidates sharing a house number, 0..1 (0 when their postcodes differ)"""
+    if a.postcode and b.postcode and a.postcode != b.postcode:
+        return 0.0
+    similarity = 1.0 if a.stem == b.stem else SequenceMatcher(None, a.stem, b.stem).ratio()
+    if a.suffix != b.suffix:
+        # Talstrasse and Talweg are different streets
+        similarity /= 2
+    return (0.6 * similarity + 0.15 * (a.rooms == b.rooms) + 0.15 * (a.guests == b.guests)
+            + 0.1 * (a.property_type == b.property_type))
+
+
+def candidate_pairs(candidates: List[Candidate], min_shared: float = 0.5) -> Iterator[Tuple[int, int]]:
+    """Pairs of rows from different sources with the same house number sharing trigrams.
+
+    Pairs share at least min_shared of the trigrams of the longer street
+    name. Only a prefix of each row's trigrams, rarest first, is indexed
+    (prefix filtering): rows sharing that many trigrams always share one of
+    those, so common trigrams seldom make a block and the work stays close
+    to linear in the rows.
+    """
+    frequency = Counter((c.number, gram) for c in candidates if c.number for gram in c.grams)
+    blocks: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+    for i, candidate in enumerate(candidates):
+        if not candidate.number:
+            continue
+        grams = sorted(candidate.grams, key=lambda gram: (frequency[(candidate.number, gram)], gram))
+        for gram in grams[:len(grams) - math.ceil(min_shared * len(grams)) + 1]:
+            blocks[(candidate.number, gram)].append(i)
+
+    seen = set()
+    for rows in blocks.values():
+        for x, i in enumerate(rows):
+            a = candidates[i]
+            for j in rows[x + 1:]:
+                b = candidates[j]
+                if b.source == a.source or (i, j) in seen:
+                    continue
+                seen.add((i, j))
+                if len(a.grams & b.grams) >= min_shared * max(len(a.grams), len(b.grams)):
+                    yield i, j
+
+
+def find_duplicates(rows: List[dict]) -> Tuple[List[List[int]], List[Tuple[int, int, float]]]:
+    """(groups of rows that are one listing, in row order; pairs to review with their score).
+
+    A group holds at most one row per source. Pairs are taken best score
+    first, so a row pairs with its closest match.
+    """
+    candidates = [Candidate(fields) for fields in rows]
+    scored = []
+    for i, j in candidate_pairs(candidates):
+        value = score(candidates[i], candidates[j])
+        if value >= REVIEW_SCORE:
+            scored.append((value, i, j))
+    scored.sort(key=lambda item: (-item[0], item[1], item[2]))
+
+    parent = list(range(len(rows)))
+    sources = {}
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    review = []
+    for value, i, j in scored:
+        if value < MERGE_SCORE:
+            review.append((i, j, round(value, 3)))
+            continue
+        a, b = find(i), find(j)
+        if a == b:
+            continue
+        a_sources = sources.get(a, {candidates[a].source})
+        b_sources = sources.get(b, {candidates[b].source})
+        if a_sources & b_sources:
+            # Either row is already matched to a row of the other's source
+            continue
+        a, b = min(a, b), max(a, b)
+        parent[b] = a
+        sources[a] = a_sources | b_sources
+        sources.pop(b, None)
+
+    groups = defaultdict(list)
+    for i in range(len(rows)):
+        groups[find(i)].append(i)
+    return [members for members in groups.values() if len(members) > 1], review
+
+
+def merge_group(rows: List[dict]) -> dict:
+    """The first row of a group, with fields it lacks taken from the later ones"""
+    merged = dict(rows[0])
+    for other in rows[1:]:
+        for field in MERGED_FIELDS:
+            if merged.get(field) is None and other.get(field) is not None:
+                merged[field] = other[field]
+    return merged
+
+
+def dedup_rows(based: Iterable[Tuple[dict, str]], merge: bool = False,
+               report_path: Optional[Path] = REPORT_FILE) -> Iterator[Tuple[dict, str]]:
+    """Report duplicate listings and, with merge, keep only the first row of each (in row order)"""
+    based = list(based)
+    groups, review = find_duplicates([fields for fields, _ in based])
+
+    def describe(i: int) -> dict:
+        fields = based[i][0]
+        return {'sheet': fields.get('sheet', 0), 'address': fields['address'], 'rooms': fields['bedrooms'],
+                'guests': fields['guests'], 'type': fields['property_type'], 'owner': fields.get('owner')}
+
+    if report_path:
+        report = {
+            'merged' if merge else 'duplicates': [[describe(i) for i in group] for group in groups],
+            'review': [{'score': value, 'rows': [describe(i), describe(j)]} for i, j, value in review],
+        }
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    duplicates = sum(len(group) - 1 for group in groups)
+    print(f"Duplicate listings: {len(groups)} listings found in several sources "
+          f"({duplicates} {'rows merged' if merge else 'extra rows kept'}), {len(review)} pairs to review"
+          + (f"; see {report_path}" if report_path else ''))
+
+    if not merge:
+        yield from based
+        return
+
+    dropped = set()
+    replaced = {}
+    for group in groups:
+        replaced[group[0]] = merge_group([based[i][0] for i in group])
+        dropped.update(group[1:])
+    for i, (fields, base_slug) in enumerate(based):
+        if i not in dropped:
+            yield replaced.get(i, fields), base_slug
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from import_properties import parse_workbook
+
+    parser = argparse.ArgumentParser(description='Find listings that appear in several owner workbooks')
+    parser.add_argument('--excel', nargs='+', required=True, help='Workbooks to compare')
+    parser.add_argument('--report', type=Path, default=REPORT_FILE, help='Where to write the duplicates found')
+
+    args = parser.parse_args()
+    errors = []
+    based = [item for sheet, path in enumerate(args.excel)
+             for item in parse_workbook(path, errors, stream=True, sheet=sheet)]
+    print(f"{len(based)} rows in {len(args.excel)} workbooks ({len(errors)} rows with errors)")
+    for _ in dedup_rows(based, report_path=args.report):
+        pass
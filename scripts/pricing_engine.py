@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Batched stay pricing over pricing_rules and availability
+Usage: python scripts/pricing_engine.py --check-in DATE --check-out DATE [--availability FILE] [--limit N]
+
+Rules and availability are painted onto a run of nights per property,
+spanning that property's own rules and ranges:
+- the nightly price is base_price_per_night * wef_multiplier of the rule in
+  force, rounded to cents; non-default rules beat the default one and a
+  narrower validity window beats a wider one;
+- an 'available' availability range with a price_override replaces the
+  nightly price for its nights; booked, blocked and maintenance ranges make
+  them unbookable. Ranges cover start_date up to, not including, end_date,
+  like a stay from check-in to check-out;
+- min_stay and cleaning_fee come from the rule in force on the check-in night.
+Prefix sums (in whole cents, so totals are exact) over each run price any
+stay with two lookups, so every property x stay window pair of a search is
+quoted in one vectorized call. The runs are stored end to end in flat
+arrays, so a rule with a mistyped year only lengthens its own property's run.
+"""
+
+import json
+import sys
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+try:
+    import numpy as np
+except ImportError:
+    print("Installing required packages...")
+    import subprocess
+    subprocess.check_call([sys.executable, '-m', 'pip', 'install', 'numpy', '-q'])
+    import numpy as np
+
+from supabase_client import fetch_all
+
+
+DATA_DIR = Path(__file__).parent.parent / 'data'
+PRICING_FILE = DATA_DIR / 'pricing_rules.json'
+AVAILABILITY_FILE = DATA_DIR / 'availability.json'
+
+UNAVAILABLE_STATUSES = ('booked', 'blocked', 'maintenance')
+
+# Quote statuses, in the order they are checked
+OK = 'ok'
+INVALID_DATES = 'invalid_dates'
+BLOCKED = 'blocked'
+UNPRICED = 'unpriced'
+MIN_STAY = 'min_stay'
+
+DateLike = Union[date, str]
+
+
+def day_number(value: DateLike) -> int:
+    """Ordinal day of a date or ISO date string (timestamps are cut to their date)"""
+    if isinstance(value, date):
+        return value.toordinal()
+    return date.fromisoformat(str(value)[:10]).toordinal()
+
+
+def nightly_cents(price, multiplier=None) -> int:
+    """A nightly rate in whole cents: price (2 decimals) times multiplier (2 decimals), rounded half up"""
+    price_cents = round(float(price) * 100)
+    factor = round(float(multiplier) * 100) if multiplier is not None else 100
+    return (price_cents * factor + 50) // 100
+
+
+class PricingEngine:
+    """Nightly price, min-stay and cleaning-fee runs for every property, with prefix sums.
+
+    Records are matched to properties by key_field: property_slug for the
+    JSON files written by import_properties.py, property_id for rows read
+    from the database. Property row r covers days[r] nights from the ordinal
+    day first_day[r], at offsets[r] in the flat per-night arrays.
+    """
+
+    def __init__(self, rules: Iterable[dict], availability: Iterable[dict] = (), key_field: str = 'property_slug'):
+        rules = list(rules)
+        availability = list(availability)
+        self.key_field = key_field
+        self.keys: List[str] = sorted({r[key_field] for r in rules} | {a[key_field] for a in availability})
+        self.rows: Dict[str, int] = {key: row for row, key in enumerate(self.keys)}
+
+        spans = [(day_number(r['valid_from']), day_number(r['valid_to']) + 1) for r in rules]
+        spans += [(day_number(a['start_date']), day_number(a['end_date'])) for a in availability]
+        span_rows = np.array([self.rows[r[key_field]] for r in rules] + [self.rows[a[key_field]] for a in availability],
+                             dtype=np.int64)
+        bounds = np.array(spans, dtype=np.int64).reshape(-1, 2)
+        self.first_day = np.full(len(self.keys), np.iinfo(np.int64).max)
+        last_day = np.full(len(self.keys), np.iinfo(np.int64).min)
+        np.minimum.at(self.first_day, span_rows, bounds[:, 0])
+        np.maximum.at(last_day, span_rows, bounds[:, 1])
+        self.days = np.maximum(last_day - self.first_day, 0)
+        self.offsets = np.concatenate(([0], np.cumsum(self.days)))
+        # One spare night at the end keeps the check-in lookup of an empty last run in bounds
+        size = int(self.offsets[-1]) + 1
+        # Position of each span's first night in the flat arrays
+        base = self.offsets[:-1][span_rows] - self.first_day[span_rows]
+
+        cents = np.full(size, -1, dtype=np.int64)
+        self.min_stay = np.ones(size, dtype=np.int32)
+        self.cleaning_fee = np.zeros(size)
+        blocked = np.zeros(size, dtype=bool)
+
+        # Paint broad rules first so the more specific ones overwrite them
+        order = sorted(range(len(rules)), key=lambda i: (not rules[i].get('is_default', False), spans[i][0] - spans[i][1]))
+        for i in order:
+            rule = rules[i]
+            start, end = base[i] + spans[i][0], base[i] + spans[i][1]
+            cents[start:end] = nightly_cents(rule['base_price_per_night'], rule.get('wef_multiplier'))
+            self.min_stay[start:end] = rule.get('min_stay') or 1
+            self.cleaning_fee[start:end] = float(rule.get('cleaning_fee') or 0)
+
+        for i, entry in enumerate(availability, len(rules)):
+            start, end = base[i] + spans[i][0], base[i] + spans[i][1]
+            if entry.get('status', 'available') in UNAVAILABLE_STATUSES:
+                blocked[start:end] = True
+            elif entry.get('price_override') is not None:
+                cents[start:end] = nightly_cents(entry['price_override'])
+
+        unpriced = cents < 0
+        self.nightly_price = np.where(unpriced, np.nan, cents / 100)
+        self.blocked = blocked
+        self._cent_sums = _prefix_sums(np.where(unpriced, 0, cents))
+        self._unpriced_sums = _prefix_sums(unpriced.astype(np.int64))
+        self._blocked_sums = _prefix_sums(blocked.astype(np.int64))
+
+    @classmethod
+    def load(cls, pricing_path: Path = PRICING_FILE, availability_path: Optional[Path] = None) -> 'PricingEngine':
+        """Engine over the import's pricing_rules.json and, if given or present, an availability export"""
+        with open(pricing_path, 'r', encoding='utf-8') as f:
+            rules = json.load(f)
+        availability = []
+        availability_path = availability_path or (AVAILABILITY_FILE if AVAILABILITY_FILE.exists() else None)
+        if availability_path:
+            with open(availability_path, 'r', encoding='utf-8') as f:
+                availability = json.load(f)
+        return cls(rules, availability)
+
+    @classmethod
+    def from_supabase(cls, supabase, page_size: int = 1000) -> 'PricingEngine':
+        """Engine over the pricing_rules and availability tables, keyed by property_id"""
+        rules = fetch_all(supabase, 'pricing_rules', 'property_id, base_price_per_night, wef_multiplier, min_stay, '
+                                                     'cleaning_fee, valid_from, valid_to, is_default', page_size)
+        availability = fetch_all(supabase, 'availability', 'property_id, start_date, end_date, status, price_override',
+                                 page_size)
+        return cls(rules, availability, key_field='property_id')
+
+    def quote_batch(self, check_ins: Sequence[DateLike], check_outs: Sequence[DateLike],
+                    properties: Optional[Sequence[str]] = None) -> dict:
+        """Quote every property for every stay window in one call.
+
+        check_ins and check_outs are parallel sequences of W windows;
+        properties defaults to every property with rules or availability.
+        Returns a dict of (properties x W) arrays: nights, subtotal,
+        cleaning_fee, total (NaN unless status is 'ok') and status, plus the
+        property keys in row order.
+        """
+        keys = list(self.keys if properties is None else properties)
+        missing = [key for key in keys if key not in self.rows]
+        if missing:
+            raise ValueError(f"No pricing rules or availability for: {', '.join(map(str, missing[:10]))}")
+        rows = np.array([self.rows[key] for key in keys], dtype=np.int64)[:, None]
+        first_day, days, offset = self.first_day[rows], self.days[rows], self.offsets[rows]
+
+        start = np.array([day_number(d) for d in check_ins], dtype=np.int64)
+        end = np.array([day_number(d) for d in check_outs], dtype=np.int64)
+        nights = end - start
+        valid = nights > 0
+        start = start[None, :] - first_day
+        end = end[None, :] - first_day
+        inside = valid[None, :] & (start >= 0) & (end <= days)
+        # Clipped lookups stay within each property's run; windows outside it are marked unpriced below
+        start_at = offset + np.clip(start, 0, days)
+        end_at = offset + np.clip(end, np.clip(start, 0, days), days)
+        check_in_at = offset + np.clip(start, 0, np.maximum(days - 1, 0))
+
+        subtotal = (self._cent_sums[end_at] - self._cent_sums[start_at]) / 100
+        unpriced = (self._unpriced_sums[end_at] - self._unpriced_sums[start_at] > 0) | ~inside
+        blocked = self._blocked_sums[end_at] - self._blocked_sums[start_at] > 0
+        min_stay = self.min_stay[check_in_at]
+        cleaning_fee = self.cleaning_fee[check_in_at]
+
+        nights = np.broadcast_to(nights[None, :], subtotal.shape)
+        status = np.select(
+            [np.broadcast_to(~valid[None, :], subtotal.shape), blocked, unpriced, nights < min_stay],
+            [INVALID_DATES, BLOCKED, UNPRICED, MIN_STAY],
+            default=OK,
+        )
+        ok = status == OK
+        cleaning_fee = np.where(ok, cleaning_fee, np.nan)
+        subtotal = np.where(ok, subtotal, np.nan)
+        return {
+            'properties': keys,
+            'nights': nights,
+            'subtotal': subtotal,
+            'cleaning_fee': cleaning_fee,
+            'total': np.round(subtotal + cleaning_fee, 2),
+            'status': status,
+        }
+
+    def quote(self, key: str, check_in: DateLike, check_out: DateLike) -> dict:
+        """Price breakdown of one stay, shaped like the offer breakdown"""
+        batch = self.quote_batch([check_in], [check_out], [key])
+        nights = int(batch['nights'][0, 0])
+        subtotal = float(batch['subtotal'][0, 0])
+        return {
+            'status': str(batch['status'][0, 0]),
+            'nights': nights,
+            'price_per_night': round(subtotal / nights, 2) if nights > 0 and subtotal == subtotal else None,
+            'subtotal': subtotal,
+            'cleaning_fee': float(batch['cleaning_fee'][0, 0]),
+            'total': float(batch['total'][0, 0]),
+        }
+
+    def offers(self, check_in: DateLike, check_out: DateLike, properties: Optional[Sequence[str]] = None,
+               max_total: Optional[float] = None) -> List[dict]:
+        """Bookable properties for one stay, cheapest first"""
+        batch = self.quote_batch([check_in], [check_out], properties)
+        total = batch['total'][:, 0]
+        rows = np.flatnonzero(batch['status'][:, 0] == OK)
+        if max_total is not None:
+            rows = rows[total[rows] <= max_total]
+        rows = rows[np.argsort(total[rows], kind='stable')]
+        return [{
+            self.key_field: batch['properties'][row],
+            'nights': int(batch['nights'][row, 0]),
+            'subtotal': float(batch['subtotal'][row, 0]),
+            'cleaning_fee': float(batch['cleaning_fee'][row, 0]),
+            'total': float(total[row]),
+        } for row in rows]
+
+
+def _prefix_sums(values: np.ndarray) -> np.ndarray:
+    """Cumulative sums with a leading zero: sums[b] - sums[a] totals nights a..b-1"""
+    sums = np.zeros(len(values) + 1, dtype=values.dtype)
+    np.cumsum(values, out=sums[1:])
+    return sums
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Quote a stay for every property')
+    parser.add_argument('--check-in', required=True, help='Check-in date (YYYY-MM-DD)')
+    parser.add_argument('--check-out', required=True, help='Check-out date (YYYY-MM-DD)')
+    parser.add_argument('--pricing', type=Path, default=PRICING_FILE, help='pricing_rules.json to load')
+    parser.add_argument('--availability', type=Path, help='Availability export (JSON list of table rows)')
+    parser.add_argument('--max-total', type=float, help='Only offers up to this total')
+    parser.add_argument('--limit', type=int, default=20, help='Offers to print')
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    engine = PricingEngine.load(args.pricing, args.availability)
+    loaded = time.perf_counter() - start
+
+    start = time.perf_counter()
+    offers = engine.offers(args.check_in, args.check_out, max_total=args.max_total)
+    elapsed = time.perf_counter() - start
+
+    print(f"Loaded rules for {len(engine.keys)} properties, {engine.days.sum()} nights in all, in {loaded * 1000:.1f} ms")
+    print(f"{len(offers)} bookable properties, quoted in {elapsed * 1000:.2f} ms")
+    for offer in offers[:args.limit]:
+        print(f"  {offer['property_slug'][:45]:<45} {offer['nights']:>3} nights {offer['subtotal']:>12,.2f} "
+              f"+ {offer['cleaning_fee']:>8,.2f} = {offer['total']:>12,.2f}")
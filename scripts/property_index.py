@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+In-memory search index over the imported properties
+Usage: python scripts/property_index.py [--city CITY ...] [--type TYPE ...] [--min-guests N] [--min-rooms N]
+                                        [--max-distance KM] [--min-price CHF] [--max-price CHF]
+                                        [--active | --inactive] [--sort FIELD] [--desc] [--limit N]
+
+Loads data/properties.json (or records straight from the import) into
+- sorted arrays for the numeric fields (capacity, rooms, distance_to_congress,
+  wef_price), answered with binary search;
+- bitmap indexes for the categorical fields (city, property_type, active).
+A compound query starts from whichever predicate matches the fewest rows
+and checks the others only on those, so it costs microseconds instead of a
+scan of every record. refresh() picks up a new import by applying only the
+rows that were added, changed or removed.
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    print("Installing required packages...")
+    import subprocess
+    subprocess.check_call([sys.executable, '-m', 'pip', 'install', 'numpy', '-q'])
+    import numpy as np
+
+
+PROPERTIES_FILE = Path(__file__).parent.parent / 'data' / 'properties.json'
+
+RANGE_FIELDS = ('capacity', 'rooms', 'distance_to_congress', 'wef_price')
+CATEGORICAL_FIELDS = ('city', 'property_type', 'active')
+
+# An update touching more rows than this share of the index is applied as a full rebuild
+REBUILD_FRACTION = 0.25
+
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.int64)
+
+
+def category_key(value):
+    """Bitmap key for a categorical value; strings match case- and whitespace-insensitively"""
+    return value.strip().casefold() if isinstance(value, str) else value
+
+
+def _number(value) -> float:
+    try:
+        return float(value) if value is not None else np.nan
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class PropertyIndex:
+    """Sorted-array and bitmap indexes over a list of property records.
+
+    Rows are numbered in the order records were added. A removed row leaves
+    a cleared bit in the `alive` bitmap; the index is rebuilt from scratch
+    once such gaps, or the size of an update, pass REBUILD_FRACTION.
+    """
+
+    def __init__(self, records: Iterable[dict] = (), source: Optional[Path] = None):
+        self.source = Path(source) if source else None
+        self._source_stamp = None
+        self._build(list(records))
+
+    @classmethod
+    def load(cls, path: Path = PROPERTIES_FILE) -> 'PropertyIndex':
+        """Index the properties.json written by import_properties.py"""
+        index = cls(source=path)
+        index.refresh()
+        return index
+
+    def __len__(self) -> int:
+        return len(self.slugs)
+
+    # Queries
+
+    def query(self, sort: Optional[str] = None, descending: bool = False, limit: Optional[int] = None,
+              **filters) -> List[dict]:
+        """Records matching every filter, e.g. query(capacity=(8, None), distance_to_congress=(None, 1),
+        active=True, sort='wef_price').
+
+        Numeric fields take a value or an inclusive (min, max) pair with None
+        for an open end; rows without a value never match. Categorical fields
+        take a value or a list of accepted values. Without sort, results come
+        in row order.
+        """
+        return [self.records[row] for row in self.query_rows(sort, descending, limit, **filters)]
+
+    def query_rows(self, sort: Optional[str] = None, descending: bool = False, limit: Optional[int] = None,
+                   **filters) -> np.ndarray:
+        """Row numbers of the records matching the filters (see query)"""
+        bitmap = self.alive
+        ranges = []
+        for field, condition in filters.items():
+            if field in CATEGORICAL_FIELDS:
+                bitmap = bitmap & self._category_bitmap(field, condition)
+            elif field in RANGE_FIELDS:
+                low, high = _bounds(condition)
+                start, stop = self._positions(field, low, high)
+                ranges.append((stop - start, field, start, stop, low, high))
+            else:
+                raise ValueError(f"Cannot filter on {field!r}; indexed fields: {RANGE_FIELDS + CATEGORICAL_FIELDS}")
+
+        ranges.sort(key=lambda r: r[0])
+        if ranges and ranges[0][0] < _POPCOUNT[bitmap].sum():
+            # The narrowest range is a slice of its sorted array; the bitmap is checked per row
+            _, field, start, stop, _, _ = ranges.pop(0)
+            rows = self.sorted_rows[field][start:stop]
+            rows = rows[(bitmap[rows >> 3] >> (7 - (rows & 7)).astype(np.uint8)) & 1 == 1]
+        else:
+            rows = np.flatnonzero(np.unpackbits(bitmap, count=self.size))
+
+        for _, field, _, _, low, high in ranges:
+            values = self.values[field][rows]
+            keep = np.ones(len(rows), dtype=bool)
+            if low is not None:
+                keep &= values >= low
+            if high is not None:
+                keep &= values <= high
+            rows = rows[keep]
+
+        if sort:
+            if sort not in RANGE_FIELDS:
+                raise ValueError(f"Cannot sort by {sort!r}; sortable fields: {RANGE_FIELDS}")
+            rows = rows[np.argsort(self._sort_keys(sort, descending)[rows], kind='stable')]
+        else:
+            rows = np.sort(rows)
+        return rows[:limit] if limit is not None else rows
+
+    def count(self, **filters) -> int:
+        return len(self.query_rows(**filters))
+
+    # Updates
+
+    def refresh(self) -> Optional[dict]:
+        """Re-read the source file if it changed since it was indexed; returns update() stats or None"""
+        stat = self.source.stat()
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self._source_stamp:
+            return None
+        with open(self.source, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        self._source_stamp = stamp
+        return self.update(records)
+
+    def update(self, records: Iterable[dict]) -> dict:
+        """Bring the index in line with a new full list of records (e.g. the next import), matched by slug"""
+        records = list(records)
+        incoming = {record['slug']: record for record in records}
+        removed = [slug for slug in self.slugs if slug not in incoming]
+        changed = [r for r in records if r['slug'] in self.slugs and self.records[self.slugs[r['slug']]] != r]
+        added = [r for r in records if r['slug'] not in self.slugs]
+        stats = {'added': len(added), 'changed': len(changed), 'removed': len(removed),
+                 'unchanged': len(records) - len(added) - len(changed), 'rebuilt': False}
+
+        touched = len(added) + len(changed) + len(removed)
+        if touched > REBUILD_FRACTION * max(len(records), 1) or self.gaps + len(removed) > REBUILD_FRACTION * self.size:
+            self._build(records)
+            stats['rebuilt'] = True
+            return stats
+
+        # Touched rows are cleared and re-set bit by bit; the sorted arrays are re-sorted once per field
+        old_rows = [self.slugs.pop(slug) for slug in removed] + [self.slugs[r['slug']] for r in changed]
+        for row in old_rows:
+            self._clear_row(row)
+        self.gaps += len(removed)
+
+        new_rows = [(self.slugs[r['slug']], r) for r in changed]
+        first = self.size
+        self._grow(first + len(added))
+        for row, record in enumerate(added, first):
+            self.slugs[record['slug']] = row
+            new_rows.append((row, record))
+        for row, record in new_rows:
+            self._set_row(row, record)
+
+        for field in RANGE_FIELDS:
+            self._sort_field(field)
+        self._sort_cache = {}
+        return stats
+
+    # Internals
+
+    def _build(self, records: List[dict]):
+        self.size = len(records)
+        self.records: List[Optional[dict]] = list(records)
+        self.slugs: Dict[str, int] = {record['slug']: row for row, record in enumerate(records)}
+        self.gaps = 0
+        self._sort_cache: Dict[Tuple[str, bool], np.ndarray] = {}
+
+        self.values: Dict[str, np.ndarray] = {}
+        self.sorted_values: Dict[str, np.ndarray] = {}
+        self.sorted_rows: Dict[str, np.ndarray] = {}
+        for field in RANGE_FIELDS:
+            self.values[field] = np.array([_number(record.get(field)) for record in records], dtype=np.float64)
+            self._sort_field(field)
+
+        self.alive = np.packbits(np.ones(self.size, dtype=bool))
+        self.bitmaps: Dict[str, Dict[object, np.ndarray]] = {}
+        for field in CATEGORICAL_FIELDS:
+            codes: Dict[object, int] = {}
+            column = np.array([codes.setdefault(category_key(record.get(field)), len(codes)) for record in records],
+                              dtype=np.int64)
+            self.bitmaps[field] = {key: np.packbits(column == code) for key, code in codes.items()}
+
+    def _sort_field(self, field: str):
+        """Sort the rows that have a value by (value, row), so equal values stay in row order"""
+        values = self.values[field]
+        rows = np.flatnonzero(~np.isnan(values))
+        rows = rows[np.argsort(values[rows], kind='stable')]
+        self.sorted_values[field] = values[rows]
+        self.sorted_rows[field] = rows
+
+    def _category_bitmap(self, field: str, condition) -> np.ndarray:
+        accepted = condition if isinstance(condition, (list, tuple, set, frozenset)) else [condition]
+        bitmap = np.zeros_like(self.alive)
+        for value in accepted:
+            match = self.bitmaps[field].get(category_key(value))
+            if match is not None:
+                bitmap |= match
+        return bitmap
+
+    def _positions(self, field: str, low: Optional[float], high: Optional[float]) -> Tuple[int, int]:
+        values = self.sorted_values[field]
+        start = int(np.searchsorted(values, low, 'left')) if low is not None else 0
+        stop = int(np.searchsorted(values, high, 'right')) if high is not None else len(values)
+        return start, max(start, stop)
+
+    def _sort_keys(self, field: str, descending: bool) -> np.ndarray:
+        """Per-row sort key: position in the sorted array, rows without a value last either way"""
+        keys = self._sort_cache.get((field, descending))
+        if keys is None:
+            rows = self.sorted_rows[field]
+            keys = np.full(self.size, len(rows), dtype=np.int64)
+            keys[rows] = np.arange(len(rows))
+            if descending:
+                # Reverse the value order but keep equal values in row order
+                values = self.sorted_values[field]
+                first_of_value = np.searchsorted(values, values, 'left')
+                last_of_value = np.searchsorted(values, values, 'right') - 1
+                keys[rows] = (len(rows) - 1 - last_of_value) + (np.arange(len(rows)) - first_of_value)
+            self._sort_cache[(field, descending)] = keys
+        return keys
+
+    def _grow(self, size: int):
+        """Make room for rows up to size in the columns and bitmaps"""
+        for field in RANGE_FIELDS:
+            self.values[field] = np.concatenate([self.values[field], np.full(size - self.size, np.nan)])
+        self.records.extend([None] * (size - self.size))
+        nbytes = (size + 7) // 8
+        if nbytes > len(self.alive):
+            extra = np.zeros(max(nbytes - len(self.alive), len(self.alive)), dtype=np.uint8)
+            self.alive = np.concatenate([self.alive, extra])
+            for bitmaps in self.bitmaps.values():
+                for key in bitmaps:
+                    bitmaps[key] = np.concatenate([bitmaps[key], extra])
+        self.size = size
+
+    def _set_row(self, row: int, record: dict):
+        self.records[row] = record
+        byte, bit = row >> 3, np.uint8(0x80 >> (row & 7))
+        self.alive[byte] |= bit
+        for field in CATEGORICAL_FIELDS:
+            key = category_key(record.get(field))
+            if key not in self.bitmaps[field]:
+                self.bitmaps[field][key] = np.zeros_like(self.alive)
+            self.bitmaps[field][key][byte] |= bit
+        for field in RANGE_FIELDS:
+            self.values[field][row] = _number(record.get(field))
+
+    def _clear_row(self, row: int):
+        record = self.records[row]
+        byte, bit = row >> 3, np.uint8(0x80 >> (row & 7))
+        self.alive[byte] &= ~bit
+        for field in CATEGORICAL_FIELDS:
+            self.bitmaps[field][category_key(record.get(field))][byte] &= ~bit
+        for field in RANGE_FIELDS:
+            self.values[field][row] = np.nan
+        self.records[row] = None
+
+
+def _bounds(condition) -> Tuple[Optional[float], Optional[float]]:
+    if isinstance(condition, (list, tuple)):
+        low, high = condition
+        return (float(low) if low is not None else None, float(high) if high is not None else None)
+    return float(condition), float(condition)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Query the imported properties')
+    parser.add_argument('--file', type=Path, default=PROPERTIES_FILE, help='properties.json to index')
+    parser.add_argument('--city', nargs='+', help='Accepted cities')
+    parser.add_argument('--type', nargs='+', dest='property_type', help='Accepted property types')
+    parser.add_argument('--min-guests', type=int, help='Minimum capacity')
+    parser.add_argument('--min-rooms', type=int, help='Minimum bedrooms')
+    parser.add_argument('--max-distance', type=float, help='Maximum distance to the Congress Centre in km')
+    parser.add_argument('--min-price', type=float, help='Minimum WEF price')
+    parser.add_argument('--max-price', type=float, help='Maximum WEF price')
+    parser.add_argument('--active', action='store_const', const=True, help='Only active properties')
+    parser.add_argument('--inactive', action='store_const', const=False, dest='active',
+                        help='Only inactive properties')
+    parser.add_argument('--sort', choices=RANGE_FIELDS, help='Sort by this field (missing values last)')
+    parser.add_argument('--desc', action='store_true', help='Sort descending')
+    parser.add_argument('--limit', type=int, default=20, help='Rows to print')
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = PropertyIndex.load(args.file)
+    print(f"Indexed {len(index)} properties in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    filters = {}
+    if args.city:
+        filters['city'] = args.city
+    if args.property_type:
+        filters['property_type'] = args.property_type
+    if args.active is not None:
+        filters['active'] = args.active
+    for field, low, high in (('capacity', args.min_guests, None), ('rooms', args.min_rooms, None),
+                             ('distance_to_congress', None, args.max_distance),
+                             ('wef_price', args.min_price, args.max_price)):
+        if low is not None or high is not None:
+            filters[field] = (low, high)
+
+    start = time.perf_counter()
+    rows = index.query_rows(sort=args.sort, descending=args.desc, **filters)
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(rows)} matches in {elapsed * 1e6:.0f} µs")
+    for row in rows[:args.limit]:
+        p = index.records[row]
+        price = f"{p['wef_price']:,.0f}" if p.get('wef_price') is not None else '-'
+        print(f"  {p['name'][:40]:<40} {p['city']:<12} {p['capacity']:>3} guests {p['rooms']:>2} rooms "
+              f"{p['distance_to_congress']:>5.1f} km {price:>10}")
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Compact exports of the imported properties, written next to properties.json
+- data/properties.ndjson: one property per line, for streaming consumers
+- data/properties_columns/<field>.json: one JSON array per field, so a reader
+  that needs only slug and external_link never parses the other columns
+"""
+
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+
+DATA_DIR = Path(__file__).parent.parent / 'data'
+NDJSON_FILE = 'properties.ndjson'
+COLUMNS_DIR = 'properties_columns'
+
+
+class NdjsonWriter:
+    """Write one compact JSON object per line, replacing the target on commit"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.tmp_path = self.path.with_name(self.path.name + '.tmp')
+        self.count = 0
+        self._file = open(self.tmp_path, 'w', encoding='utf-8')
+
+    def write(self, item: dict):
+        self._file.write(json.dumps(item, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self.count += 1
+
+    def commit(self):
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self._file.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+
+class ColumnarWriter:
+    """Write each field of the incoming records to its own JSON array file.
+
+    Columns are streamed into a temporary directory that replaces the
+    previous one on commit. Every record must have the given columns, or
+    without them the same keys as the first. The size and modification time
+    of the source file the records were also written to (properties.json) are
+    stored in _meta.json, so readers can tell when the export is stale.
+    """
+
+    def __init__(self, path: Path, columns: Optional[List[str]] = None, source: Optional[Path] = None):
+        self.path = Path(path)
+        self.tmp_path = self.path.with_name(self.path.name + '.tmp')
+        self.source = Path(source) if source else None
+        self.count = 0
+        self.columns: List[str] = []
+        self._files = {}
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+        self.tmp_path.mkdir(parents=True)
+        if columns:
+            self._open(columns)
+
+    def _open(self, columns: List[str]):
+        self.columns = list(columns)
+        for column in self.columns:
+            self._files[column] = open(self.tmp_path / f"{column}.json", 'w', encoding='utf-8')
+
+    def write(self, item: dict):
+        if not self.columns:
+            self._open(item)
+
+        separator = ',' if self.count else '['
+        for column in self.columns:
+            self._files[column].write(separator + json.dumps(item[column], ensure_ascii=False, separators=(',', ':')))
+        self.count += 1
+
+    def commit(self):
+        """Close the columns and swap them in; call after the source file is written"""
+        for f in self._files.values():
+            f.write(']' if self.count else '[]')
+            f.close()
+        meta = {'rows': self.count, 'columns': self.columns}
+        if self.source is not None:
+            meta['source'] = source_stamp(self.source)
+        with open(self.tmp_path / '_meta.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+        old_path = self.path.with_name(self.path.name + '.old')
+        shutil.rmtree(old_path, ignore_errors=True)
+        if self.path.exists():
+            os.replace(self.path, old_path)
+        os.replace(self.tmp_path, self.path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+    def abort(self):
+        for f in self._files.values():
+            f.close()
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+
+
+def source_stamp(path: Path) -> Optional[List[int]]:
+    """Size and modification time of a file, or None when it does not exist"""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def read_columns(columns: List[str], data_dir: Optional[Path] = None) -> Dict[str, list]:
+    """Load only the requested property fields as {field: [values...]}.
+
+    Falls back to properties.json when no columnar export exists yet, or
+    when properties.json changed after the export was written.
+    """
+    data_dir = Path(data_dir or DATA_DIR)
+    columns_dir = data_dir / COLUMNS_DIR
+    properties_file = data_dir / 'properties.json'
+
+    meta = None
+    if (columns_dir / '_meta.json').exists():
+        with open(columns_dir / '_meta.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    if meta is not None and (not properties_file.exists() or meta.get('source') == source_stamp(properties_file)):
+        if not meta['rows']:
+            return {column: [] for column in columns}
+        result = {}
+        for column in columns:
+            with open(columns_dir / f"{column}.json", 'r', encoding='utf-8') as f:
+                result[column] = json.load(f)
+        return result
+
+    with open(properties_file, 'r', encoding='utf-8') as f:
+        properties = json.load(f)
+    return {column: [p.get(column) for p in properties] for column in columns}
+
+
+def read_properties(columns: List[str], data_dir: Optional[Path] = None) -> List[dict]:
+    """Load the requested property fields as a list of small dicts"""
+    data = read_columns(columns, data_dir)
+    return [dict(zip(columns, values)) for values in zip(*(data[c] for c in columns))]
+
+
+def iter_properties(data_dir: Optional[Path] = None) -> Iterator[dict]:
+    """Stream full property records from the NDJSON export"""
+    with open(Path(data_dir or DATA_DIR) / NDJSON_FILE, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
@@ -1,49 +1,38 @@
 #!/usr/bin/env python3
 """
 Scrape property images from beststaydavos.ch website links
-Usage: python scripts/scrape_images.py [--limit N] [--dry-run]
+Usage: python scripts/scrape_images.py [--limit N] [--dry-run] [--concurrency N [--per-host N] [--min-interval S]]
+                                       [--cache-ttl SECONDS] [--cache-max-mb N | --no-cache] [--no-derivatives]
+                                       [--resume]
 """
 
 import os
-import re
 import json
 import time
-import hashlib
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 from urllib.parse import urljoin, urlparse
-import sys
 
-# Install dependencies
-try:
-    import requests
-    from bs4 import BeautifulSoup
-except ImportError:
-    print("Installing required packages...")
-    import subprocess
-    subprocess.check_call([sys.executable, '-m', 'pip', 'install', 'requests', 'beautifulsoup4', '-q'])
-    import requests
-    from bs4 import BeautifulSoup
+import http_cache
+import http_client
+from html_images import parse_candidates, srcset_urls, style_urls
+from image_dedup import drop_near_duplicates
+from image_derivatives import generate_derivatives
+from image_store import ImageStore, image_extension
+from property_store import read_properties
+from scrape_journal import ScrapeJournal
 
-
-def get_image_filename(url: str, property_slug: str, index: int) -> str:
-    """Generate a filename for the image"""
-    # Get extension from URL
-    parsed = urlparse(url)
-    path = parsed.path.lower()
-    
-    if '.jpg' in path or '.jpeg' in path:
-        ext = 'jpg'
-    elif '.png' in path:
-        ext = 'png'
-    elif '.webp' in path:
-        ext = 'webp'
-    elif '.gif' in path:
-        ext = 'gif'
-    else:
-        ext = 'jpg'  # Default
-    
-    return f"{property_slug}_{index:02d}.{ext}"
+STATUS_LABELS = {
+    'downloaded': 'Downloaded',
+    'duplicate': 'Already stored',
+    'not_modified': 'Up to date',
+    'fresh': 'Up to date',
+    'exists': 'Already exists',
+    'resumed': 'Already downloaded',
+}
 
 
 def scrape_property_page(url: str, timeout: int = 10) -> List[str]:
@@ -53,82 +42,64 @@ def scrape_property_page(url: str, timeout: int = 10) -> List[str]:
         return []
     
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        }
-        
-        response = requests.get(url, headers=headers, timeout=timeout)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        images = []
-        
-        # Find all image sources
-        # Common patterns on property sites:
-        
-        # 1. Standard img tags
-        for img in soup.find_all('img'):
-            src = img.get('src') or img.get('data-src') or img.get('data-lazy-src')
-            if src:
-                # Make absolute URL
-                src = urljoin(url, src)
-                if is_property_image(src):
-                    images.append(src)
-        
-        # 2. Background images in style attributes
-        for elem in soup.find_all(style=True):
-            style = elem.get('style', '')
-            urls = re.findall(r'url\(["\']?([^"\')\s]+)["\']?\)', style)
-            for img_url in urls:
-                img_url = urljoin(url, img_url)
-                if is_property_image(img_url):
-                    images.append(img_url)
-        
-        # 3. Source sets (srcset)
-        for source in soup.find_all(['source', 'img']):
-            srcset = source.get('srcset', '')
-            if srcset:
-                # Parse srcset format: "url1 1x, url2 2x" or "url1 100w, url2 200w"
-                for part in srcset.split(','):
-                    src = part.strip().split()[0] if part.strip() else None
-                    if src:
-                        src = urljoin(url, src)
-                        if is_property_image(src):
-                            images.append(src)
+        # The page is parsed chunk by chunk as it arrives
+        cache = http_cache.get_cache()
+        if cache:
+            return extract_property_images(cache.iter_text(url, timeout=timeout), url)
         
-        # 4. Data attributes common in galleries
-        for elem in soup.find_all(attrs={'data-image': True}):
-            src = elem.get('data-image')
-            if src:
-                src = urljoin(url, src)
-                if is_property_image(src):
-                    images.append(src)
-        
-        for elem in soup.find_all(attrs={'data-full': True}):
-            src = elem.get('data-full')
-            if src:
-                src = urljoin(url, src)
-                if is_property_image(src):
-                    images.append(src)
-        
-        # Deduplicate while preserving order
-        seen = set()
-        unique_images = []
-        for img in images:
-            # Normalize URL for comparison
-            normalized = img.split('?')[0]  # Remove query params
-            if normalized not in seen:
-                seen.add(normalized)
-                unique_images.append(img)
-        
-        return unique_images
+        response = http_client.get(url, timeout=timeout, stream=True)
+        try:
+            response.raise_for_status()
+            return extract_property_images(response.iter_text(), url)
+        finally:
+            response.close()
         
     except Exception as e:
         print(f"  Error scraping {url}: {e}")
         return []
 
 
+def extract_property_images(html: Union[str, Iterable[str]], url: str) -> List[str]:
+    """Property image URLs in a page (whole or as text chunks), in one parsing pass"""
+    found = parse_candidates(html)
+    
+    # Candidates in the order of the patterns below, each in document order
+    candidates = []
+    
+    # 1. Standard img tags
+    for img in found.imgs:
+        candidates.append(img.get('src') or img.get('data-src') or img.get('data-lazy-src'))
+    
+    # 2. Background images in style attributes
+    for style in found.styles:
+        candidates.extend(style_urls(style))
+    
+    # 3. Source sets (srcset) of source and img tags
+    for srcset in found.srcsets:
+        candidates.extend(srcset_urls(srcset))
+    
+    # 4. Data attributes common in galleries
+    candidates.extend(found.data_images)
+    candidates.extend(found.data_fulls)
+    
+    # Make absolute, filter and deduplicate while preserving order
+    seen = set()
+    unique_images = []
+    for src in candidates:
+        if not src:
+            continue
+        src = urljoin(url, src)
+        if not is_property_image(src):
+            continue
+        # Normalize URL for comparison
+        normalized = src.split('?')[0]  # Remove query params
+        if normalized not in seen:
+            seen.add(normalized)
+            unique_images.append(src)
+    
+    return unique_images
+
+
 def is_property_image(url: str) -> bool:
     """Check if URL is likely a property image (not icon, logo, etc.)"""
     url_lower = url.lower()
@@ -159,38 +130,245 @@ def is_property_image(url: str) -> bool:
     return has_image_ext or from_image_service
 
 
-def download_image(url: str, output_path: Path, timeout: int = 30) -> bool:
-    """Download an image to the specified path"""
+def download_image(url: str, store: ImageStore, timeout: int = 30) -> Tuple[str, Optional[Path]]:
+    """Download an image into the content-addressed store
+    
+    Returns (status, path). Status is 'downloaded', 'duplicate' when the same
+    bytes were already stored, 'not_modified' or 'fresh' when the stored copy
+    is still current according to the HTTP cache, and '' on failure.
+    """
+    cache = http_cache.get_cache()
+    previous = store.path_for_url(url)
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-        }
-        
-        response = requests.get(url, headers=headers, timeout=timeout, stream=True)
-        response.raise_for_status()
+        if cache and previous and cache.fresh(url, previous):
+            return 'fresh', previous
         
-        # Check content type
-        content_type = response.headers.get('content-type', '')
-        if 'image' not in content_type and 'octet-stream' not in content_type:
-            return False
-        
-        # Write file
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(output_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+        headers = cache.validators(url, previous) if cache and previous else None
+        response = http_client.get(url, headers=headers, timeout=timeout, stream=True)
+        try:
+            if cache and previous and response.status_code == 304 and previous.exists():
+                cache.not_modified(url, previous)
+                return 'not_modified', previous
+            response.raise_for_status()
+            
+            # Check content type
+            content_type = response.headers.get('content-type', '')
+            if 'image' not in content_type and 'octet-stream' not in content_type:
+                return '', None
+            
+            # Identical bytes from another URL or property are stored once
+            _, path, created = store.ingest(response.iter_content(chunk_size=8192), image_extension(url), url=url)
+        finally:
+            # Hand the connection back to the pool even when the body is skipped
+            response.close()
         
-        return True
+        if cache:
+            cache.store(url, response, path)
+        return ('downloaded' if created else 'duplicate'), path
         
     except Exception as e:
         print(f"  Error downloading {url}: {e}")
-        return False
+        return '', None
+
+
+def record_property_images(results: Dict, store: ImageStore, slug: str, downloads: List[Tuple[str, str, Optional[Path]]]):
+    """Report a property's downloads in page order and index its distinct images
+    
+    Resized or re-encoded copies of the same photo are dropped here, keeping
+    the largest copy, so they never reach property_images.
+    """
+    root = Path(__file__).parent.parent
+    digests = []
+    
+    for img_url, status, path in downloads:
+        if not status:
+            continue
+        print(f"  {STATUS_LABELS[status]}: {path.name}")
+        if status == 'downloaded':
+            results['images_downloaded'] += 1
+        digests.append(store.urls[img_url])
+    
+    kept, dropped = drop_near_duplicates(store, dict.fromkeys(digests))
+    if dropped:
+        print(f"  Dropped {len(dropped)} near-duplicate image(s)")
+        results['near_duplicates'] += len(dropped)
+    
+    results['property_images'][slug] = [str(store.blob_path(digest).relative_to(root)) for digest in kept]
+    store.set_property_images(slug, kept)
+
+
+def crawl_properties_serial(properties: List[Dict], store: ImageStore, results: Dict, dry_run: bool = False,
+                            journal: Optional[ScrapeJournal] = None):
+    """Scrape pages and download images one at a time, filling `results`
+    
+    Work recorded in `journal` by an interrupted run is reused instead of fetched again.
+    """
+    cache = http_cache.get_cache()
+    
+    for i, prop in enumerate(properties, 1):
+        slug = prop['slug']
+        url = prop['external_link']
+        
+        print(f"\n[{i}/{len(properties)}] {prop['name']}")
+        print(f"  URL: {url}")
+        
+        # Scrape images (or take them from the journal of an interrupted run)
+        fetched_page = not (journal and url in journal.pages)
+        if fetched_page:
+            images = scrape_property_page(url)
+            if journal and images:
+                journal.page_done(url, images)
+        else:
+            images = journal.pages[url]
+        print(f"  Found {len(images)} images")
+        
+        results['images_found'] += len(images)
+        results['property_images'][slug] = []
+        
+        if dry_run:
+            for img in images[:5]:  # Show first 5
+                print(f"    - {img[:80]}...")
+            results['processed'] += 1
+            continue
+        
+        # Download images (limit to 10 per property)
+        downloads = []
+        for img_url in images[:10]:
+            previous = store.path_for_url(img_url)
+            resumed = journal.restore_image(img_url, store) if journal else None
+            
+            if resumed:
+                downloads.append((img_url, 'resumed', resumed))
+                continue
+            if previous and previous.exists() and not cache:
+                downloads.append((img_url, 'exists', previous))
+                continue
+            
+            status, path = download_image(img_url, store)
+            downloads.append((img_url, status, path))
+            if journal:
+                journal.image_done(img_url, status, path, store)
+            
+            # Be nice to the server
+            if status != 'fresh':
+                time.sleep(0.5)
+        
+        record_property_images(results, store, slug, downloads)
+        results['processed'] += 1
+        
+        # Be nice to the server
+        if fetched_page:
+            time.sleep(1)
+
+
+class HostLimiter:
+    """Politeness limit for the async crawler, per host.
+    
+    Caps concurrent requests to each host and spaces their start times by at
+    least min_interval seconds; this replaces the fixed sleeps of the serial crawl.
+    """
+    
+    def __init__(self, per_host: int = 4, min_interval: float = 0.1):
+        self.per_host = per_host
+        self.min_interval = min_interval
+        self._slots = {}
+        self._locks = {}
+        self._next_start = {}
+    
+    @asynccontextmanager
+    async def slot(self, url: str):
+        host = urlparse(url).netloc
+        slots = self._slots.setdefault(host, asyncio.Semaphore(self.per_host))
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        
+        async with slots:
+            async with lock:
+                now = asyncio.get_running_loop().time()
+                start = max(now, self._next_start.get(host, now))
+                self._next_start[host] = start + self.min_interval
+            if start > now:
+                await asyncio.sleep(start - now)
+            yield
+
+
+async def crawl_properties(properties: List[Dict], store: ImageStore, results: Dict, dry_run: bool = False,
+                           concurrency: int = 4, per_host: int = 4, min_interval: float = 0.1,
+                           journal: Optional[ScrapeJournal] = None):
+    """Scrape pages and download images concurrently, filling `results` like the serial loop.
+    
+    Up to `concurrency` pages and twice as many image downloads run at once;
+    requests run in threads so the existing blocking helpers are reused.
+    """
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency * 3))
+    
+    pages = asyncio.Semaphore(concurrency)
+    downloads = asyncio.Semaphore(concurrency * 2)
+    hosts = HostLimiter(per_host=per_host, min_interval=min_interval)
+    # One property's results are recorded at a time, in a worker thread
+    recording = asyncio.Lock()
+    cache = http_cache.get_cache()
+    
+    # Same key order as the serial crawl
+    for prop in properties:
+        results['property_images'][prop['slug']] = []
+    
+    async def fetch_image(img_url: str) -> Tuple[str, Optional[Path]]:
+        resumed = journal.restore_image(img_url, store) if journal else None
+        if resumed:
+            return 'resumed', resumed
+        previous = store.path_for_url(img_url)
+        if previous and previous.exists() and not cache:
+            return 'exists', previous
+        # Fresh cache entries need no request, so they skip the politeness limits
+        if cache and previous and cache.fresh(img_url, previous):
+            return 'fresh', previous
+        async with downloads, hosts.slot(img_url):
+            status, path = await asyncio.to_thread(download_image, img_url, store)
+        if journal:
+            journal.image_done(img_url, status, path, store)
+        return status, path
+    
+    async def crawl(i: int, prop: Dict):
+        slug = prop['slug']
+        url = prop['external_link']
+        
+        if journal and url in journal.pages:
+            images = journal.pages[url]
+        else:
+            async with pages, hosts.slot(url):
+                images = await asyncio.to_thread(scrape_property_page, url)
+            if journal and images:
+                journal.page_done(url, images)
+        
+        print(f"\n[{i}/{len(properties)}] {prop['name']}")
+        print(f"  URL: {url}")
+        print(f"  Found {len(images)} images")
+        results['images_found'] += len(images)
+        
+        if dry_run:
+            for img in images[:5]:  # Show first 5
+                print(f"    - {img[:80]}...")
+            results['processed'] += 1
+            return
+        
+        # Download images (limit to 10 per property), keeping their order in the results
+        fetched = await asyncio.gather(*(fetch_image(img_url) for img_url in images[:10]))
+        property_downloads = [(img_url, status, path) for img_url, (status, path) in zip(images, fetched)]
+        
+        # Near-duplicate detection decodes the images; keep that off the event loop
+        async with recording:
+            await loop.run_in_executor(None, record_property_images, results, store, slug, property_downloads)
+        results['processed'] += 1
+    
+    await asyncio.gather(*(crawl(i, prop) for i, prop in enumerate(properties, 1)))
 
 
-def scrape_all_properties(limit: Optional[int] = None, dry_run: bool = False):
+def scrape_all_properties(limit: Optional[int] = None, dry_run: bool = False, concurrency: Optional[int] = None,
+                          per_host: int = 4, min_interval: float = 0.1, derivatives: bool = True, resume: bool = False):
     """Scrape images for all properties with website links"""
     
-    # Load properties
+    # Load properties (only the fields needed here)
     data_dir = Path(__file__).parent.parent / 'data'
     properties_file = data_dir / 'properties.json'
     
@@ -198,8 +376,7 @@ def scrape_all_properties(limit: Optional[int] = None, dry_run: bool = False):
         print("Error: properties.json not found. Run import_properties.py first.")
         return
     
-    with open(properties_file, 'r', encoding='utf-8') as f:
-        properties = json.load(f)
+    properties = read_properties(['slug', 'name', 'external_link'], data_dir)
     
     # Filter properties with website links
     properties_with_links = [
@@ -213,61 +390,53 @@ def scrape_all_properties(limit: Optional[int] = None, dry_run: bool = False):
         properties_with_links = properties_with_links[:limit]
         print(f"Limiting to {limit} properties")
     
-    # Output directory
-    images_dir = Path(__file__).parent.parent / 'public' / 'images' / 'properties'
-    images_dir.mkdir(parents=True, exist_ok=True)
+    # Images go to the shared content-addressed store
+    store = ImageStore()
     
     # Track results
     results = {
         'processed': 0,
         'images_found': 0,
         'images_downloaded': 0,
+        'near_duplicates': 0,
         'errors': [],
         'property_images': {}
     }
     
-    for i, prop in enumerate(properties_with_links, 1):
-        slug = prop['slug']
-        url = prop['external_link']
-        
-        print(f"\n[{i}/{len(properties_with_links)}] {prop['name']}")
-        print(f"  URL: {url}")
-        
-        # Scrape images
-        images = scrape_property_page(url)
-        print(f"  Found {len(images)} images")
-        
-        results['images_found'] += len(images)
-        results['property_images'][slug] = []
-        
-        if dry_run:
-            for img in images[:5]:  # Show first 5
-                print(f"    - {img[:80]}...")
-            results['processed'] += 1
-            continue
-        
-        # Download images (limit to 10 per property)
-        for idx, img_url in enumerate(images[:10], 1):
-            filename = get_image_filename(img_url, slug, idx)
-            output_path = images_dir / filename
-            
-            if output_path.exists():
-                print(f"  Already exists: {filename}")
-                results['property_images'][slug].append(str(output_path.relative_to(Path(__file__).parent.parent)))
-                continue
-            
-            print(f"  Downloading: {filename}")
-            if download_image(img_url, output_path):
-                results['images_downloaded'] += 1
-                results['property_images'][slug].append(str(output_path.relative_to(Path(__file__).parent.parent)))
-            
-            # Be nice to the server
-            time.sleep(0.5)
-        
-        results['processed'] += 1
+    # Checkpoint every finished page and download; dry runs record nothing
+    journal = None
+    if not dry_run:
+        journal = ScrapeJournal('scrape_images', resume=resume)
+        if journal.resumed:
+            print(f"Resuming from {journal.path}: {journal.summary()} already done")
+    
+    try:
+        if concurrency:
+            # One pooled connection per worker thread so keep-alive connections are reused
+            http_client.configure(pool_size=concurrency * 3)
+            asyncio.run(crawl_properties(properties_with_links, store, results, dry_run=dry_run,
+                                         concurrency=concurrency, per_host=per_host, min_interval=min_interval,
+                                         journal=journal))
         
-        # Be nice to the server
-        time.sleep(1)
+        else:
+            crawl_properties_serial(properties_with_links, store, results, dry_run=dry_run, journal=journal)
+    except KeyboardInterrupt:
+        print(f"\nInterrupted. Run again with --resume to continue from {journal.path if journal else 'the start'}.")
+        raise
+    finally:
+        if journal:
+            journal.close()
+    
+    if not dry_run:
+        store.save()
+        if derivatives:
+            generate_derivatives(store, (digest for slug in results['property_images']
+                                         for digest in store.properties.get(slug, [])))
+    
+    cache = http_cache.get_cache()
+    if cache:
+        cache.save()
+        print(f"HTTP cache: {cache.summary()}")
     
     # Save results
     results_file = data_dir / 'scraped_images.json'
@@ -280,10 +449,11 @@ def scrape_all_properties(limit: Optional[int] = None, dry_run: bool = False):
     print(f"Properties processed: {results['processed']}")
     print(f"Total images found: {results['images_found']}")
     print(f"Images downloaded: {results['images_downloaded']}")
+    print(f"Near-duplicates dropped: {results['near_duplicates']}")
     print(f"Results saved to: {results_file}")
     
     if not dry_run:
-        print(f"Images saved to: {images_dir}")
+        print(f"Images saved to: {store.store_dir} (index: {store.index_path})")
     
     return results
 
@@ -296,7 +466,27 @@ if __name__ == '__main__':
                        help='Limit number of properties to scrape')
     parser.add_argument('--dry-run', action='store_true',
                        help='Only find images, do not download')
+    parser.add_argument('--concurrency', type=int, default=None,
+                       help='Crawl asynchronously with N concurrent page fetches (2N image downloads)')
+    parser.add_argument('--per-host', type=int, default=4,
+                       help='With --concurrency, max concurrent requests per host')
+    parser.add_argument('--min-interval', type=float, default=0.1,
+                       help='With --concurrency, min seconds between request starts to the same host')
+    parser.add_argument('--cache-ttl', type=float, default=http_cache.DEFAULT_TTL,
+                       help='Seconds a cached page or image is used without asking the server again')
+    parser.add_argument('--cache-max-mb', type=float, default=http_cache.DEFAULT_MAX_BYTES / 1024 / 1024,
+                       help='Size limit for cached pages (images are validated in place)')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Skip existing images by name instead of revalidating them with the server')
+    parser.add_argument('--no-derivatives', action='store_true',
+                       help='Do not render the resized WebP/AVIF copies after downloading')
+    parser.add_argument('--resume', action='store_true',
+                       help='Continue an interrupted run, skipping pages and images its journal records as done')
     
     args = parser.parse_args()
     
-    scrape_all_properties(limit=args.limit, dry_run=args.dry_run)
+    http_cache.configure(enabled=not args.no_cache, ttl=args.cache_ttl,
+                         max_bytes=int(args.cache_max_mb * 1024 * 1024))
+    scrape_all_properties(limit=args.limit, dry_run=args.dry_run, concurrency=args.concurrency,
+                          per_host=args.per_host, min_interval=args.min_interval,
+                          derivatives=not args.no_derivatives, resume=args.resume)
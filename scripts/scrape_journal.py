@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Append-only checkpoint journal for the scraper scripts
+Every finished page fetch and image download is written as one JSON line
+to data/scrape_journal/<name>.jsonl and flushed immediately, so a crash or
+Ctrl-C loses at most the request in flight. With resume=True the journal is
+replayed and the scrapers skip the work it already records.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from image_store import ImageStore
+
+
+JOURNAL_DIR = Path(__file__).parent.parent / 'data' / 'scrape_journal'
+
+# fsync after this many records; every record is flushed to the OS regardless
+SYNC_EVERY = 50
+
+
+class ScrapeJournal:
+    """Pages and images completed by a scrape run, recoverable after an interruption"""
+
+    def __init__(self, name: str, resume: bool = False, journal_dir: Path = JOURNAL_DIR):
+        self.path = Path(journal_dir) / f"{name}.jsonl"
+        self.pages: Dict[str, List[str]] = {}
+        self.images: Dict[str, dict] = {}
+        self.resumed = False
+        self._lock = threading.Lock()
+        self._unsynced = 0
+
+        if resume and self.path.exists():
+            self._replay()
+            self.resumed = True
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'a' if self.resumed else 'w', encoding='utf-8')
+        self._append({'type': 'run', 'resumed': self.resumed, 'started_at': time.strftime('%Y-%m-%d %H:%M:%S')})
+
+    def page_done(self, url: str, images: List[str]):
+        """Record the image URLs found on a page"""
+        self.pages[url] = images
+        self._append({'type': 'page', 'url': url, 'images': images})
+
+    def image_done(self, url: str, status: str, path: Optional[Path], store: ImageStore):
+        """Record a finished download (status as returned by download_image)"""
+        if not status or path is None:
+            return
+        entry = {'status': status, 'digest': store.urls[url], 'path': str(path.relative_to(store.root))}
+        self.images[url] = entry
+        self._append(dict(entry, type='image', url=url))
+
+    def restore_image(self, url: str, store: ImageStore) -> Optional[Path]:
+        """Blob path of an image downloaded by an earlier run, re-registered in the store if needed"""
+        entry = self.images.get(url)
+        if not entry:
+            return None
+        path = store.root / entry['path']
+        return path if store.restore(entry['digest'], path, url) else None
+
+    def summary(self) -> str:
+        return f"{len(self.pages)} pages, {len(self.images)} images"
+
+    def close(self):
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+    def _append(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self._unsynced += 1
+            if self._unsynced >= SYNC_EVERY:
+                os.fsync(self._file.fileno())
+                self._unsynced = 0
+
+    def _replay(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last line may be cut off by the interruption
+                    continue
+                if record['type'] == 'page':
+                    self.pages[record['url']] = record['images']
+                elif record['type'] == 'image':
+                    self.images[record['url']] = {k: record[k] for k in ('status', 'digest', 'path')}
@@ -1,35 +1,30 @@
 #!/usr/bin/env python3
 """
 Scrape all property images from beststaydavos.ch
-Usage: python scripts/scrape_website_images.py [--dry-run]
+Usage: python scripts/scrape_website_images.py [--dry-run] [--cache-ttl SECONDS] [--cache-max-mb N | --no-cache]
+                                                [--no-derivatives] [--resume] [--discover [--full]]
+
+By default the images are taken from the accommodation page. --discover
+lists every upload from the site's sitemap and WordPress media endpoint
+instead and downloads only the media that are new or changed since the
+last discovery run.
 """
 
 import os
-import re
 import json
 import time
-import hashlib
 from pathlib import Path
-from typing import List, Set
+from typing import Iterable, List, Optional, Set, Tuple, Union
 from urllib.parse import urljoin, urlparse
-import sys
-
-try:
-    import requests
-    from bs4 import BeautifulSoup
-except ImportError:
-    print("Installing required packages...")
-    import subprocess
-    subprocess.check_call([sys.executable, '-m', 'pip', 'install', 'requests', 'beautifulsoup4', '-q'])
-    import requests
-    from bs4 import BeautifulSoup
 
-
-def get_full_size_url(url: str) -> str:
-    """Convert WordPress thumbnail URL to full-size URL"""
-    # Remove size suffixes like -150x150, -300x200, -1024x768
-    pattern = r'-\d+x\d+(\.[a-zA-Z]+)$'
-    return re.sub(pattern, r'\1', url)
+import http_cache
+import http_client
+from html_images import parse_candidates, srcset_urls, style_urls
+from image_dedup import drop_near_duplicates
+from image_derivatives import generate_derivatives
+from image_store import ImageStore, image_extension
+from scrape_journal import ScrapeJournal
+from wp_discovery import MediaIndex, get_full_size_url
 
 
 def is_property_image(url: str) -> bool:
@@ -52,51 +47,81 @@ def is_property_image(url: str) -> bool:
     return True
 
 
-def download_image(url: str, output_path: Path, timeout: int = 30) -> bool:
-    """Download an image"""
+def download_image(url: str, store: ImageStore, timeout: int = 30,
+                   revalidate: bool = False) -> Tuple[str, Optional[Path]]:
+    """Download an image into the content-addressed store
+    
+    Returns (status, path) with status 'downloaded', 'duplicate' (same bytes
+    already stored), 'not_modified' or 'fresh' (per the HTTP cache), or '' on failure.
+    revalidate asks the server even when the cached copy is within its TTL.
+    """
+    cache = http_cache.get_cache()
+    previous = store.path_for_url(url)
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-        }
+        if cache and previous and not revalidate and cache.fresh(url, previous):
+            return 'fresh', previous
         
-        response = requests.get(url, headers=headers, timeout=timeout, stream=True)
-        response.raise_for_status()
+        headers = cache.validators(url, previous) if cache and previous else None
+        response = http_client.get(url, headers=headers, timeout=timeout, stream=True)
+        try:
+            if cache and previous and response.status_code == 304 and previous.exists():
+                cache.not_modified(url, previous)
+                return 'not_modified', previous
+            response.raise_for_status()
+            
+            content_type = response.headers.get('content-type', '')
+            if 'image' not in content_type and 'octet-stream' not in content_type:
+                return '', None
+            
+            # Skip if too small (probably placeholder): less than 5KB
+            stored = store.ingest(response.iter_content(chunk_size=8192), image_extension(url), url=url,
+                                  min_bytes=5000)
+        finally:
+            response.close()
         
-        content_type = response.headers.get('content-type', '')
-        if 'image' not in content_type and 'octet-stream' not in content_type:
-            return False
+        if not stored:
+            return '', None
         
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(output_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        
-        # Check file size - skip if too small (probably placeholder)
-        if output_path.stat().st_size < 5000:  # Less than 5KB
-            output_path.unlink()
-            return False
-        
-        return True
+        _, path, created = stored
+        if cache:
+            cache.store(url, response, path)
+        return ('downloaded' if created else 'duplicate'), path
         
     except Exception as e:
         print(f"  Error: {e}")
-        return False
+        return '', None
+
+
+ACCOMMODATION_URL = 'https://beststaydavos.ch/accommodation/'
 
 
 def scrape_accommodation_page() -> Set[str]:
     """Scrape all image URLs from the accommodation page"""
     
-    url = 'https://beststaydavos.ch/accommodation/'
-    headers = {'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)'}
+    url = ACCOMMODATION_URL
     
     print(f"Fetching: {url}")
-    response = requests.get(url, headers=headers, timeout=30)
-    soup = BeautifulSoup(response.text, 'html.parser')
+    
+    # The page is parsed chunk by chunk as it arrives
+    cache = http_cache.get_cache()
+    if cache:
+        return extract_accommodation_images(cache.iter_text(url, timeout=30), url)
+    
+    response = http_client.get(url, timeout=30, stream=True)
+    try:
+        return extract_accommodation_images(response.iter_text(), url)
+    finally:
+        response.close()
+
+
+def extract_accommodation_images(html: Union[str, Iterable[str]], url: str) -> Set[str]:
+    """Full-size property image URLs in a page (whole or as text chunks), in one parsing pass"""
+    found = parse_candidates(html)
     
     images = set()
     
-    # Find all img tags
-    for img in soup.find_all('img'):
+    # img tags
+    for img in found.imgs:
         # Check src
         src = img.get('src')
         if src and is_property_image(src):
@@ -110,16 +135,13 @@ def scrape_accommodation_page() -> Set[str]:
         # Check srcset for larger versions
         srcset = img.get('srcset') or img.get('data-srcset')
         if srcset:
-            for part in srcset.split(','):
-                src_part = part.strip().split()[0]
-                if is_property_image(src_part):
+            for src_part in srcset_urls(srcset):
+                if src_part and is_property_image(src_part):
                     images.add(get_full_size_url(src_part))
     
     # Also check background images
-    for elem in soup.find_all(style=True):
-        style = elem.get('style', '')
-        urls = re.findall(r'url\(["\']?([^"\')\s]+)["\']?\)', style)
-        for img_url in urls:
+    for style in found.styles:
+        for img_url in style_urls(style):
             img_url = urljoin(url, img_url)
             if is_property_image(img_url):
                 images.add(get_full_size_url(img_url))
@@ -127,14 +149,47 @@ def scrape_accommodation_page() -> Set[str]:
     return images
 
 
-def main(dry_run: bool = False):
+def main(dry_run: bool = False, derivatives: bool = True, resume: bool = False, discover: bool = False,
+         full: bool = False):
     """Main function"""
     
     print("Scraping beststaydavos.ch for property images...")
     print()
     
-    # Get all image URLs
-    images = scrape_accommodation_page()
+    # Checkpoint the page and every download; dry runs record nothing
+    journal = None
+    if not dry_run:
+        journal = ScrapeJournal('scrape_website_images', resume=resume)
+        if journal.resumed:
+            print(f"Resuming from {journal.path}: {journal.summary()} already done")
+    
+    try:
+        scrape_and_download(journal, dry_run=dry_run, derivatives=derivatives, discover=discover, full=full)
+    except KeyboardInterrupt:
+        print(f"\nInterrupted. Run again with --resume to continue from {journal.path if journal else 'the start'}.")
+        raise
+    finally:
+        if journal:
+            journal.close()
+
+
+def scrape_and_download(journal: Optional[ScrapeJournal], dry_run: bool = False, derivatives: bool = True,
+                        discover: bool = False, full: bool = False):
+    """Find the images, download them into the store and write the manifest"""
+    
+    # Get all image URLs (or take them from the journal of an interrupted run)
+    media = None
+    if discover:
+        media = MediaIndex(site=urljoin(ACCOMMODATION_URL, '/'))
+        print(f"Discovering uploads on {media.site}")
+        images = {url for url in media.discover(full=full) if is_property_image(url)}
+        print(f"Media index: {media.summary()}")
+    elif journal and ACCOMMODATION_URL in journal.pages:
+        images = set(journal.pages[ACCOMMODATION_URL])
+    else:
+        images = scrape_accommodation_page()
+        if journal and images:
+            journal.page_done(ACCOMMODATION_URL, sorted(images))
     
     print(f"\nFound {len(images)} unique property images")
     
@@ -144,37 +199,73 @@ def main(dry_run: bool = False):
             print(f"  {img}")
         return
     
-    # Setup output directory
-    output_dir = Path(__file__).parent.parent / 'public' / 'images' / 'scraped'
-    output_dir.mkdir(parents=True, exist_ok=True)
+    # Images go to the shared content-addressed store
+    root = Path(__file__).parent.parent
+    store = ImageStore()
     
     # Download images
     downloaded = 0
     skipped = 0
     failed = 0
+    cache = http_cache.get_cache()
     
-    print(f"\nDownloading to: {output_dir}")
+    print(f"\nDownloading to: {store.store_dir}")
     
     for i, img_url in enumerate(sorted(images), 1):
-        # Generate filename from URL
-        parsed = urlparse(img_url)
-        filename = Path(parsed.path).name
-        output_path = output_dir / filename
+        filename = Path(urlparse(img_url).path).name
+        previous = store.path_for_url(img_url)
         
-        if output_path.exists():
+        if journal.restore_image(img_url, store):
+            print(f"[{i}/{len(images)}] Skipping (already downloaded): {filename}")
+            if media:
+                media.fetched(img_url)
+            skipped += 1
+            continue
+        if media and not media.needs_fetch(img_url, store):
+            # Listed with the same modified time as when it was downloaded: no request at all
+            journal.image_done(img_url, 'unchanged', previous, store)
+            skipped += 1
+            continue
+        if previous and previous.exists() and not cache and not media:
             print(f"[{i}/{len(images)}] Skipping (exists): {filename}")
+            journal.image_done(img_url, 'exists', previous, store)
             skipped += 1
             continue
         
-        print(f"[{i}/{len(images)}] Downloading: {filename}")
-        
-        if download_image(img_url, output_path):
+        # A changed upload is asked for even if the HTTP cache still considers it fresh
+        status, path = download_image(img_url, store, revalidate=media is not None)
+        journal.image_done(img_url, status, path, store)
+        if media and status:
+            media.fetched(img_url)
+        if status == 'downloaded':
+            print(f"[{i}/{len(images)}] Downloaded: {filename}")
             downloaded += 1
+        elif status:
+            print(f"[{i}/{len(images)}] {'Duplicate' if status == 'duplicate' else 'Up to date'}: {filename}")
+            skipped += 1
         else:
+            print(f"[{i}/{len(images)}] Failed: {filename}")
             failed += 1
         
         # Be nice to the server
-        time.sleep(0.3)
+        if status != 'fresh':
+            time.sleep(0.3)
+    
+    # The manifest covers everything the journal records, including earlier interrupted runs
+    stored = {url: root / journal.images[url]['path'] for url in images if url in journal.images}
+    
+    # Thumbnails and re-encoded copies of the same photo are listed once, as the largest copy
+    digests = dict.fromkeys(journal.images[url]['digest'] for url in sorted(stored))
+    kept, dropped = drop_near_duplicates(store, digests)
+    
+    store.save()
+    if media:
+        media.save()
+    if derivatives:
+        generate_derivatives(store, kept)
+    if cache:
+        cache.save()
+        print(f"HTTP cache: {cache.summary()}")
     
     # Save image manifest
     manifest = {
@@ -184,7 +275,9 @@ def main(dry_run: bool = False):
         'downloaded': downloaded,
         'skipped': skipped,
         'failed': failed,
-        'images': sorted([str(output_dir / Path(urlparse(u).path).name) for u in images])
+        'near_duplicates': len(dropped),
+        'images': sorted(str(store.blob_path(digest).relative_to(root)) for digest in kept),
+        'sources': {url: str(path.relative_to(root)) for url, path in sorted(stored.items())},
     }
     
     data_dir = Path(__file__).parent.parent / 'data'
@@ -198,8 +291,9 @@ def main(dry_run: bool = False):
     print("Scraping Complete")
     print(f"{'='*50}")
     print(f"Downloaded: {downloaded}")
-    print(f"Skipped (already exists): {skipped}")
+    print(f"Skipped (already stored or not modified): {skipped}")
     print(f"Failed: {failed}")
+    print(f"Near-duplicates dropped: {len(dropped)}")
     print(f"Manifest saved to: {manifest_file}")
 
 
@@ -208,6 +302,23 @@ if __name__ == '__main__':
     
     parser = argparse.ArgumentParser(description='Scrape images from beststaydavos.ch')
     parser.add_argument('--dry-run', action='store_true', help='Only list images, do not download')
+    parser.add_argument('--cache-ttl', type=float, default=http_cache.DEFAULT_TTL,
+                        help='Seconds a cached page or image is used without asking the server again')
+    parser.add_argument('--cache-max-mb', type=float, default=http_cache.DEFAULT_MAX_BYTES / 1024 / 1024,
+                        help='Size limit for cached pages (images are validated in place)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Skip existing images by name instead of revalidating them with the server')
+    parser.add_argument('--no-derivatives', action='store_true',
+                        help='Do not render the resized WebP/AVIF copies after downloading')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue an interrupted run, skipping the downloads its journal records as done')
+    parser.add_argument('--discover', action='store_true',
+                        help='List uploads from the sitemap and media endpoint instead of the accommodation page')
+    parser.add_argument('--full', action='store_true',
+                        help='With --discover, read every sitemap and media page instead of only recent changes')
     
     args = parser.parse_args()
-    main(dry_run=args.dry_run)
+    http_cache.configure(enabled=not args.no_cache, ttl=args.cache_ttl,
+                         max_bytes=int(args.cache_max_mb * 1024 * 1024))
+    main(dry_run=args.dry_run, derivatives=not args.no_derivatives, resume=args.resume, discover=args.discover,
+         full=args.full)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Supabase client setup shared by the import, sync and pricing scripts
+Credentials come from NEXT_PUBLIC_SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY.
+"""
+
+import os
+from typing import Callable, List, Optional
+
+
+def connect_supabase():
+    """Create a Supabase client from the environment, or return None with a hint"""
+    try:
+        from supabase import create_client
+    except ImportError:
+        print("\nSupabase Python client not installed.")
+        print("Run: pip install supabase")
+        print("JSON files have been saved for manual import.")
+        return None
+
+    supabase_url = os.environ.get('NEXT_PUBLIC_SUPABASE_URL')
+    supabase_key = os.environ.get('SUPABASE_SERVICE_ROLE_KEY')
+
+    if not supabase_url or not supabase_key:
+        print("\nSupabase credentials not found in environment.")
+        print("Set NEXT_PUBLIC_SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY to import to database.")
+        print("JSON files have been saved for manual import.")
+        return None
+
+    print(f"\nConnecting to Supabase...")
+    return create_client(supabase_url, supabase_key)
+
+
+def fetch_all(supabase, table: str, columns: str, page_size: int = 1000, order: str = 'id',
+              where: Optional[Callable] = None) -> List[dict]:
+    """Every row of a table (the given columns), read in pages ordered by `order`.
+
+    where, if given, is applied to each page's query to filter it, e.g.
+    lambda query: query.in_('property_id', ids).
+    """
+    rows = []
+    offset = 0
+    while True:
+        query = supabase.table(table).select(columns)
+        if where is not None:
+            query = where(query)
+        result = query.order(order).range(offset, offset + page_size - 1).execute()
+        rows.extend(result.data)
+        if len(result.data) < page_size:
+            return rows
+        offset += page_size
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Sync scraped property images to Supabase Storage and the property_images table
+Usage: python scripts/sync_images.py [--dry-run] [--workers N] [--prune] [--slug SLUG ...]
+
+Reads the ordered images of each property from the image store index
+(data/image_index.json, written by the scrapers). Blobs are uploaded to the
+property-images bucket under their content hash, so a photo used by several
+listings is uploaded once, and rows are bulk-upserted keyed on
+(property_id, content_hash). Images whose row already has the same storage
+path, order and primary flag are skipped without any request.
+"""
+
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from batch_writer import BatchWriter
+from image_store import ImageStore
+from supabase_client import connect_supabase, fetch_all
+
+
+BUCKET = 'property-images'
+UPLOAD_WORKERS = 8
+
+# Objects are named by content hash and never change, so clients may cache them for good
+CACHE_CONTROL = '31536000'
+
+SYNCED_FIELDS = ('url', 'storage_path', 'display_order', 'is_primary')
+
+
+def storage_path(digest: str, blob: dict) -> str:
+    """Object name of a blob in the bucket: <first two hex digits>/<sha256>.<ext>"""
+    return f"{digest[:2]}/{digest}{Path(blob['path']).suffix}"
+
+
+def fetch_existing_images(supabase, property_ids: Iterable[str], page_size: int = 1000,
+                          chunk_size: int = 100) -> Dict[Tuple[str, str], dict]:
+    """Synced rows of these properties, keyed by (property_id, content_hash).
+
+    Rows added by hand have no content hash and are left out, so they are
+    never updated or pruned.
+    """
+    existing = {}
+    property_ids = list(property_ids)
+    for i in range(0, len(property_ids), chunk_size):
+        chunk = property_ids[i:i + chunk_size]
+        rows = fetch_all(supabase, 'property_images',
+                         'id, property_id, content_hash, url, storage_path, display_order, is_primary', page_size,
+                         where=lambda query: query.in_('property_id', chunk))
+        for row in rows:
+            if row['content_hash']:
+                existing[(row['property_id'], row['content_hash'])] = row
+    return existing
+
+
+def plan_rows(store: ImageStore, slug_to_id: Dict[str, str], public_url,
+              slugs: Optional[Iterable[str]] = None) -> Tuple[List[Tuple[dict, str]], List[str]]:
+    """The property_images rows the store describes, with the blob each one needs.
+
+    Returns ([(row, digest)], unknown slugs). The first image of a property is
+    its primary one.
+    """
+    rows = []
+    unknown = []
+    for slug in (slugs if slugs is not None else sorted(store.properties)):
+        property_id = slug_to_id.get(slug)
+        if property_id is None:
+            unknown.append(slug)
+            continue
+        for order, digest in enumerate(store.properties.get(slug, [])):
+            path = storage_path(digest, store.blobs[digest])
+            rows.append(({
+                'property_id': property_id,
+                'content_hash': digest,
+                'url': public_url(path),
+                'storage_path': path,
+                'display_order': order,
+                'is_primary': order == 0,
+            }, digest))
+    return rows, unknown
+
+
+def upload_blob(bucket, store: ImageStore, digest: str) -> str:
+    """Upload one blob (overwriting a partial upload of an earlier run) and return its object name"""
+    path = storage_path(digest, store.blobs[digest])
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    with open(store.blob_path(digest), 'rb') as f:
+        data = f.read()
+    bucket.upload(path, data, file_options={'content-type': content_type, 'cache-control': CACHE_CONTROL,
+                                            'x-upsert': 'true'})
+    return path
+
+
+def sync_images(supabase, store: ImageStore, slugs: Optional[List[str]] = None, workers: int = UPLOAD_WORKERS,
+                dry_run: bool = False, prune: bool = False) -> dict:
+    """Upload missing blobs and upsert the property_images rows that are new or changed"""
+    print("Fetching properties...")
+    slug_to_id = {row['slug']: row['id'] for row in fetch_all(supabase, 'properties', 'id, slug')}
+    bucket = supabase.storage.from_(BUCKET)
+
+    if slugs is None:
+        slugs = sorted(store.properties)
+    rows, unknown = plan_rows(store, slug_to_id, bucket.get_public_url, slugs)
+    # Every selected property, also those left without images, so their old rows can be pruned
+    property_ids = sorted({slug_to_id[slug] for slug in slugs if slug in slug_to_id})
+    existing = fetch_existing_images(supabase, property_ids)
+    print(f"  {len(rows)} images for {len(property_ids)} properties, {len(existing)} synced rows in database")
+    if unknown:
+        print(f"  {len(unknown)} properties not in database: {', '.join(unknown[:10])}")
+
+    # An object referenced by any existing row is in the bucket already
+    uploaded = {row['storage_path'] for row in existing.values() if row.get('storage_path')}
+
+    stats = {'unchanged': 0, 'new': 0, 'changed': 0, 'uploaded': 0, 'upload_failed': 0, 'pruned': 0}
+    pending: Dict[str, List[dict]] = {}
+    ready: List[dict] = []
+    for row, digest in rows:
+        current = existing.get((row['property_id'], digest))
+        if current and all(current.get(field) == row[field] for field in SYNCED_FIELDS):
+            stats['unchanged'] += 1
+            continue
+        stats['changed' if current else 'new'] += 1
+        if row['storage_path'] in uploaded:
+            ready.append(row)
+        else:
+            pending.setdefault(digest, []).append(row)
+
+    wanted = {(row['property_id'], digest) for row, digest in rows}
+    stale = [row['id'] for key, row in existing.items() if key not in wanted]
+
+    print(f"Sync: {stats['new']} new, {stats['changed']} changed, {stats['unchanged']} unchanged, "
+          f"{len(pending)} blobs to upload, {len(stale)} rows no longer scraped")
+    if dry_run:
+        return stats
+
+    writer = BatchWriter(
+        lambda batch: supabase.table('property_images').upsert(batch, on_conflict='property_id,content_hash').execute(),
+        label='image rows',
+    )
+    for row in ready:
+        writer.add(row)
+
+    # Rows are written as soon as their blob is in the bucket, while other uploads continue
+    if pending:
+        print(f"Uploading {len(pending)} blobs to {BUCKET} with {workers} workers...")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(upload_blob, bucket, store, digest): digest for digest in pending}
+            for future in as_completed(futures):
+                digest = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    stats['upload_failed'] += 1
+                    print(f"  Upload failed: {digest[:12]}: {e}")
+                    continue
+                stats['uploaded'] += 1
+                for row in pending[digest]:
+                    writer.add(row)
+    stats.update(writer.close())
+
+    if stale and prune:
+        for i in range(0, len(stale), 100):
+            supabase.table('property_images').delete().in_('id', stale[i:i + 100]).execute()
+        stats['pruned'] = len(stale)
+        print(f"Removed {len(stale)} rows of images no longer scraped")
+
+    print(f"Uploaded {stats['uploaded']} blobs ({stats['upload_failed']} failed)")
+    return stats
+
+
+def main(slugs: Optional[List[str]] = None, workers: int = UPLOAD_WORKERS, dry_run: bool = False,
+         prune: bool = False):
+    store = ImageStore()
+    if not store.properties:
+        print(f"No property images in {store.index_path}; run scripts/scrape_images.py first.")
+        return
+
+    supabase = connect_supabase()
+    if supabase is None:
+        return
+    sync_images(supabase, store, slugs=slugs, workers=workers, dry_run=dry_run, prune=prune)
+    print("Image sync complete!")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Sync scraped property images to Supabase')
+    parser.add_argument('--dry-run', action='store_true', help='Report what would be uploaded and written')
+    parser.add_argument('--workers', type=int, default=UPLOAD_WORKERS, help='Concurrent uploads')
+    parser.add_argument('--prune', action='store_true',
+                        help='Delete rows of synced properties whose image is no longer in the store')
+    parser.add_argument('--slug', nargs='+', dest='slugs', help='Only sync these properties')
+
+    args = parser.parse_args()
+    main(slugs=args.slugs, workers=args.workers, dry_run=args.dry_run, prune=args.prune)
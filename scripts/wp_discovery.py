@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+WordPress upload discovery for the scraper scripts
+Usage: python scripts/wp_discovery.py [--site URL] [--full]
+
+Lists every image on a WordPress site from its sitemap (the image:loc
+entries Yoast-style sitemaps carry) and the wp-json/wp/v2/media endpoint:
+a few JSON pages of 100 uploads instead of one HTML page per listing.
+data/wp_media_index.json keeps each image's `modified` time and the one it
+was last fetched at, so later runs download only new or changed media.
+After the first run the media endpoint is asked only for uploads modified
+since the newest one seen, and sitemaps whose lastmod is unchanged are not
+fetched again. The sitemap index itself is always revalidated. Uploads no
+longer in the sitemap, or missing from a full read of the media endpoint
+(the first run, or --full), are dropped from the index.
+"""
+
+import json
+import os
+import re
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import http_cache
+import http_client
+from image_store import ImageStore
+
+
+ROOT = Path(__file__).parent.parent
+INDEX_FILE = ROOT / 'data' / 'wp_media_index.json'
+SITE_URL = 'https://beststaydavos.ch'
+
+# Yoast, generic and WordPress core (5.5+) locations, tried in this order
+SITEMAP_PATHS = ('/sitemap_index.xml', '/sitemap.xml', '/wp-sitemap.xml')
+MEDIA_PATH = '/wp-json/wp/v2/media'
+PER_PAGE = 100  # the REST API maximum
+MEDIA_FIELDS = 'id,source_url,modified,mime_type,post'
+MEDIA_WORKERS = 4
+
+SITEMAP_NS = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+IMAGE_NS = '{http://www.google.com/schemas/sitemap-image/1.1}'
+
+
+def get_full_size_url(url: str) -> str:
+    """Convert WordPress thumbnail URL to full-size URL"""
+    # Remove size suffixes like -150x150, -300x200, -1024x768
+    pattern = r'-\d+x\d+(\.[a-zA-Z]+)$'
+    return re.sub(pattern, r'\1', url)
+
+
+class MediaIndex:
+    """Images discovered on a WordPress site with their modified times, kept between runs.
+
+    media maps each image URL to {'modified', 'fetched', ...}: modified is the
+    upload's time on the site (the media endpoint's `modified`, or the lastmod
+    of the sitemap page showing it when the endpoint does not list it) and
+    fetched is the modified time it had when it was last downloaded.
+    """
+
+    def __init__(self, site: str = SITE_URL, index_path: Path = INDEX_FILE):
+        self.site = site.rstrip('/')
+        self.index_path = Path(index_path)
+        self.media: Dict[str, dict] = {}
+        self.sitemaps: Dict[str, dict] = {}
+        self.modified_after: Optional[str] = None
+        self.stats = {'requests': 0, 'new': 0, 'changed': 0, 'removed': 0}
+        self._lock = threading.Lock()
+
+        if self.index_path.exists():
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if index.get('site') == self.site:
+                self.media = index['media']
+                self.sitemaps = index['sitemaps']
+                self.modified_after = index['modified_after']
+
+    def discover(self, full: bool = False) -> List[str]:
+        """Refresh the index from the sitemap and media endpoint and return every known image URL.
+
+        With full=True all sitemaps and every media page are read again
+        instead of only what changed since the last run.
+        """
+        if full:
+            self.sitemaps = {}
+            self.modified_after = None
+        self._discover_sitemaps()
+        self._discover_media()
+        return sorted(self.media)
+
+    def needs_fetch(self, url: str, store: ImageStore) -> bool:
+        """True when url is new, changed since it was downloaded, or missing from the store"""
+        entry = self.media[url]
+        if entry['fetched'] is None or entry['fetched'] != entry['modified']:
+            return True
+        path = store.path_for_url(url)
+        return path is None or not path.exists()
+
+    def fetched(self, url: str):
+        """Record that url was downloaded (or validated) at its current modified time"""
+        entry = self.media[url]
+        entry['fetched'] = entry['modified']
+
+    def save(self):
+        index = {'site': self.site, 'modified_after': self.modified_after,
+                 'sitemaps': self.sitemaps, 'media': self.media}
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_name(self.index_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, separators=(',', ':'))
+        os.replace(tmp_path, self.index_path)
+
+    def summary(self) -> str:
+        return (f"{len(self.media)} images ({self.stats['new']} new, {self.stats['changed']} changed, "
+                f"{self.stats['removed']} removed) from {self.stats['requests']} requests")
+
+    def _count(self, stat: str, n: int = 1):
+        with self._lock:
+            self.stats[stat] += n
+
+    def _prune(self, keep):
+        """Drop the entries keep(url, entry) rejects"""
+        gone = [url for url, entry in self.media.items() if not keep(url, entry)]
+        for url in gone:
+            del self.media[url]
+        self._count('removed', len(gone))
+
+    def _update(self, url: str, modified: Optional[str], from_media: bool, **info):
+        entry = self.media.get(url)
+        if entry is None:
+            self.media[url] = dict(info, modified=modified, fetched=None, from_media=from_media)
+            self.stats['new'] += 1
+            return
+        entry.update(info)
+        # The endpoint's time is per upload; a sitemap lastmod only moves with its page
+        if entry['from_media'] and not from_media:
+            return
+        entry['from_media'] = from_media
+        if modified and modified != entry['modified']:
+            if entry['fetched'] is not None:
+                self.stats['changed'] += 1
+            entry['modified'] = modified
+
+    def _discover_sitemaps(self):
+        for path in SITEMAP_PATHS:
+            url = self.site + path
+            root = self._fetch_xml(url)
+            if root is not None:
+                break
+        else:
+            print(f"No sitemap found on {self.site}")
+            return
+
+        # Sitemaps list resized copies too; the index only holds the full-size upload
+        listed = set()
+        for image_url, page, modified in self._sitemap_images(url, root):
+            image_url = get_full_size_url(image_url)
+            listed.add(image_url)
+            self._update(image_url, modified, from_media=False, page=page)
+        self._prune(lambda url, entry: entry['from_media'] or url in listed)
+
+    def _sitemap_images(self, url: str, root: ET.Element, lastmod: Optional[str] = None) -> List[list]:
+        """[image URL, page URL, page lastmod] for a sitemap or sitemap index"""
+        if root.tag != SITEMAP_NS + 'sitemapindex':
+            images = []
+            for entry in root.iter(SITEMAP_NS + 'url'):
+                page = (entry.findtext(SITEMAP_NS + 'loc') or '').strip()
+                modified = entry.findtext(SITEMAP_NS + 'lastmod')
+                for image in entry.iter(IMAGE_NS + 'image'):
+                    loc = (image.findtext(IMAGE_NS + 'loc') or '').strip()
+                    if loc:
+                        images.append([loc, page, modified and modified.strip()])
+            self.sitemaps[url] = {'lastmod': lastmod, 'images': images}
+            return images
+
+        images = []
+        for sitemap in root.iter(SITEMAP_NS + 'sitemap'):
+            child_url = (sitemap.findtext(SITEMAP_NS + 'loc') or '').strip()
+            child_lastmod = sitemap.findtext(SITEMAP_NS + 'lastmod')
+            child_lastmod = child_lastmod and child_lastmod.strip()
+            recorded = self.sitemaps.get(child_url)
+            if recorded and child_lastmod and recorded['lastmod'] == child_lastmod:
+                images += recorded['images']
+                continue
+            child = self._fetch_xml(child_url)
+            if child is not None:
+                images += self._sitemap_images(child_url, child, child_lastmod)
+            elif recorded:
+                images += recorded['images']
+        return images
+
+    def _fetch_xml(self, url: str) -> Optional[ET.Element]:
+        self._count('requests')
+        try:
+            cache = http_cache.get_cache()
+            if cache:
+                # Sitemaps change whenever a page does; a 304 keeps checking them cheap
+                text = cache.get_text(url, timeout=30, revalidate=True)
+            else:
+                response = http_client.get(url, timeout=30)
+                response.raise_for_status()
+                text = response.text
+            return ET.fromstring(text.encode('utf-8'))
+        except Exception:
+            return None
+
+    def _discover_media(self):
+        params = {'per_page': PER_PAGE, 'page': 1, 'media_type': 'image', 'orderby': 'id', 'order': 'asc',
+                  '_fields': MEDIA_FIELDS}
+        full = not self.modified_after
+        if not full:
+            params['modified_after'] = self.modified_after
+
+        try:
+            items, total_pages = self._media_page(params)
+            if total_pages > 1:
+                # The page count is known after the first page; the rest are fetched together
+                with ThreadPoolExecutor(max_workers=min(MEDIA_WORKERS, total_pages - 1)) as executor:
+                    pages = executor.map(lambda n: self._media_page(dict(params, page=n))[0],
+                                         range(2, total_pages + 1))
+                    for page_items in pages:
+                        items += page_items
+        except Exception as e:
+            print(f"Media endpoint unavailable ({e}), using the sitemap only")
+            return
+
+        for item in items:
+            if not item.get('source_url') or not str(item.get('mime_type', '')).startswith('image/'):
+                continue
+            self._update(item['source_url'], item['modified'], from_media=True, id=item['id'], post=item.get('post'))
+            if not self.modified_after or item['modified'] > self.modified_after:
+                self.modified_after = item['modified']
+
+        if full:
+            # Every upload was listed: those that were not have been deleted
+            listed = {item['id'] for item in items}
+            self._prune(lambda url, entry: not entry['from_media'] or entry.get('id') in listed)
+
+    def _media_page(self, params: dict) -> Tuple[List[dict], int]:
+        """One page of the media endpoint and the total page count"""
+        self._count('requests')
+        response = http_client.get(f"{self.site}{MEDIA_PATH}?{urlencode(params)}", timeout=30)
+        try:
+            if response.status_code == 400 and params['page'] > 1:
+                # rest_post_invalid_page_number: uploads were deleted while paging
+                return [], 0
+            response.raise_for_status()
+            total_pages = int(response.headers.get('X-WP-TotalPages') or 1)
+            return json.loads(response.content), total_pages
+        finally:
+            response.close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='List the images uploaded to a WordPress site')
+    parser.add_argument('--site', default=SITE_URL, help='Site root URL')
+    parser.add_argument('--full', action='store_true', help='Read every sitemap and media page again')
+
+    args = parser.parse_args()
+    index = MediaIndex(site=args.site)
+    index.discover(full=args.full)
+    index.save()
+    print(index.summary())
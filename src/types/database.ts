@@ -26,6 +26,7 @@ export interface Property {
   short_description: string
   featured: boolean
   active: boolean
+  content_hash: string | null
   created_at: string
   updated_at: string
 }
@@ -37,6 +38,7 @@ export interface PropertyImage {
   order: number
   alt_text: string
   is_primary: boolean
+  content_hash: string | null
   created_at: string
 }
 
@@ -0,0 +1,3 @@
+-- Hash of the imported property fields, used by scripts/import_properties.py --sync
+-- to skip rows that have not changed since the last import
+ALTER TABLE properties ADD COLUMN content_hash VARCHAR(64);
@@ -0,0 +1,9 @@
+-- SHA-256 of the image file, used by scripts/sync_images.py to upsert rows
+-- by property and image and to skip images that are already synced
+ALTER TABLE property_images ADD COLUMN content_hash VARCHAR(64);
+CREATE UNIQUE INDEX idx_property_images_property_hash ON property_images(property_id, content_hash);
+
+-- Public bucket the synced images are uploaded to, named by content hash
+INSERT INTO storage.buckets (id, name, public)
+VALUES ('property-images', 'property-images', true)
+ON CONFLICT (id) DO NOTHING;
@@ -23,6 +23,7 @@ CREATE TABLE properties (
     short_description VARCHAR(500),
     featured BOOLEAN DEFAULT false,
     active BOOLEAN DEFAULT true,
+    content_hash VARCHAR(64),
     created_at TIMESTAMP WITH TIME ZONE DEFAULT TIMEZONE('utc', NOW()),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT TIMEZONE('utc', NOW())
 );
@@ -40,10 +41,12 @@ CREATE TABLE property_images (
     display_order INTEGER DEFAULT 0,
     alt_text VARCHAR(255),
     is_primary BOOLEAN DEFAULT false,
+    content_hash VARCHAR(64),
     created_at TIMESTAMP WITH TIME ZONE DEFAULT TIMEZONE('utc', NOW())
 );
 
 CREATE INDEX idx_property_images_property ON property_images(property_id);
+CREATE UNIQUE INDEX idx_property_images_property_hash ON property_images(property_id, content_hash);
 
 -- Availability
 CREATE TABLE availability (
@@ -0,0 +1,120 @@
+"""In-memory stand-in for the parts of the Supabase client the scripts use"""
+
+import uuid
+
+
+class Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class Query:
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.op = 'select'
+        self.columns = ['*']
+        self.filters = []
+        self.order_by = None
+        self.bounds = None
+        self.payload = None
+
+    def select(self, columns, **kwargs):
+        self.columns = [c.strip() for c in columns.split(',')]
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def order(self, column, **kwargs):
+        self.order_by = column
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end)
+        return self
+
+    def insert(self, rows, **kwargs):
+        self.op, self.payload = 'insert', rows
+        return self
+
+    def upsert(self, rows, on_conflict='id', **kwargs):
+        self.op, self.payload, self.conflict = 'upsert', rows, [c.strip() for c in on_conflict.split(',')]
+        return self
+
+    def delete(self):
+        self.op = 'delete'
+        return self
+
+    def execute(self):
+        rows = self.db.tables.setdefault(self.table, [])
+        self.db.calls.append((self.table, self.op))
+        if self.db.fail and self.db.fail(self.table, self.op, self.payload):
+            raise RuntimeError('request failed')
+        if self.op == 'insert':
+            inserted = [dict(row, id=row.get('id') or str(uuid.uuid4())) for row in self.payload]
+            rows.extend(inserted)
+            return Result([dict(row) for row in inserted])
+
+        if self.op == 'upsert':
+            written = []
+            for row in self.payload:
+                current = next((r for r in rows if all(r.get(c) == row.get(c) for c in self.conflict)), None)
+                if current is None:
+                    current = dict(id=str(uuid.uuid4()))
+                    rows.append(current)
+                current.update(row)
+                written.append(dict(current))
+            return Result(written)
+
+        matching = [row for row in rows if all(f(row) for f in self.filters)]
+        if self.op == 'delete':
+            rows[:] = [row for row in rows if row not in matching]
+            return Result(matching)
+        if self.order_by:
+            matching.sort(key=lambda row: str(row.get(self.order_by)))
+        if self.bounds:
+            matching = matching[self.bounds[0]:self.bounds[1] + 1]
+        if self.columns == ['*']:
+            return Result([dict(row) for row in matching])
+        return Result([{c: row.get(c) for c in self.columns} for row in matching])
+
+
+class Bucket:
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+
+    def upload(self, path, data, file_options=None):
+        self.db.objects[f"{self.name}/{path}"] = data
+
+    def get_public_url(self, path):
+        return f"https://example.supabase.co/storage/v1/object/public/{self.name}/{path}"
+
+
+class Storage:
+    def __init__(self, db):
+        self.db = db
+
+    def from_(self, name):
+        return Bucket(self.db, name)
+
+
+class FakeSupabase:
+    """Tables are lists of dicts; fail(table, op, payload) returning True makes a request raise"""
+
+    def __init__(self, **tables):
+        self.tables = {name: [dict(row) for row in rows] for name, rows in tables.items()}
+        self.calls = []
+        self.fail = None
+        self.objects = {}
+        self.storage = Storage(self)
+
+    def table(self, name):
+        return Query(self, name)
@@ -0,0 +1,116 @@
+import random
+from datetime import date, timedelta
+
+import numpy as np
+
+from availability_index import AvailabilityIndex, read_sql_dump
+from pricing_engine import UNAVAILABLE_STATUSES, day_number
+
+
+SEASON_START = date(2027, 1, 4)
+
+
+def booking(key, start, end, status='booked', **extra):
+    return {'property_slug': key, 'start_date': start, 'end_date': end, 'status': status, **extra}
+
+
+def make_calendar(properties, seed=3):
+    rnd = random.Random(seed)
+    keys = [f"listing-{i}" for i in range(properties)]
+    entries = []
+    for key in keys:
+        day = rnd.randrange(0, 7)
+        while day < 60:
+            nights = rnd.choice([2, 3, 4, 5, 7, 7, 10])
+            start = SEASON_START + timedelta(days=day)
+            status = rnd.choice(['booked'] * 6 + ['blocked', 'maintenance', 'available'])
+            entries.append(booking(key, start.isoformat(), (start + timedelta(days=nights)).isoformat(), status,
+                                   id=f"{key}-{len(entries)}",
+                                   price_override=900.0 if status == 'available' else None))
+            # Mostly back to back, sometimes a gap, now and then an overlap (a double booking)
+            day += nights + rnd.choice([0, 0, 0, 1, 2, 4, -1])
+    return keys, entries
+
+
+def busy_by_scan(keys, entries, check_ins, check_outs):
+    rows = {key: i for i, key in enumerate(keys)}
+    busy = np.zeros((len(keys), len(check_ins)), dtype=bool)
+    for entry in entries:
+        if entry['status'] not in UNAVAILABLE_STATUSES:
+            continue
+        first, last = day_number(entry['start_date']), day_number(entry['end_date'])
+        for w, (start, end) in enumerate(zip(check_ins, check_outs)):
+            if first < end.toordinal() and last > start.toordinal():
+                busy[rows[entry['property_slug']], w] = True
+    return busy
+
+
+def windows(count=80, seed=4):
+    rnd = random.Random(seed)
+    check_ins = [SEASON_START + timedelta(days=rnd.randrange(-3, 60)) for _ in range(count)]
+    return check_ins, [d + timedelta(days=rnd.choice([1, 2, 3, 5, 7])) for d in check_ins]
+
+
+def test_ranges_are_half_open():
+    index = AvailabilityIndex([booking('chalet', '2027-01-10', '2027-01-15')], properties=['chalet', 'loft'])
+    assert index.free('2027-01-15', '2027-01-20') == ['chalet', 'loft']
+    assert index.free('2027-01-05', '2027-01-10') == ['chalet', 'loft']
+    assert index.free('2027-01-14', '2027-01-16') == ['loft']
+    assert index.free_windows('chalet', '2027-01-01', '2027-01-31') == [
+        (date(2027, 1, 1), date(2027, 1, 10)), (date(2027, 1, 15), date(2027, 1, 31))]
+    assert index.free_windows('chalet', '2027-01-01', '2027-01-31', min_nights=10) == [
+        (date(2027, 1, 15), date(2027, 1, 31))]
+
+
+def test_busy_batch_matches_scan():
+    keys, entries = make_calendar(120)
+    check_ins, check_outs = windows()
+    index = AvailabilityIndex(entries, properties=keys)
+    _, busy = index.busy_batch(check_ins, check_outs)
+    assert np.array_equal(busy, busy_by_scan(keys, entries, check_ins, check_outs))
+    for key in keys[:30]:
+        for check_in, check_out in index.free_windows(key, SEASON_START, SEASON_START + timedelta(days=60)):
+            assert not index.overlaps(key, check_in, check_out)
+
+
+def test_added_bookings_match_a_rebuilt_index():
+    keys, entries = make_calendar(120)
+    check_ins, check_outs = windows()
+    unavailable = [e for e in entries if e['status'] in UNAVAILABLE_STATUSES]
+    arriving = set(random.Random(5).sample(range(len(unavailable)), len(unavailable) // 10))
+    index = AvailabilityIndex([e for i, e in enumerate(unavailable) if i not in arriving], properties=keys)
+    for i in sorted(arriving):
+        index.add([unavailable[i]])
+    _, busy = index.busy_batch(check_ins, check_outs)
+    assert np.array_equal(busy, busy_by_scan(keys, entries, check_ins, check_outs))
+
+    conflicts = index.add([booking('listing-0', '2027-01-01', '2027-03-31')])
+    assert len(conflicts) == 1 and conflicts[0][1]
+    assert index.free('2027-02-01', '2027-02-02', ['listing-0', 'unknown']) == ['unknown']
+
+
+def test_sql_dump_round_trip(tmp_path):
+    keys, entries = make_calendar(20)
+    half = len(entries) // 2
+    columns = 'id, property_id, start_date, end_date, status, price_override, notes'
+    dump = tmp_path / 'availability.sql'
+    with open(dump, 'w', encoding='utf-8') as f:
+        f.write(f"SET client_encoding = 'UTF8';\n\nCOPY public.availability ({columns}) FROM stdin;\n")
+        for e in entries[:half]:
+            price = '\\N' if e['price_override'] is None else str(e['price_override'])
+            f.write('\t'.join([e['id'], e['property_slug'], e['start_date'], e['end_date'], e['status'], price,
+                               '\\N']) + '\n')
+        f.write(f"\\.\n\nINSERT INTO public.availability ({columns}) VALUES\n")
+        f.write(',\n'.join(
+            f"('{e['id']}', '{e['property_slug']}', '{e['start_date']}'::date, '{e['end_date']}', '{e['status']}', "
+            f"{'NULL' if e['price_override'] is None else e['price_override']}, 'guest''s note (late, 22:00)')"
+            for e in entries[half:]) + ';\n')
+
+    rows = list(read_sql_dump(dump))
+    assert [(r['property_id'], r['start_date'], r['end_date'], r['status']) for r in rows] == \
+        [(e['property_slug'], e['start_date'], e['end_date'], e['status']) for e in entries]
+    assert rows[-1]['notes'] == "guest's note (late, 22:00)"
+
+    check_ins, check_outs = windows()
+    _, busy = AvailabilityIndex.load(dump).busy_batch(check_ins, check_outs, keys)
+    assert np.array_equal(busy, busy_by_scan(keys, entries, check_ins, check_outs))
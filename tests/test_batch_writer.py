@@ -0,0 +1,88 @@
+import threading
+
+from batch_writer import BatchWriter
+
+
+class Table:
+    """Write function that records requests and rejects rows marked bad"""
+
+    def __init__(self, fail_first: int = 0):
+        self.rows = []
+        self.requests = []
+        self.fail_first = fail_first
+        self.lock = threading.Lock()
+
+    def write(self, rows):
+        with self.lock:
+            self.requests.append(len(rows))
+            if self.fail_first:
+                self.fail_first -= 1
+                raise ConnectionError('timeout')
+        if any(row.get('bad') for row in rows):
+            raise ValueError('violates check constraint')
+        with self.lock:
+            self.rows.extend(rows)
+        return rows
+
+
+def test_batches_are_split_by_rows_and_bytes():
+    table = Table()
+    writer = BatchWriter(table.write, max_batch_rows=3, backoff=0)
+    for i in range(10):
+        writer.add({'id': i})
+    stats = writer.close()
+    assert sorted(table.requests) == [1, 3, 3, 3]
+    assert stats['written'] == 10 and stats['requests'] == 4
+
+    table = Table()
+    writer = BatchWriter(table.write, max_batch_bytes=40, backoff=0)
+    for i in range(10):
+        writer.add({'name': f"listing {i}"})
+    writer.close()
+    assert len(table.requests) > 1 and sum(table.requests) == 10
+
+
+def test_transient_failure_is_retried():
+    table = Table(fail_first=2)
+    writer = BatchWriter(table.write, max_retries=3, backoff=0)
+    for i in range(5):
+        writer.add({'id': i})
+    stats = writer.close()
+    assert stats['written'] == 5 and stats['failed'] == 0
+    assert stats['requests'] == 3
+    assert sorted(row['id'] for row in table.rows) == list(range(5))
+
+
+def test_failing_batch_is_bisected_down_to_the_bad_rows():
+    table = Table()
+    done = []
+    writer = BatchWriter(table.write, max_retries=1, backoff=0,
+                         on_success=lambda items, result: done.extend(context for _, context in items))
+    for i in range(16):
+        writer.add({'id': i, 'bad': i in (3, 11)}, context=i)
+    stats = writer.close()
+
+    assert stats['written'] == 14 and stats['failed'] == 2
+    assert sorted(row['id'] for row, _ in writer.failed) == [3, 11]
+    assert all('check constraint' in error for _, error in writer.failed)
+    assert sorted(done) == [i for i in range(16) if i not in (3, 11)]
+
+
+def test_on_success_runs_on_the_calling_thread_and_may_feed_another_writer():
+    properties, rules = Table(), Table()
+    rule_writer = BatchWriter(rules.write, max_batch_rows=1, max_in_flight=1, backoff=0)
+    threads = set()
+
+    def on_success(items, result):
+        threads.add(threading.get_ident())
+        for row, _ in items:
+            rule_writer.add({'property': row['id']})
+
+    writer = BatchWriter(properties.write, max_batch_rows=2, max_in_flight=2, backoff=0, on_success=on_success)
+    for i in range(20):
+        writer.add({'id': i})
+    writer.close()
+    rule_writer.close()
+
+    assert threads == {threading.get_ident()}
+    assert sorted(row['property'] for row in rules.rows) == list(range(20))
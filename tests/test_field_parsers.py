@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+from import_properties import (
+    COLUMN_PARSERS,
+    ParseFailure,
+    parse_availability,
+    parse_column,
+    parse_distance,
+    parse_int,
+    parse_price,
+)
+
+
+# Raw cell values in the shape owner sheets deliver them, with values that
+# only differ by type (1, 1.0, True) and cells the parsers reject
+SAMPLE_VALUES = {
+    'price': ["50,000.-", "CHF 18'000.00", "n/a", "Single room: CHF 18'000.00\nDouble room: CHF 24'000.00",
+              "CHF 35'000.-", "12000", 12000, 8500.0, None, "on request", "CHF 4'200 per night", 1, 1.0, True],
+    'distance': ["400m", "1.7km", "n/a", "5", "1200", "250 meters", "2 km walk", 0.8, None, "3.5 km", "1.2.3 km",
+                 "..", 1, 1.0, True],
+    'int': [1, 2, 3, 4.0, "34 hotel rooms", "2-3", None, "6 guests", "n/a", True, 1.0, ['2']],
+    'availability': ["✅", "❌", "☑", "yes", "no", "booked", "Available", None, "n/a", "tbc", 0, 1, 1.0, True],
+}
+
+PER_CELL_PARSERS = {
+    'price': parse_price,
+    'distance': parse_distance,
+    'int': parse_int,
+    'availability': parse_availability,
+}
+
+
+def per_cell(column, parse):
+    results = []
+    for value in column:
+        try:
+            results.append(parse(value))
+        except Exception as e:
+            results.append(ParseFailure(e))
+    return results
+
+
+def outcome(value):
+    """A parse result compared by type as well as value, with any failure alike"""
+    return ParseFailure if isinstance(value, ParseFailure) else (type(value), value)
+
+
+@pytest.mark.parametrize('kind', sorted(PER_CELL_PARSERS))
+def test_parse_column_matches_per_cell_parsers(kind):
+    rnd = random.Random(42)
+    column = []
+    for i in range(5000):
+        value = rnd.choice(SAMPLE_VALUES[kind])
+        # A share of unique cells, so not everything is a cache hit
+        if isinstance(value, str) and rnd.random() < 0.1:
+            value = f"{value} {i}"
+        column.append(value)
+
+    COLUMN_PARSERS[kind].cache_clear()
+    expected = [outcome(value) for value in per_cell(column, PER_CELL_PARSERS[kind])]
+    assert [outcome(value) for value in parse_column(column, kind)] == expected
+    # Again with a warm cache
+    assert [outcome(value) for value in parse_column(column, kind)] == expected
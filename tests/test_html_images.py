@@ -0,0 +1,153 @@
+import random
+import re
+from urllib.parse import urljoin
+
+import pytest
+from bs4 import BeautifulSoup
+
+import scrape_images
+import scrape_website_images
+
+
+BASE_URL = 'https://beststaydavos.ch/property/chalet-example/'
+
+
+def reference_property_images(html, url):
+    """The five-pass BeautifulSoup extractor formerly in scrape_images.scrape_property_page"""
+    is_property_image = scrape_images.is_property_image
+    soup = BeautifulSoup(html, 'html.parser')
+    images = []
+
+    for img in soup.find_all('img'):
+        src = img.get('src') or img.get('data-src') or img.get('data-lazy-src')
+        if src:
+            src = urljoin(url, src)
+            if is_property_image(src):
+                images.append(src)
+
+    for elem in soup.find_all(style=True):
+        style = elem.get('style', '')
+        for img_url in re.findall(r'url\(["\']?([^"\')\s]+)["\']?\)', style):
+            img_url = urljoin(url, img_url)
+            if is_property_image(img_url):
+                images.append(img_url)
+
+    for source in soup.find_all(['source', 'img']):
+        srcset = source.get('srcset', '')
+        if srcset:
+            for part in srcset.split(','):
+                src = part.strip().split()[0] if part.strip() else None
+                if src:
+                    src = urljoin(url, src)
+                    if is_property_image(src):
+                        images.append(src)
+
+    for attr in ('data-image', 'data-full'):
+        for elem in soup.find_all(attrs={attr: True}):
+            src = elem.get(attr)
+            if src:
+                src = urljoin(url, src)
+                if is_property_image(src):
+                    images.append(src)
+
+    seen = set()
+    unique_images = []
+    for img in images:
+        normalized = img.split('?')[0]
+        if normalized not in seen:
+            seen.add(normalized)
+            unique_images.append(img)
+    return unique_images
+
+
+def reference_accommodation_images(html, url):
+    """The BeautifulSoup extractor formerly in scrape_website_images.scrape_accommodation_page"""
+    is_property_image = scrape_website_images.is_property_image
+    get_full_size_url = scrape_website_images.get_full_size_url
+    soup = BeautifulSoup(html, 'html.parser')
+    images = set()
+
+    for img in soup.find_all('img'):
+        src = img.get('src')
+        if src and is_property_image(src):
+            images.add(get_full_size_url(src))
+        data_src = img.get('data-src') or img.get('data-lazy-src')
+        if data_src and is_property_image(data_src):
+            images.add(get_full_size_url(data_src))
+        srcset = img.get('srcset') or img.get('data-srcset')
+        if srcset:
+            for part in srcset.split(','):
+                src_part = part.strip().split()[0]
+                if is_property_image(src_part):
+                    images.add(get_full_size_url(src_part))
+
+    for elem in soup.find_all(style=True):
+        style = elem.get('style', '')
+        for img_url in re.findall(r'url\(["\']?([^"\')\s]+)["\']?\)', style):
+            img_url = urljoin(url, img_url)
+            if is_property_image(img_url):
+                images.add(get_full_size_url(img_url))
+    return images
+
+
+def make_page(images, seed=3):
+    """A gallery page with the markup variants seen on WordPress property sites"""
+    rnd = random.Random(seed)
+    uploads = '/wp-content/uploads/2025/05'
+    parts = [
+        '<!DOCTYPE html><html><head><title>Chalet &amp; Spa</title>',
+        '<link rel="icon" href="/wp-content/themes/x/favicon.png">',
+        '<style>.hero { background: url("/wp-content/uploads/ignored-in-css.jpg") }</style>',
+        "<script>document.write('<img src=\"/wp-content/uploads/in-script.jpg\">');</script>",
+        '</head><body><header><img src="/wp-content/themes/x/logo.png" alt="logo"></header>',
+        '<!-- <img src="/wp-content/uploads/commented-out.jpg"> -->',
+    ]
+    for i in range(images):
+        name = f"{uploads}/IMG-2025052{i % 10}-WA{i:04d}"
+        kind = rnd.randrange(8)
+        if kind == 0:
+            parts.append(f'<figure class="g"><img src="{name}.jpg" srcset="{name}-300x200.jpg 300w, '
+                         f'{name}-1024x768.jpg 1024w, {name}.jpg 1600w" sizes="(max-width: 1600px) 100vw"></figure>')
+        elif kind == 1:
+            parts.append(f'<img src="data:image/gif;base64,R0lGODlhAQABAAAAACw=" data-src="{name}.jpg" '
+                         f'data-srcset="{name}-768x512.jpg 768w" class="lazyload">')
+        elif kind == 2:
+            parts.append(f'<picture><source type="image/webp" srcset="{name}.webp 1x, {name}@2x.webp 2x,">'
+                         f'<IMG SRC="{name}.jpg?ver=6.4" ALT="Room {i}"></picture>')
+        elif kind == 3:
+            parts.append(f'<div class="slide" style="background-image: url(\'{name}.jpg\'); height: 400px"></div>')
+        elif kind == 4:
+            parts.append(f'<a href="{name}.jpg" data-full="{name}.jpg" data-image="{name}-150x150.jpg">'
+                         f'<img src="{name}-150x150.jpg" data-lazy-src="{name}.jpg"></a>')
+        elif kind == 5:
+            parts.append(f'<img data-src="https://cdn.example.com{name}.png?w=800&amp;q=80" src>')
+        elif kind == 6:
+            parts.append(f'<div style><span data-image="">x</span><img src="../../{name}.jpeg" src="{name}-dup.jpg"/></div>')
+        else:
+            parts.append(f'<p>Bright room with view<br>{i}<img src=\'{name}.webp\' loading=lazy></p>')
+    parts.append('<footer><img src="/wp-content/uploads/social-facebook.png"></footer></body></html>')
+    return '\n'.join(parts)
+
+
+def chunked(text, seed=11, largest=512):
+    """Split text at random points, including inside tags and attribute values"""
+    rnd = random.Random(seed)
+    chunks, start = [], 0
+    while start < len(text):
+        end = start + rnd.randint(1, largest)
+        chunks.append(text[start:end])
+        start = end
+    return chunks
+
+
+@pytest.mark.parametrize('images', [0, 10, 200])
+@pytest.mark.parametrize('reference, streaming', [
+    (reference_property_images, scrape_images.extract_property_images),
+    (reference_accommodation_images, scrape_website_images.extract_accommodation_images),
+], ids=['property page', 'accommodation'])
+def test_streaming_extractor_matches_beautifulsoup(images, reference, streaming):
+    html = make_page(images, seed=images)
+    expected = reference(html, BASE_URL)
+    assert streaming(html, BASE_URL) == expected
+    assert streaming(chunked(html), BASE_URL) == expected
+    assert streaming(chunked(html, largest=3), BASE_URL) == expected
@@ -0,0 +1,30 @@
+import io
+
+from PIL import Image, ImageCms
+
+from image_derivatives import to_display_mode
+
+
+SRGB = ImageCms.ImageCmsProfile(ImageCms.createProfile('sRGB')).tobytes()
+
+
+def reopened(img, **save_options):
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG' if img.mode in ('P', 'RGBA') else 'JPEG', **save_options)
+    return Image.open(io.BytesIO(buffer.getvalue()))
+
+
+def test_rgb_profile_is_kept():
+    for img in (Image.new('RGB', (8, 8), (200, 30, 30)), Image.new('RGBA', (8, 8)), Image.new('P', (8, 8))):
+        converted, profile = to_display_mode(reopened(img, icc_profile=SRGB), SRGB)
+        assert converted.mode in ('RGB', 'RGBA') and profile == SRGB
+
+
+def test_profile_of_another_colour_space_is_not_carried_over():
+    cmyk = reopened(Image.new('CMYK', (8, 8), (0, 200, 200, 0)), icc_profile=SRGB)
+    assert cmyk.info['icc_profile'] == SRGB
+    converted, profile = to_display_mode(cmyk, cmyk.info['icc_profile'])
+    assert converted.mode == 'RGB' and profile is None
+
+    converted, profile = to_display_mode(reopened(Image.new('CMYK', (8, 8))), b'not a profile')
+    assert converted.mode == 'RGB' and profile is None
@@ -0,0 +1,68 @@
+import random
+from itertools import combinations
+
+from listing_dedup import MERGE_SCORE, Candidate, candidate_pairs, dedup_rows, find_duplicates, score
+
+
+def row(address, sheet, rooms=2, guests=4, property_type='apartment', owner=None, **extra):
+    return {'address': address, 'sheet': sheet, 'bedrooms': rooms, 'guests': guests, 'property_type': property_type,
+            'owner': owner, **extra}
+
+
+def test_respelled_addresses_are_one_listing():
+    rows = [row('Alte Flüelastrasse 12', 0), row('Alte Flueelastr. 12, 7260 Davos Dorf', 1),
+            row('Kurgartenstrasse 4', 0), row('Kurgartenstr. 4\n7270', 2),
+            row('Alexander-Spengler-Strasse 7', 1), row('Alexander Spengler Str. 7 Davos Platz', 2)]
+    groups, _ = find_duplicates(rows)
+    assert sorted(groups) == [[0, 1], [2, 3], [4, 5]]
+
+
+def test_different_listings_stay_apart():
+    rows = [row('Talstrasse 5', 0), row('Talweg 5', 1),
+            row('Promenade 20, 7260 Davos Dorf', 0), row('Promenade 20, 7270 Davos Platz', 1),
+            row('Bahnhofstrasse 3', 0), row('Bahnhofstrasse 4', 1),
+            row('Museumstrasse 9', 0, rooms=2), row('Museumstrasse 9', 1, rooms=3)]
+    groups, _ = find_duplicates(rows)
+    assert groups == []
+
+
+def test_identical_units_of_one_sheet_are_not_merged():
+    # Three identical flats in one sheet and two of them in another are two duplicate pairs
+    rows = [row('Matte 3', 0), row('Matte 3', 0), row('Matte 3', 0), row('Matte 3', 1), row('Matte 3', 1)]
+    groups, _ = find_duplicates(rows)
+    assert len(groups) == 2
+    assert all(sorted(rows[i]['sheet'] for i in group) == [0, 1] for group in groups)
+
+
+def test_blocking_finds_every_pair_scoring_all_pairs_does():
+    rnd = random.Random(11)
+    streets = ['Alte Flüelastrasse', 'Promenade', 'Talstrasse', 'Talweg', 'Bündastrasse', 'Brämabüelstrasse',
+               'Dischmastrasse', 'Obere Strasse', 'Scalettastrasse', 'Tanzbühlstrasse', 'Reginaweg', 'Matte']
+    rows = []
+    for _ in range(300):
+        address = f"{rnd.choice(streets)} {rnd.randint(1, 12)}"
+        if rnd.random() < 0.5:
+            address = address.replace('ü', 'ue').replace('ä', 'ae')
+        if rnd.random() < 0.4:
+            address = address.replace('strasse', 'str.')
+        rooms = rnd.choice([1, 2, 3])
+        rows.append(row(address, rnd.randrange(3), rooms=rooms, guests=rooms * 2))
+
+    candidates = [Candidate(fields) for fields in rows]
+    blocked = {(i, j) for i, j in candidate_pairs(candidates) if score(candidates[i], candidates[j]) >= MERGE_SCORE}
+    everything = {(i, j) for i, j in combinations(range(len(rows)), 2)
+                  if candidates[i].source != candidates[j].source and candidates[i].number == candidates[j].number
+                  and score(candidates[i], candidates[j]) >= MERGE_SCORE}
+    assert everything and blocked == everything
+
+
+def test_merge_keeps_the_first_row_and_fills_its_gaps():
+    based = [(row('Promenade 20', 0, price=None, distance=0.8, website_link='https://a.example'), 'promenade-20'),
+             (row('Talstrasse 5', 0), 'talstrasse-5'),
+             (row('Promenade 20, 7260 Davos', 1, price=25000.0, distance=1.2, website_link=None), 'promenade-20')]
+    merged = list(dedup_rows(based, merge=True, report_path=None))
+    assert [slug for _, slug in merged] == ['promenade-20', 'talstrasse-5']
+    fields = merged[0][0]
+    assert (fields['price'], fields['distance'], fields['website_link']) == (25000.0, 0.8, 'https://a.example')
+
+    assert len(list(dedup_rows(based, report_path=None))) == 3
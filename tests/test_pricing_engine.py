@@ -0,0 +1,115 @@
+import random
+from datetime import date, timedelta
+
+import numpy as np
+
+from pricing_engine import BLOCKED, INVALID_DATES, MIN_STAY, OK, UNAVAILABLE_STATUSES, UNPRICED, PricingEngine
+
+
+def rule(slug, price, valid_from='2026-01-01', valid_to='2026-12-31', default=True, **extra):
+    return {'property_slug': slug, 'base_price_per_night': price, 'wef_multiplier': extra.get('wef_multiplier', 1.0),
+            'min_stay': extra.get('min_stay', 1), 'cleaning_fee': extra.get('cleaning_fee', 0),
+            'valid_from': valid_from, 'valid_to': valid_to, 'is_default': default}
+
+
+def stay(slug, start, end, status, price_override=None):
+    return {'property_slug': slug, 'start_date': start, 'end_date': end, 'status': status,
+            'price_override': price_override}
+
+
+def test_totals():
+    engine = PricingEngine(
+        [rule('chalet', 1000.0, min_stay=3, cleaning_fee=450),
+         rule('chalet', 1000.0, '2026-01-17', '2026-01-23', default=False, wef_multiplier=1.5, min_stay=5,
+              cleaning_fee=1200)],
+        [stay('chalet', '2026-02-10', '2026-02-12', 'available', 333.33),
+         stay('chalet', '2026-03-01', '2026-03-08', 'booked')])
+
+    assert engine.quote('chalet', '2026-01-05', '2026-01-08')['total'] == 3 * 1000 + 450
+    # Two nights before WEF week, three in it; the check-in night's rule sets the cleaning fee
+    assert engine.quote('chalet', '2026-01-15', '2026-01-20')['total'] == 2 * 1000 + 3 * 1500 + 450
+    assert engine.quote('chalet', '2026-01-17', '2026-01-22')['total'] == 5 * 1500 + 1200
+    assert engine.quote('chalet', '2026-02-09', '2026-02-13')['subtotal'] == 2 * 1000 + 2 * 333.33
+
+    assert engine.quote('chalet', '2026-01-17', '2026-01-20')['status'] == MIN_STAY
+    assert engine.quote('chalet', '2026-03-05', '2026-03-10')['status'] == BLOCKED
+    # The booking ends on its check-out day, so the next stay can start then
+    assert engine.quote('chalet', '2026-03-08', '2026-03-11')['status'] == OK
+    assert engine.quote('chalet', '2026-12-30', '2027-01-03')['status'] == UNPRICED
+    assert engine.quote('chalet', '2026-01-08', '2026-01-08')['status'] == INVALID_DATES
+
+
+def test_mistyped_year_only_lengthens_its_own_property():
+    engine = PricingEngine([rule('chalet', 500.0), rule('loft', 200.0, '2026-01-01', '2206-12-31')])
+    assert engine.days[engine.rows['chalet']] == 365
+    assert engine.quote('chalet', '2026-06-01', '2026-06-04')['total'] == 1500
+    assert engine.quote('loft', '2150-06-01', '2150-06-04')['total'] == 600
+
+
+def quote_by_loop(rules, ranges, check_in, check_out):
+    """Night-by-night quote: the most specific rule in force, then the availability ranges"""
+
+    def rule_for(night):
+        candidates = [r for r in rules if date.fromisoformat(r['valid_from']) <= night <= date.fromisoformat(r['valid_to'])]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda r: (not r['is_default'], date.fromisoformat(r['valid_from'])
+                                              - date.fromisoformat(r['valid_to'])))
+
+    nights = (check_out - check_in).days
+    if nights <= 0:
+        return INVALID_DATES, None
+    cents, unpriced = 0, False
+    for n in range(nights):
+        night = check_in + timedelta(days=n)
+        rule_in_force = rule_for(night)
+        price = round(rule_in_force['base_price_per_night'] * rule_in_force['wef_multiplier'] * 100) if rule_in_force else None
+        for entry in ranges:
+            if date.fromisoformat(entry['start_date']) <= night < date.fromisoformat(entry['end_date']):
+                if entry['status'] in UNAVAILABLE_STATUSES:
+                    return BLOCKED, None
+                if entry['price_override'] is not None:
+                    price = round(entry['price_override'] * 100)
+        if price is None:
+            unpriced = True
+        else:
+            cents += price
+    if unpriced:
+        return UNPRICED, None
+    first = rule_for(check_in)
+    if nights < (first['min_stay'] if first else 1):
+        return MIN_STAY, None
+    return OK, round(cents / 100 + (first['cleaning_fee'] if first else 0), 2)
+
+
+def test_batch_matches_night_by_night_loop():
+    rnd = random.Random(4)
+    rules, ranges = [], []
+    for i in range(60):
+        slug = f"listing-{i}"
+        nightly = rnd.randrange(700, 17000, 10) / 10
+        year = rnd.choice([2026, 2026, 2026, 2027])
+        rules.append(rule(slug, nightly, f"{year}-01-01", '2026-12-31', min_stay=rnd.choice([1, 3, 7]),
+                          cleaning_fee=rnd.choice([0, 450, 850])))
+        if rnd.random() < 0.3:
+            rules.append(rule(slug, nightly, '2026-01-17', '2026-01-24', default=False, wef_multiplier=1.5,
+                              min_stay=5, cleaning_fee=1200))
+        for _ in range(rnd.choice([0, 1, 2])):
+            start = date(2026, 1, 1) + timedelta(days=rnd.randrange(60))
+            status = rnd.choice(['available', 'booked', 'blocked', 'maintenance'])
+            ranges.append(stay(slug, start.isoformat(), (start + timedelta(days=rnd.randrange(1, 10))).isoformat(),
+                               status, float(rnd.randrange(500, 9000)) if status == 'available' else None))
+    stays = [(date(2025, 12, 28) + timedelta(days=d), n) for d in range(0, 60, 3) for n in (0, 2, 5, 7, 14)]
+    check_ins = [check_in for check_in, _ in stays]
+    check_outs = [check_in + timedelta(days=n) for check_in, n in stays]
+
+    engine = PricingEngine(rules, ranges)
+    batch = engine.quote_batch(check_ins, check_outs)
+    for p, slug in enumerate(batch['properties']):
+        own_rules = [r for r in rules if r['property_slug'] == slug]
+        own_ranges = [r for r in ranges if r['property_slug'] == slug]
+        for w in range(len(stays)):
+            status, total = quote_by_loop(own_rules, own_ranges, check_ins[w], check_outs[w])
+            assert batch['status'][p, w] == status, (slug, check_ins[w], check_outs[w])
+            if status == OK:
+                assert np.isclose(batch['total'][p, w], total), (slug, check_ins[w], check_outs[w])
@@ -0,0 +1,28 @@
+from fake_supabase import FakeSupabase
+from import_properties import PRICING_RULE_NAME, PricingRuleWriter
+
+
+def rule(property_id, price, rule_id=None):
+    row = {'property_id': property_id, 'name': PRICING_RULE_NAME, 'is_default': True, 'base_price_per_night': price}
+    return dict(row, id=rule_id) if rule_id else row
+
+
+def test_old_rules_are_deleted_only_once_the_new_ones_are_written():
+    supabase = FakeSupabase(pricing_rules=[rule('p1', 100.0, 'r1'), rule('p2', 200.0, 'r2'), rule('p3', 300.0, 'r3'),
+                                           dict(rule('p1', 150.0, 'manual'), name='Christmas', is_default=False)])
+    supabase.fail = lambda table, op, rows: op == 'insert' and any(row['property_id'] == 'p2' for row in rows)
+
+    writer = PricingRuleWriter(supabase)
+    writer.writer.backoff = 0
+    writer.replace_for(['p1', 'p2'])
+    slug_to_id = {'chalet': 'p1', 'loft': 'p2'}
+    for slug, price in (('chalet', 110.0), ('loft', 210.0), ('gone', 1.0)):
+        writer.add({'property_slug': slug, 'name': PRICING_RULE_NAME, 'is_default': True,
+                    'base_price_per_night': price}, slug_to_id)
+    stats = writer.close()
+
+    assert stats['failed_properties'] == ['p2']
+    assert writer.unresolved == ['gone']
+    prices = sorted((row['property_id'], row['base_price_per_night']) for row in supabase.tables['pricing_rules'])
+    # p1's imported rule is replaced and its manual rule kept; p2 keeps its old rule; p3 was not touched
+    assert prices == [('p1', 110.0), ('p1', 150.0), ('p2', 200.0), ('p3', 300.0)]
@@ -0,0 +1,92 @@
+import random
+
+import pytest
+
+from property_index import PropertyIndex, category_key
+
+
+CITIES = ['Davos', 'Davos Platz', 'Davos Dorf', 'Klosters', 'klosters', 'Saas']
+TYPES = ['apartment'] * 8 + ['studio', 'chalet', 'hotel_room', 'house']
+
+QUERIES = [
+    dict(capacity=(8, None), distance_to_congress=(None, 1.0), active=True, sort='wef_price'),
+    dict(city='klosters', property_type=['chalet', 'house']),
+    dict(rooms=(3, 4), wef_price=(None, 40000), sort='distance_to_congress'),
+    dict(city='Davos', property_type='apartment', active=True, sort='wef_price', descending=True),
+]
+
+
+def make_records(count, seed=5):
+    rnd = random.Random(seed)
+    records = []
+    for i in range(count):
+        rooms = rnd.choice([1, 1, 2, 2, 2, 3, 3, 4, 5, 7])
+        records.append({
+            'name': f"Listing {i}",
+            'slug': f"listing-{i}",
+            'property_type': rnd.choice(TYPES),
+            'city': rnd.choice(CITIES),
+            'rooms': rooms,
+            'capacity': rooms * 2 + rnd.choice([0, 0, 1]),
+            'distance_to_congress': round(rnd.choice([0.3, 0.5, 1.0, 1.5, 2.0, 5.0, 13.0]) * rnd.uniform(0.8, 1.2), 1),
+            'wef_price': None if rnd.random() < 0.1 else float(rnd.randrange(8000, 120000, 500)),
+            'active': rnd.random() < 0.7,
+        })
+    return records
+
+
+def scan(records, sort=None, descending=False, **filters):
+    """Test every record, then sort; records without the sort value go last"""
+    ranges = {field: c for field, c in filters.items() if isinstance(c, tuple)}
+    categories = {field: {category_key(a) for a in (c if isinstance(c, list) else [c])}
+                  for field, c in filters.items() if not isinstance(c, tuple)}
+
+    def matches(record):
+        for field, (low, high) in ranges.items():
+            value = record.get(field)
+            if value is None or (low is not None and value < low) or (high is not None and value > high):
+                return False
+        return all(category_key(record.get(field)) in accepted for field, accepted in categories.items())
+
+    result = [record for record in records if matches(record)]
+    if sort:
+        present = [r for r in result if r.get(sort) is not None]
+        missing = [r for r in result if r.get(sort) is None]
+        result = sorted(present, key=lambda r: r[sort], reverse=descending) + missing
+    return result
+
+
+def assert_same(found, expected, sort):
+    # Ties in the sort value may come in any order
+    assert sorted(r['slug'] for r in found) == sorted(r['slug'] for r in expected)
+    if sort:
+        assert [r.get(sort) for r in found] == [r.get(sort) for r in expected]
+    else:
+        assert [r['slug'] for r in found] == [r['slug'] for r in expected]
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_query_matches_scan(query):
+    records = make_records(2000)
+    assert_same(PropertyIndex(records).query(**query), scan(records, **query), query.get('sort'))
+
+
+def test_updated_index_matches_scan():
+    records = make_records(2000)
+    index = PropertyIndex(records)
+
+    rnd = random.Random(9)
+    updated = []
+    for record in records:
+        roll = rnd.random()
+        if roll < 0.01:
+            continue
+        if roll < 0.03:
+            record = dict(record, wef_price=float(rnd.randrange(8000, 120000, 500)), active=not record['active'])
+        updated.append(record)
+    updated += [dict(r, slug=f"new-{r['slug']}") for r in make_records(25, seed=9)]
+
+    stats = index.update(updated)
+    assert stats['added'] == 25 and stats['removed'] > 0 and stats['changed'] > 0
+    for query in QUERIES:
+        assert_same(index.query(**query), scan(updated, **query), query.get('sort'))
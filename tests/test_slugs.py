@@ -0,0 +1,83 @@
+import json
+import random
+
+from import_properties import SlugAllocator, assign_slugs, slugify
+
+
+def listing(address, rooms=2, price=20000.0, owner='Agency', property_type='apartment'):
+    return {'address': address, 'property_type': property_type, 'name': address, 'bedrooms': rooms, 'bathrooms': 1,
+            'guests': rooms * 2, 'price': price, 'cleaning_fee': 300.0, 'security_deposit': None,
+            'website_link': None, 'owner': owner, 'available': True, 'distance': 1.5}
+
+
+def import_rows(rows, registry_file, properties_file=None):
+    """{slug: listing} of one import run with the registry"""
+    allocator = SlugAllocator.load(registry_file, properties_file)
+    slugs = [slug for _, slug in assign_slugs(((fields, slugify(fields['address'])) for fields in rows), allocator)]
+    allocator.save(registry_file)
+    return slugs
+
+
+def unit(fields):
+    return json.dumps(fields, sort_keys=True)
+
+
+def building():
+    rows = [listing('Promenade 20', rooms=rooms, price=price) for rooms in (1, 2, 3) for price in (15000.0, 25000.0)]
+    rows += [listing('Promenade 20', rooms=2), listing('Promenade 20', rooms=2)]
+    rows += [listing(f"Talstrasse {n}") for n in range(1, 6)]
+    return rows
+
+
+def test_reordered_sheet_keeps_slugs(tmp_path):
+    registry = tmp_path / 'slug_registry.json'
+    rows = building()
+    first = import_rows(rows, registry)
+    assert len(set(first)) == len(rows)
+
+    shuffled = rows[:]
+    random.Random(1).shuffle(shuffled)
+    second = import_rows(shuffled, registry)
+    # Identical units are interchangeable, so compare which slugs each kind of listing got
+    assert sorted(zip(map(unit, rows), first)) == sorted(zip(map(unit, shuffled), second))
+
+
+def test_edited_listing_alone_at_its_address_keeps_its_slug(tmp_path):
+    registry = tmp_path / 'slug_registry.json'
+    before = import_rows([listing('Talstrasse 1'), listing('Bündastrasse 4')], registry)
+    after = import_rows([listing('Talstrasse 1', price=30000.0), listing('Bündastrasse 4', rooms=3)], registry)
+    assert before == after
+
+
+def test_new_listing_does_not_take_a_registered_slug(tmp_path):
+    registry = tmp_path / 'slug_registry.json'
+    rows = [listing('Promenade 20', rooms=1), listing('Promenade 20', rooms=2)]
+    old = import_rows(rows, registry)
+    new = import_rows([listing('Promenade 20', rooms=4)] + rows, registry)
+    assert new[1:] == old and new[0] not in old
+
+
+def test_listings_no_longer_imported_are_pruned(tmp_path):
+    registry = tmp_path / 'slug_registry.json'
+    import_rows([listing('Promenade 20'), listing('Talstrasse 1')], registry)
+    import_rows([listing('Promenade 20')], registry)
+    saved = json.loads(registry.read_text())
+    assert saved['version'] == SlugAllocator.REGISTRY_VERSION
+    assert [slug for units in saved['slugs'].values() for slug in units.values()] == ['promenade-20']
+    # Its slug is free again
+    assert import_rows([listing('Promenade 20'), listing('Talstrasse 1', rooms=5)], registry)[1] == 'talstrasse-1'
+
+
+def test_registry_is_seeded_from_properties_json(tmp_path):
+    registry = tmp_path / 'slug_registry.json'
+    properties = tmp_path / 'properties.json'
+    rows = [listing('Promenade 20', rooms=1), listing('Promenade 20', rooms=2)]
+    fields = [('rooms', 'bedrooms'), ('bathrooms', 'bathrooms'), ('capacity', 'guests'), ('wef_price', 'price'),
+              ('cleaning_fee', 'cleaning_fee'), ('security_deposit', 'security_deposit'),
+              ('external_link', 'website_link'), ('owner_info', 'owner'), ('active', 'available'),
+              ('distance_to_congress', 'distance'), ('address', 'address'), ('property_type', 'property_type')]
+    records = [{prop: row[name] for prop, name in fields} for row in rows]
+    records[0]['slug'], records[1]['slug'] = 'promenade-20-2', 'promenade-20'
+    properties.write_text(json.dumps(records))
+
+    assert import_rows(rows[::-1], registry, properties) == ['promenade-20', 'promenade-20-2']
@@ -0,0 +1,13 @@
+from fake_supabase import FakeSupabase
+from supabase_client import fetch_all
+
+
+def test_fetch_all_reads_every_page():
+    supabase = FakeSupabase(property_images=[{'id': f"{i:03d}", 'property_id': f"p{i % 3}"} for i in range(25)])
+    assert [row['id'] for row in fetch_all(supabase, 'property_images', 'id', page_size=10)] == \
+        [f"{i:03d}" for i in range(25)]
+    assert supabase.calls.count(('property_images', 'select')) == 3
+
+    rows = fetch_all(supabase, 'property_images', 'id, property_id', page_size=4, order='property_id',
+                     where=lambda query: query.in_('property_id', ['p1', 'p2']))
+    assert sorted(row['id'] for row in rows) == [f"{i:03d}" for i in range(25) if i % 3]
@@ -0,0 +1,43 @@
+import json
+
+from fake_supabase import FakeSupabase
+from image_store import ImageStore
+from sync_images import storage_path, sync_images
+
+
+def make_store(tmp_path, properties):
+    blobs = {}
+    for digests in properties.values():
+        for digest in digests:
+            path = tmp_path / 'store' / f"{digest}.jpg"
+            path.parent.mkdir(exist_ok=True)
+            path.write_bytes(digest.encode())
+            blobs[digest] = {'path': f"store/{digest}.jpg", 'urls': []}
+    index = tmp_path / 'image_index.json'
+    index.write_text(json.dumps({'blobs': blobs, 'properties': properties}))
+    return ImageStore(tmp_path / 'store', index, root=tmp_path)
+
+
+def image_row(property_id, digest, order=0, row_id=None):
+    return {'id': row_id or f"{property_id}-{digest}", 'property_id': property_id, 'content_hash': digest,
+            'url': None, 'storage_path': f"{digest[:2]}/{digest}.jpg", 'display_order': order,
+            'is_primary': order == 0}
+
+
+def test_sync_uploads_new_images_and_prunes_removed_ones(tmp_path):
+    a, b, c = 'aa' + '1' * 62, 'bb' + '2' * 62, 'cc' + '3' * 62
+    store = make_store(tmp_path, {'chalet': [], 'loft': [b, c]})
+    supabase = FakeSupabase(
+        properties=[{'id': 'p1', 'slug': 'chalet'}, {'id': 'p2', 'slug': 'loft'}, {'id': 'p3', 'slug': 'studio'}],
+        property_images=[image_row('p1', a), image_row('p2', a), image_row('p3', a),
+                         dict(image_row('p2', 'manual'), content_hash=None)],
+    )
+
+    stats = sync_images(supabase, store, prune=True)
+
+    assert stats['new'] == 2 and stats['uploaded'] == 2 and stats['pruned'] == 2
+    assert sorted(supabase.objects) == sorted(f"property-images/{storage_path(d, store.blobs[d])}" for d in (b, c))
+    remaining = sorted((row['property_id'], row['content_hash'] or '', row['display_order'])
+                       for row in supabase.tables['property_images'])
+    # chalet's images were all removed; studio was not scraped and hand-added rows are never touched
+    assert remaining == [('p2', '', 0), ('p2', b, 0), ('p2', c, 1), ('p3', a, 0)]